@@ -0,0 +1,6 @@
+"""
+Benchmarks. Run them from the app directory
+after loading the database, for example:
+
+    python -m benchmarks.persistence
+"""
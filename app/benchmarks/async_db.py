@@ -0,0 +1,121 @@
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+import database as db
+
+
+def fill(path: str, enemies: int) -> None:
+    """
+    Creates database with <enemies> enemies in one location.
+
+    :param path: Filepath of the database.
+    :param enemies: Number of enemies.
+    """
+
+    engine = create_engine(f'sqlite:///{path}')
+    db.Base.metadata.create_all(engine)
+    with sessionmaker(bind=engine)() as session:
+        session.add(db.Location('Location', 'Description', 1, id=1))
+        for i in range(1, enemies + 1):
+            session.add(db.Enemy(f'Enemy {i}', 'Description', 'Phrase', 1 + i % 10, 10, 1, id=i, location_id=1))
+        session.commit()
+    engine.dispose()
+
+
+def percentile(values: list[float], p: float) -> float:
+    """
+    Returns <p> percentile of sorted <values> in milliseconds.
+    """
+
+    return values[min(int(len(values) * p), len(values) - 1)] * 1000
+
+
+async def run(query, players: int, seconds: float, queries: int) -> tuple[list[float], list[float]]:
+    """
+    Runs <players> players for <seconds> seconds. Every tenth action
+    is a profile request that does <queries> queries, others
+    are moves that do not touch the database.
+
+    :param query: Coroutine function doing <queries> queries in one session.
+    :return: Sorted latencies of profile requests and of moves.
+    """
+
+    profile: list[float] = []
+    moves: list[float] = []
+    deadline = time.perf_counter() + seconds
+
+    async def player() -> None:
+        while time.perf_counter() < deadline:
+            await asyncio.sleep(random.uniform(0.05, 0.15))
+            start = time.perf_counter()
+            if random.random() < 0.1:
+                await query(queries)
+                profile.append(time.perf_counter() - start)
+            else:
+                await asyncio.sleep(0)
+                moves.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(player() for _ in range(players)))
+    return sorted(profile), sorted(moves)
+
+
+async def main(players: int, seconds: float, enemies: int, queries: int) -> None:
+    """
+    Compares handler latency when queries block the event loop
+    and when they are awaited with aiosqlite.
+    """
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.db')
+        fill(path, enemies)
+
+        def stmt():
+            return select(db.Enemy.name).where(db.Enemy.level == random.randint(1, 10), db.Enemy.name.like('%7'))
+
+        engine = create_engine(f'sqlite:///{path}')
+        Session = sessionmaker(bind=engine)
+
+        async def sync_query(n: int) -> None:
+            with Session() as session:
+                for _ in range(n):
+                    session.scalars(stmt()).all()
+
+        async_engine = create_async_engine(f'sqlite+aiosqlite:///{path}')
+        AsyncSession = async_sessionmaker(bind=async_engine)
+
+        async def async_query(n: int) -> None:
+            async with AsyncSession() as session:
+                for _ in range(n):
+                    (await session.scalars(stmt())).all()
+
+        results = {
+            'sync': await run(sync_query, players, seconds, queries),
+            'async': await run(async_query, players, seconds, queries),
+        }
+        engine.dispose()
+        await async_engine.dispose()
+
+    print(f'players: {players}, enemies: {enemies}, queries per profile: {queries}')
+    print(f'{"engine":<8}{"profile p50":>14}{"profile p99":>14}{"move p50":>12}{"move p99":>12}{"actions/s":>12}')
+    for name, (profile, moves) in results.items():
+        print(f'{name:<8}{percentile(profile, 0.5):>11.2f} ms{percentile(profile, 0.99):>11.2f} ms'
+              f'{percentile(moves, 0.5):>9.2f} ms{percentile(moves, 0.99):>9.2f} ms'
+              f'{(len(profile) + len(moves)) / seconds:>12.0f}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Sync vs async database handler latency benchmark')
+    parser.add_argument('--players', type=int, default=100)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--enemies', type=int, default=2000)
+    parser.add_argument('--queries', type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(main(args.players, args.seconds, args.enemies, args.queries))
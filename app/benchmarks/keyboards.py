@@ -0,0 +1,66 @@
+import argparse
+import asyncio
+import json
+import time
+
+from aiogram import Bot
+
+import database as db
+import keyboards as kb
+from game import Protagonist, get_world
+
+
+def serialize(bot: Bot, markup) -> str:
+    """
+    Serializes <markup> the way it is done before sending.
+    """
+
+    return json.dumps(bot.session.prepare_value(markup, bot=bot, files={}))
+
+
+def measure(bot: Bot, build, repeat: int) -> float:
+    """
+    Returns microseconds spent for one build and serialization.
+    """
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        serialize(bot, build())
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+async def main(repeat: int) -> None:
+    """
+    Compares building keyboards for every update and taking them from cache.
+    """
+
+    await db.load_catalog()
+    bot = Bot('42:TEST')
+    world = get_world()
+    prota = Protagonist('player', 1)
+    prota.current_location = max(world.locations.values(), key=lambda loc: len(loc.directions))
+    npc = max(world.npc.values(), key=lambda n: len(n.quests))
+
+    cases = {
+        'location start': lambda: kb.make_keyboard_location_start(),
+        'enemy': lambda: kb.make_keyboard_enemy_description(),
+        'directions': lambda: kb.make_keyboard_directions_list(prota.current_location.directions, prota),
+        'quests': lambda: kb.make_keyboard_quests_list(prota, npc),
+    }
+
+    print(f'{"keyboard":<16}{"uncached":>12}{"cached":>12}')
+    for name, build in cases.items():
+        rows = tuple(tuple(button.text for button in row) for row in build().keyboard)
+        uncached = measure(bot, lambda: kb.make_keyboard.__wrapped__(rows), repeat)
+        cached = measure(bot, build, repeat)
+        print(f'{name:<16}{uncached:>9.1f} us{cached:>9.1f} us')
+    print(kb.make_keyboard.cache_info())
+    await bot.session.close()
+    await db.engine.dispose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Keyboard build and serialization benchmark')
+    parser.add_argument('--repeat', type=int, default=10000)
+    args = parser.parse_args()
+    asyncio.run(main(args.repeat))
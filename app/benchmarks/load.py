@@ -0,0 +1,472 @@
+import argparse
+import asyncio
+import datetime
+import itertools
+import os
+import sys
+import tempfile
+import time
+from typing import Any, AsyncGenerator, Dict, List, Optional
+
+from aiogram import Bot, Dispatcher
+from aiogram.client.session.base import BaseSession
+from aiogram.methods import EditMessageText, SendMessage, SendPhoto, TelegramMethod
+from aiogram.types import CallbackQuery, Chat, Message, PhotoSize, Update, User
+from sqlalchemy import delete
+
+import database as db
+import templates as tp
+from game import protagonists
+from game.protagonist import PROTAGONIST_HEAL_INTERVAL
+from handlers import router
+from media import file_ids
+from metrics import (ApiMetricsMiddleware, HandlerMetricsMiddleware, UpdateMetricsMiddleware,
+                     count_queries, registry)
+from middlewares import FlushStorageMiddleware, SaveProtagonistMiddleware, ordered_dispatcher
+
+
+"""
+Ids of simulated players start here, so they don't clash with real ones.
+Their protagonists and FSM records are deleted after the run.
+"""
+FIRST_PLAYER_ID = 10 ** 12
+BOT_TOKEN = '42:LOAD'
+MAX_RESTARTS = 5
+
+"""
+Steps of a fight: starting it, one round and all rounds at once.
+The player rests before the start and before every round.
+"""
+ATTACK = 'Напасть'
+ROUND = 'cb:battle:attack'
+AUTO = 'cb:battle:auto'
+
+
+def talk(npc: str, *actions: List[str]) -> List[str]:
+    """
+    Talks to <npc>, does <actions> and goes back to the location.
+    """
+
+    return ['Поговорить', npc, *itertools.chain(*actions), 'Назад']
+
+
+def take(quest: str) -> List[str]:
+    """
+    Takes <quest> of the npc the player talks to.
+    """
+
+    return ['Список заданий', quest, 'Взять Задание', 'Отмена']
+
+
+def complete(quest: str) -> List[str]:
+    """
+    Completes <quest> of the npc the player talks to.
+    """
+
+    return ['Список заданий', quest, 'Отдать предмет|Отчитаться об убийстве', 'Отлично']
+
+
+def message_from(npc: str) -> List[str]:
+    """
+    Passes message from <npc>.
+    """
+
+    return [f'Передать сообщение от {npc}']
+
+
+def go(*directions: str) -> List[str]:
+    """
+    Goes by <directions> one after another.
+    """
+
+    return list(itertools.chain(*(['Отправиться', direction] for direction in directions)))
+
+
+def fight(enemy: str, auto: bool = False) -> List[str]:
+    """
+    Attacks <enemy> and fights until the end, round by round
+    or, if <auto>, all rounds at once.
+    """
+
+    return ['Осмотреть врага', enemy, ATTACK, AUTO if auto else ROUND]
+
+
+"""
+Route of Walkthrough.md. A step is text of the button to press,
+'|' separates alternatives. Steps starting with '>' are typed
+by the player, steps starting with 'cb:' press inline button
+of the last message with inline keyboard. ROUND is pressed
+again while the battle goes on.
+"""
+ROUTE: List[str] = [
+    '>/start', '>Hero', 'Начать игру',
+    # Город Элдрим
+    *talk('Теодор Греймор', take('Тайны древних лесов')),
+    *go('В деревню Зеленая Роща'),
+    *talk('Эйлар Гринвуд', message_from('Теодор Греймор'), take('Темные предзнаменования')),
+    *go('Обратно в город', 'На темную тропу'),
+    *fight('Теневой Дух', auto=True),
+    *go('Обратно в город', 'В деревню Зеленая Роща'),
+    *talk('Эйлар Гринвуд', take('По следам теней'), complete('По следам теней')),
+    *go('Обратно в город', 'К высокой горе'),
+    *fight('Чернокаменный Голем'),
+    *go('Обратно в город', 'В деревню Зеленая Роща'),
+    *talk('Эйлар Гринвуд', take('Темные камни горы'), complete('Темные камни горы')),
+    *go('Обратно в город'),
+    *talk('Элина Лунамор', take('Поиск серебряного света'), take('Огонь серебра')),
+    *go('К высокой горе', 'Вглубь пещеры'),
+    *talk('Морган Чернорук', message_from('Эйлар Гринвуд'), take('Тени изгнания')),
+    *fight('Черный Химер'),
+    *talk('Морган Чернорук', complete('Тени изгнания')),
+    *go('Идти к свету'),
+    *fight('Серебряный Грифон'),
+    *go('Спуститься в город'),
+    *talk('Элина Лунамор', complete('Поиск серебряного света')),
+    *go('К высокой горе', 'Вглубь пещеры', 'Идти к свету'),
+    *fight('Серебряный Дракон'),
+    *go('Спуститься в город'),
+    *talk('Элина Лунамор', complete('Огонь серебра')),
+    *go('В Город Айриндель'),
+    # Город Айриндель
+    *talk('Гаррет Лейтстрайдер', take('Охота за Когтем Топового Трясуна'), take('Охота на Дракона')),
+    *go('На Озеро Серебряных Зеркал'),
+    *talk('Рыбак Феликс', take('Поиски Звездной Удочки'), take('Охота на Серебристого Карпа')),
+    *fight('Серебристый Карп'),
+    *talk('Рыбак Феликс', complete('Охота на Серебристого Карпа')),
+    *go('Обратно в город', 'По дороге к болотам'),
+    *fight('Топовый Трясун'),
+    *go('Обратно в город'),
+    *talk('Гаррет Лейтстрайдер', complete('Охота за Когтем Топового Трясуна')),
+    *go('По дороге к болотам'),
+    *fight('Малик'),
+    *go('Обратно в город', 'По кристальной тропе'),
+    *talk('Арден Златоцвет', take('Поиск Солнечной Розы'), complete('Поиск Солнечной Розы')),
+    *go('Обратно в город', 'На темную тропу'),
+    *talk('Брандон Лейтстрайдер', take('Послание о Нападении'), take('Устранение Моргана Темноглазого')),
+    *go('Обратно в город'),
+    *talk('Гаррет Лейтстрайдер', message_from('Брандон Лейтстрайдер')),
+    *go('На темную тропу'),
+    *fight('Морган Темноглазый'),
+    *talk('Брандон Лейтстрайдер', complete('Устранение Моргана Темноглазого')),
+    *go('Обратно в город', 'На Озеро Серебряных Зеркал'),
+    *talk('Рыбак Феликс', complete('Поиски Звездной Удочки')),
+    *go('Обратно в город', 'К темным скалам'),
+    *fight('Даргон Пламенное Крыло'),
+    *go('Обратно в город'),
+    'Поговорить', 'Гаррет Лейтстрайдер', *complete('Охота на Дракона'),
+]
+
+
+class Player:
+    """
+    Simulated player that presses buttons of the route.
+
+    :param id: Telegram id of the player, also id of his chat.
+    :param keyboard: Texts of buttons of the last reply keyboard.
+    :param inline_message_id: id of the last message with inline keyboard.
+    :param last_text: Text of the last message sent to the player.
+    :param fighting: True while the battle keyboard is shown.
+    :param deaths: Number of deaths of the protagonist.
+    :param completed: True if the game is completed.
+    :param stuck: Step the player had no button for.
+    """
+
+    def __init__(self, id: int) -> None:
+        """
+        Constructor method.
+        """
+
+        self.id: int = id
+        self.keyboard: List[str] = []
+        self.inline_message_id: int = 0
+        self.last_text: str = ''
+        self.fighting: bool = False
+        self.deaths: int = 0
+        self.completed: bool = False
+        self.stuck: Optional[str] = None
+
+    def seen(self, method: TelegramMethod, message_id: Optional[int]) -> None:
+        """
+        Remembers what the bot has shown to the player.
+
+        :param method: Method called by the bot in the chat.
+        :param message_id: id of the sent or edited message, if any.
+        """
+
+        text = getattr(method, 'text', None) or getattr(method, 'caption', None)
+        if text:
+            self.last_text = text
+        markup = getattr(method, 'reply_markup', None)
+        if markup is None:
+            return
+        if hasattr(markup, 'keyboard'):
+            self.keyboard = [button.text for row in markup.keyboard for button in row]
+            self.fighting = False
+        elif hasattr(markup, 'inline_keyboard') and message_id:
+            self.inline_message_id = message_id
+            self.fighting = True
+        elif getattr(markup, 'remove_keyboard', False):
+            self.keyboard = []
+
+    def press(self, step: str) -> Optional[str]:
+        """
+        Returns text of the button matching <step>.
+
+        :param step: Step of the route, options are separated by '|'.
+        :return: Text of the button, None if there is no such button.
+        """
+
+        for option in step.split('|'):
+            for text in self.keyboard:
+                if option in text:
+                    return text.strip()
+        return None
+
+    def rest(self, step: str) -> None:
+        """
+        Heals the protagonist fully before a fight or a round
+        of it, as if the player waited. Real healing takes
+        minutes of wall time, so the heal timestamp is moved
+        back instead. Without it the walkthrough can't be
+        played through by a player that never waits.
+        """
+
+        prota = protagonists.get(self.id)
+        if step in (ATTACK, ROUND) and prota is not None:
+            prota.heal_timestamp -= PROTAGONIST_HEAL_INTERVAL * 10
+
+    def next_step(self, step: int) -> Optional[int]:
+        """
+        Returns index of the route step after <step> is done:
+        the same one for a round while the battle goes on,
+        the first one after a death.
+
+        :return: None if the player has died more than
+            MAX_RESTARTS times.
+        """
+
+        if self.last_text == tp.proto_dead():
+            self.deaths += 1
+            self.last_text = ''
+            self.fighting = False
+            return 0 if self.deaths <= MAX_RESTARTS else None
+        if ROUTE[step] == ROUND and self.fighting:
+            return step
+        return step + 1
+
+    def update(self, update_id: int, step: str) -> Optional[Update]:
+        """
+        Builds update the player sends for <step>.
+
+        :param update_id: id of the update.
+        :param step: Step of the route: text of a button,
+            '>' and the text to type or 'cb:' and callback data.
+        :return: Update, None if there is no such button.
+        """
+
+        user = User(id=self.id, is_bot=False, first_name='Player')
+        chat = Chat(id=self.id, type='private')
+        now = datetime.datetime.now()
+        if step.startswith('cb:'):
+            message = Message(message_id=self.inline_message_id, date=now, chat=chat, text='',
+                              from_user=User(id=42, is_bot=True, first_name='Bot'))
+            return Update(update_id=update_id, callback_query=CallbackQuery(
+                id=str(update_id), from_user=user, chat_instance=str(self.id), message=message, data=step[3:]))
+        text = step[1:] if step.startswith('>') else self.press(step)
+        if text is None:
+            return None
+        return Update(update_id=update_id, message=Message(
+            message_id=update_id, date=now, chat=chat, from_user=user, text=text))
+
+
+class RecordingSession(BaseSession):
+    """
+    Bot session that answers like Bot API after <latency>
+    seconds and counts requests.
+
+    :param players: Players by chat id, shown what the bot sends.
+    :param latency: Seconds every request takes.
+    :param calls: Number of requests.
+    """
+
+    def __init__(self, players: Dict[int, Player], latency: float) -> None:
+        """
+        Constructor method.
+        """
+
+        super().__init__()
+        self.players: Dict[int, Player] = players
+        self.latency: float = latency
+        self.calls: int = 0
+        self.message_ids = itertools.count(1)
+
+    async def close(self) -> None:
+        """
+        Nothing to close, no connections are opened.
+        """
+
+    async def stream_content(self, *args: Any, **kwargs: Any) -> AsyncGenerator[bytes, None]:
+        """
+        Files are never downloaded by the game.
+        """
+
+        yield b''
+
+    async def make_request(self, bot: Bot, method: TelegramMethod, timeout: Optional[int] = None) -> Any:
+        """
+        Answers <method> like Bot API and shows it to the player of the chat.
+
+        :return: Sent or edited message, True for other methods.
+        """
+
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        chat = Chat(id=getattr(method, 'chat_id', 0) or 0, type='private')
+        result: Any = True
+        if isinstance(method, (SendMessage, SendPhoto, EditMessageText)):
+            message_id = getattr(method, 'message_id', None) or next(self.message_ids)
+            photo = [PhotoSize(file_id=f'photo-{message_id}', file_unique_id=str(message_id), width=1, height=1)]
+            result = Message(message_id=message_id, date=datetime.datetime.now(), chat=chat,
+                             photo=photo if isinstance(method, SendPhoto) else None)
+        player = self.players.get(chat.id)
+        if player is not None:
+            player.seen(method, getattr(result, 'message_id', None))
+        return result
+
+
+async def play(dp: Dispatcher, bot: Bot, player: Player, update_ids: itertools.count,
+               latencies: List[float], think: float) -> int:
+    """
+    Plays the route until the game is completed, the player
+    is stuck or has died more than MAX_RESTARTS times.
+
+    :return: Number of sent updates.
+    """
+
+    sent = 0
+    step = 0
+    while step < len(ROUTE):
+        update = player.update(next(update_ids), ROUTE[step])
+        if update is None:
+            player.stuck = ROUTE[step]
+            return sent
+
+        player.rest(ROUTE[step])
+        start = time.perf_counter()
+        result = await dp.feed_update(bot, update)
+        if isinstance(result, TelegramMethod):
+            await bot(result)
+        latencies.append(time.perf_counter() - start)
+        sent += 1
+        step = player.next_step(step)
+        if step is None:
+            return sent
+        if think:
+            await asyncio.sleep(think)
+    player.completed = player.last_text == tp.game_completed()
+    return sent
+
+
+def percentile(values: List[float], share: float) -> float:
+    """
+    Returns <share> percentile of sorted <values>,
+    NaN if there are none.
+    """
+
+    if not values:
+        return float('nan')
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+async def prepare() -> None:
+    """
+    Loads the world. Photo ids are kept in a temporary file,
+    so fake ids don't get into the real one.
+    """
+
+    await db.init_db()
+    await db.load_catalog()
+    file_ids.path = os.path.join(tempfile.mkdtemp(), 'file_ids.json')
+    file_ids.file_ids = {}
+
+
+def create_dispatcher(session: RecordingSession) -> Dispatcher:
+    """
+    Creates dispatcher with the middlewares of run.py.
+    """
+
+    dp = ordered_dispatcher(db.storage)
+    session.middleware(ApiMetricsMiddleware())
+    dp.update.outer_middleware(UpdateMetricsMiddleware())
+    dp.update.outer_middleware(SaveProtagonistMiddleware())
+    dp.update.outer_middleware(FlushStorageMiddleware())
+    dp.message.middleware(HandlerMetricsMiddleware())
+    dp.callback_query.middleware(HandlerMetricsMiddleware())
+    dp.include_router(router)
+    count_queries(db.engine)
+    return dp
+
+
+async def cleanup(bot: Bot) -> None:
+    """
+    Deletes protagonists and FSM records of simulated players.
+    """
+
+    async with db.engine.begin() as conn:
+        await conn.execute(delete(db.Player).where(db.Player.id >= FIRST_PLAYER_ID))
+        await conn.execute(delete(db.FSMRecord).where(db.FSMRecord.key.startswith(f'{bot.id}:')))
+    await db.engine.dispose()
+
+
+async def main(players_count: int, latency: float, think: float) -> int:
+    """
+    Runs <players_count> players at once through the real dispatcher.
+
+    :return: Exit code, 1 if no player has completed the game.
+    """
+
+    await prepare()
+
+    players = {FIRST_PLAYER_ID + i: Player(FIRST_PLAYER_ID + i) for i in range(players_count)}
+    session = RecordingSession(players, latency)
+    bot = Bot(BOT_TOKEN, session=session)
+    dp = create_dispatcher(session)
+
+    db.writer.start()
+    latencies: List[float] = []
+    update_ids = itertools.count(1)
+    start = time.perf_counter()
+    updates = sum(await asyncio.gather(*(play(dp, bot, player, update_ids, latencies, think)
+                                         for player in players.values())))
+    elapsed = time.perf_counter() - start
+    await db.writer.stop()
+
+    await cleanup(bot)
+
+    latencies.sort()
+    completed = sum(p.completed for p in players.values())
+    print(f'players:            {players_count}')
+    print(f'completed:          {completed}')
+    print(f'deaths:             {sum(p.deaths for p in players.values())}')
+    stuck = [p.stuck for p in players.values() if p.stuck]
+    if stuck:
+        print(f'stuck:              {len(stuck)} (first at {stuck[0]!r})')
+    print(f'updates:            {updates}')
+    if updates:
+        print(f'updates/s:          {updates / elapsed:.1f}')
+        print(f'latency p50/p95/p99: {percentile(latencies, 0.5) * 1000:.2f} / '
+              f'{percentile(latencies, 0.95) * 1000:.2f} / {percentile(latencies, 0.99) * 1000:.2f} ms')
+        print(f'API calls/update:   {session.calls / updates:.2f}')
+        queries = registry.histograms['bot_db_queries_per_update'][()]
+        print(f'DB queries/update:  {queries.sum / queries.count:.2f}')
+    return 0 if completed else 1
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Load test of the dispatcher with simulated players')
+    parser.add_argument('--players', type=int, default=20)
+    parser.add_argument('--latency', type=float, default=0.0, help='Bot API latency, in seconds')
+    parser.add_argument('--think', type=float, default=0.0, help='pause between updates of a player, in seconds')
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.players, args.latency, args.think)))
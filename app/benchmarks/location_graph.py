@@ -0,0 +1,140 @@
+import argparse
+import os
+import tempfile
+import time
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session, sessionmaker
+
+import database as db
+from database import QuestType
+from game import Protagonist
+
+
+def fill(path: str, locations: int, contents: int) -> None:
+    """
+    Creates database with a ring of <locations> locations,
+    every one with <contents> NPC giving a quest for an item
+    and <contents> enemies dropping an item.
+
+    :param path: Filepath of the database.
+    :param locations: Number of locations.
+    :param contents: Number of NPC and of enemies in a location.
+    """
+
+    engine = create_engine(f'sqlite:///{path}')
+    db.Base.metadata.create_all(engine)
+    with sessionmaker(bind=engine)() as session:
+        for loc in range(1, locations + 1):
+            session.add(db.Location(f'Location {loc}', 'Description', 1, id=loc))
+        for loc in range(1, locations + 1):
+            session.add(db.Direction(f'To {loc % locations + 1}', from_location_id=loc,
+                                     to_location_id=loc % locations + 1))
+            session.add(db.Direction(f'To {(loc - 2) % locations + 1}', from_location_id=loc,
+                                     to_location_id=(loc - 2) % locations + 1))
+            for i in range(contents):
+                n = (loc - 1) * contents + i + 1
+                session.add(db.Enemy(f'Enemy {n}', 'Description', 'Phrase', 1, 10, 1, id=n, location_id=loc))
+                session.add(db.Item(f'Item {n}', id=n, enemy_id=n))
+                session.add(db.NPC(f'NPC {n}', 'Description', 'Phrase', id=n, location_id=loc))
+                session.add(db.Quest(f'Quest {n}', 'Description', 'Congratulation', n, QuestType.Bring,
+                                     id=n, npc_id=n))
+        session.commit()
+    engine.dispose()
+
+
+def hydrate(location: db.Location) -> int:
+    """
+    Touches everything game.Location is built from.
+
+    :return: Number of touched rows.
+    """
+
+    rows = len(location.directions())
+    for npc in location.npc:
+        rows += 1 + sum(quest.goal_item is not None for quest in npc.quests)
+    for enemy in location.enemies:
+        rows += 1 + len(enemy.items)
+    return rows
+
+
+def moves(Session: sessionmaker, count: int, eager: bool) -> float:
+    """
+    Loads <count> locations one by one, as moves without
+    the catalog would do, in a new session every time.
+
+    :return: Milliseconds per move.
+    """
+
+    start = time.perf_counter()
+    for location_id in range(1, count + 1):
+        with Session() as session:
+            if eager:
+                location = session.scalars(db.location_graph(location_id)).one()
+            else:
+                location = session.get(db.Location, location_id)
+            hydrate(location)
+    return (time.perf_counter() - start) / count * 1000
+
+
+def catalog_moves(session: Session, count: int) -> tuple[float, float]:
+    """
+    Loads the catalog and moves a protagonist around the ring.
+
+    :return: Milliseconds of the load and microseconds per move.
+    """
+
+    start = time.perf_counter()
+    db.set_catalog(db.Catalog.load(session))
+    load = (time.perf_counter() - start) * 1000
+    protagonist = Protagonist('Bench', 1)
+    start = time.perf_counter()
+    for _ in range(count):
+        protagonist.go(protagonist.whereami().directions[0])
+    return load, (time.perf_counter() - start) / count * 1e6
+
+
+def main(locations: int, contents: list[int], count: int) -> None:
+    """
+    Compares statements and time of loading a location
+    with lazy loads and with location_graph() as it grows.
+    """
+
+    print(f'locations: {locations}, moves: {count}')
+    print(f'{"contents":>9}{"lazy stmts":>12}{"lazy ms":>10}{"eager stmts":>13}{"eager ms":>10}'
+          f'{"catalog stmts":>15}{"catalog ms":>12}{"go us":>8}')
+    for k in contents:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'bench.db')
+            fill(path, locations, k)
+            engine = create_engine(f'sqlite:///{path}')
+            executed = [0]
+
+            @event.listens_for(engine, 'before_cursor_execute')
+            def count_statement(*args) -> None:
+                executed[0] += 1
+
+            Session = sessionmaker(bind=engine)
+            loads = min(count, locations)
+            results = []
+            for eager in (False, True):
+                executed[0] = 0
+                ms = moves(Session, loads, eager)
+                results.append((executed[0] / loads, ms))
+            executed[0] = 0
+            with Session() as session:
+                load, go = catalog_moves(session, count)
+            engine.dispose()
+
+        (lazy_stmts, lazy_ms), (eager_stmts, eager_ms) = results
+        print(f'{k:>9}{lazy_stmts:>12.1f}{lazy_ms:>10.2f}{eager_stmts:>13.1f}{eager_ms:>10.2f}'
+              f'{executed[0]:>15}{load:>12.1f}{go:>8.2f}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Lazy vs eager location loading benchmark')
+    parser.add_argument('--locations', type=int, default=200)
+    parser.add_argument('--contents', type=int, nargs='+', default=[1, 10, 50])
+    parser.add_argument('--moves', type=int, default=100)
+    args = parser.parse_args()
+    main(args.locations, args.contents, args.moves)
@@ -0,0 +1,75 @@
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+from sqlalchemy.ext.asyncio import create_async_engine
+
+import database as db
+from database.persistence import WriteBehind
+from game import Protagonist
+
+
+async def player(prota: Protagonist, writer: WriteBehind, deadline: float, delays: list[float]) -> int:
+    """
+    Simulates one player doing an action every 50-150 ms.
+
+    :param prota: Protagonist of the player.
+    :param writer: WriteBehind instance.
+    :param deadline: perf_counter value to stop at.
+    :param delays: List where event loop delays are appended.
+    :return: Number of done actions.
+    """
+
+    actions = 0
+    while time.perf_counter() < deadline:
+        pause = random.uniform(0.05, 0.15)
+        start = time.perf_counter()
+        await asyncio.sleep(pause)
+        delays.append(time.perf_counter() - start - pause)
+        prota.take(f'item{random.randint(1, 20)}')
+        prota.killed_enemies.add(random.randint(1, 1000))
+        writer.mark_dirty(prota)
+        actions += 1
+    return actions
+
+
+async def main(players: int, seconds: float, interval: float) -> None:
+    """
+    Runs <players> players for <seconds> seconds and prints
+    write throughput.
+    """
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_async_engine(f'sqlite+aiosqlite:///{os.path.join(tmp, "bench.db")}')
+        async with engine.begin() as conn:
+            await conn.run_sync(db.Base.metadata.create_all)
+        writer = WriteBehind(engine, interval)
+        protas = [Protagonist(f'player{i}', i) for i in range(players)]
+        delays: list[float] = []
+        deadline = time.perf_counter() + seconds
+
+        writer.start()
+        actions = sum(await asyncio.gather(*(player(p, writer, deadline, delays) for p in protas)))
+        await writer.stop()
+        await engine.dispose()
+
+    delays.sort()
+    print(f'players:             {players}')
+    print(f'actions:             {actions} ({actions / seconds:.0f}/s)')
+    print(f'rows written:        {writer.rows_written} ({writer.rows_written / seconds:.0f}/s)')
+    print(f'flushes:             {writer.flushes}, {writer.rows_written / max(writer.flushes, 1):.0f} rows each')
+    print(f'write time:          {writer.flush_time / max(writer.flushes, 1) * 1000:.1f} ms per flush, '
+          f'{writer.rows_written / max(writer.flush_time, 1e-9):.0f} rows/s while writing')
+    print(f'loop delay p50/p99:  {delays[len(delays) // 2] * 1000:.2f} / {delays[int(len(delays) * 0.99)] * 1000:.2f} ms')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Write-behind persistence benchmark')
+    parser.add_argument('--players', type=int, default=5000)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--interval', type=float, default=db.persistence.FLUSH_INTERVAL)
+    args = parser.parse_args()
+    asyncio.run(main(args.players, args.seconds, args.interval))
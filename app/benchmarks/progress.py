@@ -0,0 +1,86 @@
+import argparse
+import random
+import time
+
+import database as db
+import templates as tp
+from database import QuestType
+from game import Protagonist, get_world
+
+
+def generate_catalog(enemies: int, quests: int, npcs: int = 10) -> db.Catalog:
+    """
+    Generates catalog of one location with <enemies> enemies
+    and <npcs> npcs sharing <quests> kill quests.
+    """
+
+    enemy_records = {
+        i: db.EnemyRecord(i, f'Enemy {i}', '', '', 1, 10, 1, '', 1, ())
+        for i in range(1, enemies + 1)
+    }
+    quest_records = {
+        i: db.QuestRecord(i, i % npcs + 1, f'NPC {i % npcs + 1}', f'Quest {i}', '', '', False,
+                          QuestType.Kill, random.randint(1, enemies))
+        for i in range(1, quests + 1)
+    }
+    npc_records = {
+        i: db.NPCRecord(i, f'NPC {i}', '', '', '', 1, tuple(q for q in quest_records if q % npcs + 1 == i))
+        for i in range(1, npcs + 1)
+    }
+    location = db.LocationRecord(1, 'Location', '', 1, '', (), tuple(npc_records), tuple(enemy_records))
+    return db.Catalog({1: location}, npc_records, enemy_records, {}, quest_records)
+
+
+def view(prota: Protagonist) -> None:
+    """
+    Does the work of showing a location and talking to every npc.
+    """
+
+    prota.location_enemies()
+    for npc in prota.current_location.npc:
+        tp.npc_marker(npc, prota)
+        for quest in prota.npc_quests(npc):
+            prota.can_complete(quest)
+
+
+def measure(prota: Protagonist, repeat: int) -> float:
+    """
+    Returns milliseconds spent for one view.
+    """
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        view(prota)
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main(sizes: list[int], repeat: int) -> None:
+    """
+    Compares progress kept in lists and in sets for worlds
+    with <sizes> enemies and quests.
+    """
+
+    print(f'{"size":>8}{"lists":>12}{"sets":>12}')
+    for size in sizes:
+        db.set_catalog(generate_catalog(size, size))
+        world = get_world()
+        prota = Protagonist('player', 1)
+        prota.killed_enemies = set(random.sample(sorted(world.enemies), size // 2))
+        prota.completed_quests = set(random.sample(sorted(world.quests), size // 2))
+        for quest_id in random.sample(sorted(set(world.quests) - prota.completed_quests), size // 10):
+            prota.take_quest(world.quests[quest_id])
+        prota.quest_status.rebuild()
+
+        sets = measure(prota, repeat)
+        prota.killed_enemies = list(prota.killed_enemies)
+        prota.completed_quests = list(prota.completed_quests)
+        lists = measure(prota, repeat)
+        print(f'{size:>8}{lists:>9.2f} ms{sets:>9.2f} ms')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Protagonist progress lookup benchmark')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 5000])
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+    main(args.sizes, args.repeat)
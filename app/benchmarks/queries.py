@@ -0,0 +1,78 @@
+import argparse
+import asyncio
+import collections
+import itertools
+import sys
+
+from aiogram import Bot
+from aiogram.methods import TelegramMethod
+
+import database as db
+import templates as tp
+from benchmarks.load import (BOT_TOKEN, FIRST_PLAYER_ID, ROUTE, Player, RecordingSession,
+                             cleanup, create_dispatcher, prepare)
+from sqltrace import QueryTracer, assert_query_budget
+
+
+async def main(budget: int, threshold: int, limit: int) -> int:
+    """
+    Plays the walkthrough with one player and shows which handlers
+    and game calls execute SQL, repeated statements and updates
+    that went over <budget> statements.
+
+    :return: Exit code, 1 if the player hasn't completed the game.
+    """
+
+    await prepare()
+    player = Player(FIRST_PLAYER_ID)
+    session = RecordingSession({player.id: player}, 0)
+    bot = Bot(BOT_TOKEN, session=session)
+    dp = create_dispatcher(session)
+    tracer = QueryTracer(db.engine, threshold)
+
+    updates = collections.Counter()
+    over_budget = []
+    update_ids = itertools.count(1)
+    step = 0
+    while step < len(ROUTE):
+        update = player.update(next(update_ids), ROUTE[step])
+        if update is None:
+            print(f'stuck at {ROUTE[step]!r}')
+            break
+
+        player.rest(ROUTE[step])
+        result = None
+        try:
+            with assert_query_budget(db.engine, budget) as statements:
+                result = await dp.feed_update(bot, update)
+        except AssertionError:
+            over_budget.append((ROUTE[step], len(statements)))
+        if isinstance(result, TelegramMethod):
+            await bot(result)
+        updates[ROUTE[step]] += 1
+        step = player.next_step(step)
+        if step is None:
+            break
+    player.completed = player.last_text == tp.game_completed()
+    await db.writer.flush()
+    await cleanup(bot)
+
+    print(tracer.report(limit))
+    print()
+    print(f'completed:          {player.completed}')
+    print(f'deaths:             {player.deaths}')
+    print(f'updates:            {sum(updates.values())}')
+    print(f'statements:         {sum(tracer.queries.values())}')
+    print(f'over budget of {budget}:   {len(over_budget)}')
+    for step, count in over_budget:
+        print(f'  {count:>3}  {step}')
+    return 0 if player.completed else 1
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='SQL statements of the walkthrough by handler and caller')
+    parser.add_argument('--budget', type=int, default=2, help='allowed statements per update')
+    parser.add_argument('--threshold', type=int, default=3, help='repeats of a statement reported as N+1')
+    parser.add_argument('--limit', type=int, default=20, help='number of statements to show')
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.budget, args.threshold, args.limit)))
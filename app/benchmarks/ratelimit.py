@@ -0,0 +1,107 @@
+import argparse
+import asyncio
+import collections
+import datetime
+import time
+
+from aiogram import Bot
+from aiogram.client.session.base import BaseSession
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import SendMessage
+from aiogram.types import Chat, Message
+
+import ratelimit
+from ratelimit import RateLimitMiddleware, RateLimiter
+
+
+class FloodSession(BaseSession):
+    """
+    Session that answers like Bot API with flood control:
+    more than <global_limit> messages per second or more than
+    <chat_limit> messages per second in one chat are rejected.
+    """
+
+    def __init__(self, global_limit: int, chat_limit: int, latency: float) -> None:
+        super().__init__()
+        self.global_limit = global_limit
+        self.chat_limit = chat_limit
+        self.latency = latency
+        self.sent = collections.deque()
+        self.chats = collections.defaultdict(collections.deque)
+        self.delivered = 0
+        self.rejected = 0
+
+    async def close(self) -> None:
+        pass
+
+    async def stream_content(self, *args, **kwargs):
+        yield b''
+
+    async def make_request(self, bot: Bot, method: SendMessage, timeout=None) -> Message:
+        await asyncio.sleep(self.latency)
+        now = time.perf_counter()
+        chat = self.chats[method.chat_id]
+        for window in (self.sent, chat):
+            while window and window[0] < now - 1:
+                window.popleft()
+        if len(self.sent) >= self.global_limit or len(chat) >= self.chat_limit:
+            self.rejected += 1
+            raise TelegramRetryAfter(method, 'Too Many Requests', 1)
+        self.sent.append(now)
+        chat.append(now)
+        self.delivered += 1
+        return Message(message_id=self.delivered, date=datetime.datetime.now(),
+                       chat=Chat(id=method.chat_id, type='private'), text=method.text)
+
+
+async def send(bot: Bot, chat_id: int) -> bool:
+    """
+    Sends one message, returns False if it was rejected.
+    """
+
+    try:
+        await bot.send_message(chat_id, 'text')
+        return True
+    except TelegramRetryAfter:
+        return False
+
+
+async def burst(limited: bool, messages: int, chats: int, latency: float) -> None:
+    """
+    Sends <messages> messages to <chats> chats at once
+    and prints how many were delivered and how fast.
+    """
+
+    session = FloodSession(30, ratelimit.CHAT_BURST + ratelimit.CHAT_RATE, latency)
+    bot = Bot('42:TEST', session=session)
+    limiter = RateLimiter()
+    if limited:
+        session.middleware(RateLimitMiddleware(limiter))
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(send(bot, i % chats + 1) for i in range(messages)))
+    elapsed = time.perf_counter() - start
+    name = 'limited' if limited else 'direct'
+    print(f'{name:<10}{sum(results):>10}{messages - sum(results):>8}{session.rejected:>10}'
+          f'{elapsed:>9.2f} s{sum(results) / elapsed:>10.1f}')
+    if limited:
+        print(limiter.metrics())
+
+
+async def main(messages: int, chats: int, latency: float) -> None:
+    """
+    Compares sending a burst directly and through the rate limiter.
+    """
+
+    print(f'{"mode":<10}{"delivered":>10}{"failed":>8}{"rejected":>10}{"time":>11}{"msg/s":>10}')
+    await burst(False, messages, chats, latency)
+    await burst(True, messages, chats, latency)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Outbound rate limiter benchmark')
+    parser.add_argument('--messages', type=int, default=300)
+    parser.add_argument('--chats', type=int, default=50)
+    parser.add_argument('--latency', type=float, default=0.05, help='Bot API latency, in seconds')
+    args = parser.parse_args()
+    asyncio.run(main(args.messages, args.chats, args.latency))
@@ -0,0 +1,90 @@
+import argparse
+import asyncio
+import os
+import tempfile
+import tracemalloc
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+import database as db
+from benchmarks.async_db import fill
+from database.pool import SessionPool
+
+
+def open_files() -> int:
+    """
+    Returns number of file descriptors opened by the process.
+    """
+
+    return len(os.listdir('/proc/self/fd'))
+
+
+async def held_sessions(path: str, players: int) -> dict:
+    """
+    Every player keeps his own session, like Protagonist used to.
+    """
+
+    engine = create_async_engine(f'sqlite+aiosqlite:///{path}')
+    Session = async_sessionmaker(bind=engine)
+    sessions = []
+    tracemalloc.start()
+    for i in range(players):
+        session = Session()
+        (await session.scalars(select(db.Enemy.name).where(db.Enemy.id == i % 100 + 1))).first()
+        sessions.append(session)
+    result = {'memory': tracemalloc.get_traced_memory()[0], 'files': open_files(), 'connections': len(sessions)}
+    tracemalloc.stop()
+    for session in sessions:
+        await session.close()
+    await engine.dispose()
+    return result
+
+
+async def pooled_sessions(path: str, players: int) -> dict:
+    """
+    Every player takes a session from SessionPool for each query.
+    """
+
+    engine = create_async_engine(f'sqlite+aiosqlite:///{path}', poolclass=AsyncAdaptedQueuePool,
+                                 pool_size=db.POOL_SIZE, max_overflow=0)
+    pool = SessionPool(engine)
+
+    async def player(i: int) -> None:
+        async with pool.session_scope() as session:
+            (await session.scalars(select(db.Enemy.name).where(db.Enemy.id == i % 100 + 1))).first()
+
+    tracemalloc.start()
+    await asyncio.gather(*(player(i) for i in range(players)))
+    result = {'memory': tracemalloc.get_traced_memory()[0], 'files': open_files(),
+              'connections': engine.sync_engine.pool.checkedin()}
+    tracemalloc.stop()
+    result.update(pool.metrics())
+    await engine.dispose()
+    return result
+
+
+async def main(players: list[int]) -> None:
+    """
+    Prints memory, open files and connections for
+    held and pooled sessions.
+    """
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.db')
+        fill(path, 100)
+        print(f'{"players":>8}{"mode":>8}{"memory":>12}{"files":>8}{"conns":>8}{"reuse":>8}{"waits":>8}')
+        for n in players:
+            held = await held_sessions(path, n)
+            pooled = await pooled_sessions(path, n)
+            print(f'{n:>8}{"held":>8}{held["memory"] / 1024:>9.0f} KB{held["files"]:>8}{held["connections"]:>8}')
+            print(f'{n:>8}{"pool":>8}{pooled["memory"] / 1024:>9.0f} KB{pooled["files"]:>8}{pooled["connections"]:>8}'
+                  f'{pooled["reuse"]:>8.2f}{pooled["waits"]:>8}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Held sessions vs session pool benchmark')
+    parser.add_argument('--players', type=int, nargs='+', default=[10, 100, 500])
+    args = parser.parse_args()
+    asyncio.run(main(args.players))
@@ -0,0 +1,83 @@
+import argparse
+import asyncio
+import json
+import os
+import resource
+import tempfile
+import time
+
+from sqlalchemy.ext.asyncio import create_async_engine
+
+import load_all
+
+
+def write_world(path: str, entities: int) -> None:
+    """
+    Writes world file with about <entities> entities: a ring of
+    locations, every one with ten enemies dropping an item and
+    ten NPC giving a quest for it. Written entity by entity.
+
+    :param path: Filepath of the world.
+    :param entities: Number of entities.
+    """
+
+    locations = max(1, entities // 43)
+    count = locations * 10
+
+    def section(fp, name: str, rows, last: bool = False) -> None:
+        fp.write(f'"{name}": [\n')
+        for i, row in enumerate(rows):
+            fp.write((',\n' if i else '') + json.dumps(row, ensure_ascii=False))
+        fp.write('\n]' + ('\n' if last else ',\n'))
+
+    with open(path, 'w', encoding='utf-8') as fp:
+        fp.write('{\n')
+        section(fp, 'locations', ({'id': i, 'name': f'Локация {i}', 'description': 'Описание', 'level': 1 + i % 20,
+                                   'image': f'img/location{i}.jpg'} for i in range(1, locations + 1)))
+        section(fp, 'directions', ({'id': i, 'name': f'Идти {i}', 'from_location_id': (i - 1) // 2 + 1,
+                                    'to_location_id': ((i - 1) // 2 + (1 if i % 2 else -1)) % locations + 1}
+                                   for i in range(1, 2 * locations + 1)))
+        section(fp, 'npc', ({'id': i, 'name': f'NPC {i}', 'description': 'Описание', 'phrase': 'Привет',
+                             'location_id': (i - 1) // 10 + 1} for i in range(1, count + 1)))
+        section(fp, 'enemies', ({'id': i, 'name': f'Враг {i}', 'description': 'Описание', 'phrase': 'Грр',
+                                 'level': 1 + i % 20, 'health': 10, 'damage': 1, 'location_id': (i - 1) // 10 + 1}
+                                for i in range(1, count + 1)))
+        section(fp, 'items', ({'id': i, 'name': f'Предмет {i}', 'enemy_id': i} for i in range(1, count + 1)))
+        section(fp, 'quests', ({'id': i, 'name': f'Квест {i}', 'description': 'Описание',
+                                'congratulation': 'Спасибо', 'npc_id': i, 'goal_item_id': i}
+                               for i in range(1, count + 1)), last=True)
+        fp.write('}\n')
+
+
+async def main(entities: int, chunk: int) -> None:
+    """
+    Loads a generated world twice into an empty temporary database
+    and prints time and peak memory of the process.
+    """
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'world.json')
+        write_world(path, entities)
+        print(f'world file: {os.path.getsize(path) / 2 ** 20:.1f} MB')
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        engine = create_async_engine(f'sqlite+aiosqlite:///{os.path.join(tmp, "bench.db")}')
+        try:
+            for run in ('first load', 'reload'):
+                print(run)
+                start = time.perf_counter()
+                stats = await load_all.load_world(path, chunk, bind=engine)
+                elapsed = time.perf_counter() - start
+                load_all.print_stats(stats, elapsed)
+                print(f'{elapsed:.1f} s')
+        finally:
+            await engine.dispose()
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        print(f'peak memory: {rss / 1024:.0f} MB before, {peak / 1024:.0f} MB after')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Streaming world loader benchmark')
+    parser.add_argument('--entities', type=int, default=1_000_000)
+    parser.add_argument('--chunk', type=int, default=load_all.CHUNK_SIZE)
+    args = parser.parse_args()
+    asyncio.run(main(args.entities, args.chunk))
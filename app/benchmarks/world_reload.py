@@ -0,0 +1,94 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import shutil
+import tempfile
+import time
+from types import SimpleNamespace
+
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+import database as db
+import load_all
+from benchmarks.load import FIRST_PLAYER_ID
+from game import Protagonist, get_proto_from_msg, get_world, protagonists
+from world_reload import WorldReloader, format_changes
+
+
+def fill_players(count: int) -> None:
+    """
+    Puts <count> protagonists online in random locations,
+    with taken quests and a wounded enemy.
+    """
+
+    world = get_world()
+    locations = list(world.locations.values())
+    quests = list(world.quests.values())
+    for i in range(count):
+        prota = Protagonist(f'Player {i}', FIRST_PLAYER_ID + i)
+        prota.current_location = random.choice(locations)
+        prota.current_quests = {q.id: q for q in random.sample(quests, min(3, len(quests)))}
+        if prota.current_location.enemies:
+            prota.opponent(prota.current_location.enemies[0]).hp -= 1
+        prota.quest_status.rebuild()
+        protagonists[prota.id] = prota
+
+
+def edit_world(path: str) -> None:
+    """
+    Changes stats of every enemy and removes the last quest.
+    """
+
+    with open(path, 'r', encoding='utf-8') as fp:
+        data = json.load(fp)
+    for enemy in data['enemies']:
+        enemy['health'] += 1
+    data['quests'].pop()
+    with open(path, 'w', encoding='utf-8') as fp:
+        json.dump(data, fp, ensure_ascii=False)
+
+
+async def main(players: int) -> None:
+    """
+    Reloads an edited copy of the world with <players>
+    protagonists online and prints how long it took,
+    and how long the first update of a player takes after it.
+    Everything runs on a temporary database.
+    """
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_async_engine(f'sqlite+aiosqlite:///{os.path.join(tmp, "bench.db")}')
+        await load_all.load_world(load_all.DATA_FILE, bind=engine)
+        async with AsyncSession(engine) as session:
+            db.set_catalog(await session.run_sync(db.Catalog.load))
+        fill_players(players)
+
+        path = os.path.join(tmp, 'world.json')
+        shutil.copy(load_all.DATA_FILE, path)
+        edit_world(path)
+        reloader = WorldReloader(path, bind=engine, storage=db.SQLiteStorage(engine))
+        start = time.perf_counter()
+        changes = await reloader.reload()
+        elapsed = time.perf_counter() - start
+        start = time.perf_counter()
+        for user_id in list(protagonists):
+            get_proto_from_msg(SimpleNamespace(from_user=SimpleNamespace(id=user_id)))
+        catch_up = (time.perf_counter() - start) / max(1, len(protagonists))
+        await engine.dispose()
+    print(f'players online: {players}')
+    print(f'changes:        {format_changes(changes)}')
+    print(f'reload:         {elapsed * 1000:.1f} ms')
+    print(f'write:          {reloader.write_time * 1000:.1f} ms')
+    print(f'swap:           {reloader.swap_time * 1000:.1f} ms')
+    print(f'first update:   {catch_up * 1e6:.1f} us per player')
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    parser = argparse.ArgumentParser(description='Hot reload of the world with players online')
+    parser.add_argument('--players', type=int, default=10000)
+    args = parser.parse_args()
+    asyncio.run(main(args.players))
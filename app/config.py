@@ -2,3 +2,16 @@ from os import getenv
 
 
 TG_TOKEN = getenv("TG_TOKEN")
+PREWARM_CHAT_ID = getenv("PREWARM_CHAT_ID")
+WEBHOOK_URL = getenv("WEBHOOK_URL")
+WEBHOOK_PATH = getenv("WEBHOOK_PATH", "/webhook")
+WEBHOOK_SECRET = getenv("WEBHOOK_SECRET")
+WEBHOOK_HOST = getenv("WEBHOOK_HOST", "0.0.0.0")
+WEBHOOK_PORT = int(getenv("WEBHOOK_PORT", "8080"))
+WEBHOOK_MAX_CONNECTIONS = int(getenv("WEBHOOK_MAX_CONNECTIONS", "40"))
+MAX_CONCURRENT_UPDATES = int(getenv("MAX_CONCURRENT_UPDATES", "100"))
+METRICS_HOST = getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(getenv("METRICS_PORT", "9100"))
+SQL_TRACE = getenv("SQL_TRACE")
+WORLD_FILE = getenv("WORLD_FILE", "default_db.json")
+WORLD_RELOAD_INTERVAL = float(getenv("WORLD_RELOAD_INTERVAL", "0"))
@@ -1,9 +1,70 @@
-from .schemas import QuestType, Base, Location, Direction, NPC, Enemy, Item, Quest
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from typing import Optional
+
+from .schemas import (QuestType, Base, Location, Direction, NPC, Enemy, Item, Quest, Player, FSMRecord,
+                      create_schema)
+from .catalog import (Catalog, CatalogChanges, LocationRecord, DirectionRecord, NPCRecord, EnemyRecord, ItemRecord,
+                      QuestRecord, location_graph)
+from .persistence import WriteBehind
+from .pool import POOL_SIZE, SessionPool
+from .storage import SQLiteStorage
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 DB_NAME = 'main.db'
 
-engine = create_engine(f'sqlite:///{DB_NAME}')
-Base.metadata.create_all(engine)
-Session = sessionmaker(bind=engine)
+# aiosqlite uses NullPool by default and connects on every checkout.
+# Two more connections are for the writer and the FSM storage.
+engine = create_async_engine(f'sqlite+aiosqlite:///{DB_NAME}', poolclass=AsyncAdaptedQueuePool,
+                             pool_size=POOL_SIZE + 2, max_overflow=0)
+pool = SessionPool(engine, POOL_SIZE)
+session_scope = pool.session_scope
+writer = WriteBehind(engine)
+storage = SQLiteStorage(engine)
+
+_catalog: Optional[Catalog] = None
+
+
+async def init_db() -> None:
+    """
+    Creates missing tables and indexes.
+    """
+
+    async with engine.begin() as conn:
+        await conn.run_sync(create_schema)
+
+
+async def load_catalog() -> Catalog:
+    """
+    Reads the world catalog from the database.
+    Should be called on startup.
+
+    :return: Catalog of the static world.
+    """
+
+    global _catalog
+    async with session_scope() as session:
+        _catalog = await session.run_sync(Catalog.load)
+    return _catalog
+
+
+def set_catalog(catalog: Catalog) -> None:
+    """
+    Replaces the world catalog, when the world is reloaded.
+
+    :param catalog: New catalog.
+    """
+
+    global _catalog
+    _catalog = catalog
+
+
+def get_catalog() -> Catalog:
+    """
+    Returns the world catalog read by load_catalog().
+
+    :return: Catalog of the static world.
+    """
+
+    if _catalog is None:
+        raise RuntimeError('World catalog is not loaded')
+    return _catalog
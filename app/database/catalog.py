@@ -0,0 +1,289 @@
+from types import MappingProxyType
+from typing import Mapping, NamedTuple, Tuple
+
+from sqlalchemy import Select, select
+from sqlalchemy.orm import Session, configure_mappers, selectinload
+
+from .schemas import QuestType, Location, Direction, NPC, Enemy, Item, Quest
+
+
+class DirectionRecord(NamedTuple):
+    """
+    Immutable snapshot of a direction.
+
+    :param name: name of direction.
+    :param location_id: id of location where direction leads to.
+    :param location_level: minimal level to enter that location.
+    """
+
+    name: str
+    location_id: int
+    location_level: int
+
+
+class LocationRecord(NamedTuple):
+    """
+    Immutable snapshot of a location.
+
+    :param id: id in database.
+    :param name: name of location.
+    :param description: description of location.
+    :param level: minimal level of protagonist to enter location.
+    :param image: filepath of location image.
+    :param directions: directions from this location to others.
+    :param npc: ids of NPC on this location.
+    :param enemies: ids of Enemies on this location.
+    """
+
+    id: int
+    name: str
+    description: str
+    level: int
+    image: str
+    directions: Tuple[DirectionRecord, ...]
+    npc: Tuple[int, ...]
+    enemies: Tuple[int, ...]
+
+
+class NPCRecord(NamedTuple):
+    """
+    Immutable snapshot of a NPC.
+
+    :param id: id in database.
+    :param name: name of NPC.
+    :param description: description of NPC.
+    :param phrase: phrase of NPC.
+    :param image: filepath of NPC image.
+    :param location_id: id of location of NPC.
+    :param quests: ids of Quests given by this NPC.
+    """
+
+    id: int
+    name: str
+    description: str
+    phrase: str
+    image: str
+    location_id: int
+    quests: Tuple[int, ...]
+
+
+class EnemyRecord(NamedTuple):
+    """
+    Immutable snapshot of an Enemy.
+
+    :param id: id in database.
+    :param name: name of Enemy.
+    :param description: description of Enemy.
+    :param phrase: phrase of Enemy.
+    :param level: Enemy level.
+    :param health: Enemy health.
+    :param damage: Enemy damage.
+    :param image: filepath of Enemy image.
+    :param location_id: id of location of Enemy.
+    :param items: names of Items dropped by this Enemy.
+    """
+
+    id: int
+    name: str
+    description: str
+    phrase: str
+    level: int
+    health: int
+    damage: int
+    image: str
+    location_id: int
+    items: Tuple[str, ...]
+
+
+class ItemRecord(NamedTuple):
+    """
+    Immutable snapshot of an Item.
+
+    :param id: id in database.
+    :param name: name of Item.
+    :param enemy_id: id of Enemy that drops this item.
+    """
+
+    id: int
+    name: str
+    enemy_id: int
+
+
+class QuestRecord(NamedTuple):
+    """
+    Immutable snapshot of a Quest with resolved goal.
+
+    :param id: id in database.
+    :param npc_id: id of NPC that gives this quest.
+    :param npc_name: name of NPC that gives this quest.
+    :param name: name of Quest.
+    :param description: Quest description.
+    :param congratulation: Quest congratulation.
+    :param is_final: is it the last quest of the game.
+    :param quest_type: type of the quest.
+    :param goal: enemy id for Kill, item name for Bring,
+        npc id for Talk quests.
+    """
+
+    id: int
+    npc_id: int
+    npc_name: str
+    name: str
+    description: str
+    congratulation: str
+    is_final: bool
+    quest_type: QuestType
+    goal: str | int
+
+
+class CatalogChanges(NamedTuple):
+    """
+    Difference of one kind of entities between two catalogs.
+
+    :param added: ids only in the new catalog.
+    :param removed: ids only in the old catalog.
+    :param changed: ids in both with different records.
+    """
+
+    added: frozenset[int]
+    removed: frozenset[int]
+    changed: frozenset[int]
+
+
+"""
+Kinds of entities of Catalog.
+"""
+CATALOG_KINDS = ('locations', 'npc', 'enemies', 'items', 'quests')
+
+
+class Catalog:
+    """
+    Read-only in-memory copy of the static world.
+    Every entity is indexed by its id in database.
+
+    :param locations: Locations by id.
+    :param npc: NPCs by id.
+    :param enemies: Enemies by id.
+    :param items: Items by id.
+    :param quests: Quests by id.
+    """
+
+    def __init__(self, locations: dict[int, LocationRecord], npc: dict[int, NPCRecord],
+                 enemies: dict[int, EnemyRecord], items: dict[int, ItemRecord],
+                 quests: dict[int, QuestRecord]) -> None:
+        """
+        Constructor method.
+        """
+
+        self.locations: Mapping[int, LocationRecord] = MappingProxyType(locations)
+        self.npc: Mapping[int, NPCRecord] = MappingProxyType(npc)
+        self.enemies: Mapping[int, EnemyRecord] = MappingProxyType(enemies)
+        self.items: Mapping[int, ItemRecord] = MappingProxyType(items)
+        self.quests: Mapping[int, QuestRecord] = MappingProxyType(quests)
+
+    def diff(self, new: 'Catalog') -> dict[str, CatalogChanges]:
+        """
+        Compares the catalog with the <new> one. Records are tuples,
+        so they are compared by value.
+
+        :param new: Catalog to compare with.
+        :return: Changes by kind of entities, kinds without changes are left out.
+        """
+
+        result = {}
+        for kind in CATALOG_KINDS:
+            old_records, new_records = getattr(self, kind), getattr(new, kind)
+            changes = CatalogChanges(
+                frozenset(new_records.keys() - old_records.keys()),
+                frozenset(old_records.keys() - new_records.keys()),
+                frozenset(i for i in old_records.keys() & new_records.keys() if old_records[i] != new_records[i]),
+            )
+            if any(changes):
+                result[kind] = changes
+        return result
+
+    @classmethod
+    def load(cls, session: Session) -> 'Catalog':
+        """
+        Reads the whole world by location_graph(), so the number
+        of queries doesn't depend on the size of the world.
+
+        :param session: Session of the database.
+        :return: Filled catalog.
+        """
+
+        locations = session.scalars(location_graph()).all()
+
+        location_records: dict[int, LocationRecord] = {}
+        npc_records: dict[int, NPCRecord] = {}
+        enemy_records: dict[int, EnemyRecord] = {}
+        item_records: dict[int, ItemRecord] = {}
+        quest_records: dict[int, QuestRecord] = {}
+        for loc in locations:
+            for npc in sorted(loc.npc, key=by_id):
+                quests = sorted(npc.quests, key=by_id)
+                for quest in quests:
+                    quest_type = quest.type()
+                    if quest_type == QuestType.Kill:
+                        goal = quest.goal_enemy_id
+                    elif quest_type == QuestType.Bring:
+                        goal = quest.goal_item.name
+                    else:
+                        goal = quest.goal_npc_id
+                    quest_records[quest.id] = QuestRecord(quest.id, npc.id, npc.name, quest.name,
+                                                          quest.description, quest.congratulation,
+                                                          bool(quest.is_final), quest_type, goal)
+                npc_records[npc.id] = NPCRecord(npc.id, npc.name, npc.description, npc.phrase, npc.image,
+                                                loc.id, tuple(quest.id for quest in quests))
+            for enemy in sorted(loc.enemies, key=by_id):
+                items = sorted(enemy.items, key=by_id)
+                for item in items:
+                    item_records[item.id] = ItemRecord(item.id, item.name, enemy.id)
+                enemy_records[enemy.id] = EnemyRecord(enemy.id, enemy.name, enemy.description, enemy.phrase,
+                                                      enemy.level, enemy.health, enemy.damage, enemy.image,
+                                                      loc.id, tuple(item.name for item in items))
+            location_records[loc.id] = LocationRecord(
+                loc.id, loc.name, loc.description, loc.level, loc.image,
+                tuple(DirectionRecord(d.name, d.to_location.id, d.to_location.level)
+                      for d in sorted(loc.from_directions, key=by_id)),
+                tuple(npc.id for npc in sorted(loc.npc, key=by_id)),
+                tuple(enemy.id for enemy in sorted(loc.enemies, key=by_id)))
+
+        quest_records = dict(sorted(quest_records.items()))
+        item_records = dict(sorted(item_records.items()))
+        return cls(location_records, dict(sorted(npc_records.items())), dict(sorted(enemy_records.items())),
+                   item_records, quest_records)
+
+
+def by_id(row: Location | Direction | NPC | Enemy | Item | Quest) -> int:
+    """
+    Sort key of database rows, selectin loads don't keep order.
+    """
+
+    return row.id
+
+
+def location_graph(*location_ids: int) -> Select:
+    """
+    Returns query of locations with everything game.Location needs
+    loaded eagerly: directions with the locations they lead to,
+    NPC with their quests and goal items, enemies with their items.
+    It takes six statements however much a location holds, against
+    a lazy load for every relationship of every row. Selectin loads
+    ask for at most 500 parents at once, so the whole world of a few
+    thousand rows takes some more.
+
+    :param location_ids: ids of locations, all locations if empty.
+    :return: Select of Location.
+    """
+
+    # from_directions is a backref, it exists after mappers are configured.
+    configure_mappers()
+    query = select(Location).options(
+        selectinload(Location.from_directions).joinedload(Direction.to_location),
+        selectinload(Location.npc).selectinload(NPC.quests).joinedload(Quest.goal_item),
+        selectinload(Location.enemies).selectinload(Enemy.items),
+    ).order_by(Location.id)
+    if location_ids:
+        query = query.where(Location.id.in_(location_ids))
+    return query
@@ -0,0 +1,146 @@
+import asyncio
+import logging
+import time
+from typing import Any, Optional, Protocol
+
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from .schemas import Player
+
+
+FLUSH_INTERVAL = 0.25
+
+logger = logging.getLogger(__name__)
+
+
+class Persistable(Protocol):
+    """
+    Anything that can be saved as a row of player table.
+    """
+
+    id: int
+
+    def to_row(self) -> dict[str, Any]:
+        ...
+
+
+class WriteBehind:
+    """
+    Saves changed protagonists in background. Changes are
+    collected in memory and written every <interval> seconds
+    with one transaction for all of them.
+
+    :param engine: Engine of the database.
+    :param interval: Seconds between flushes.
+    :param dirty: Protagonists changed since last flush by id.
+    :param flushes: Number of done flushes.
+    :param rows_written: Number of written rows.
+    :param flush_time: Seconds spent in writing.
+    """
+
+    def __init__(self, engine: AsyncEngine, interval: float = FLUSH_INTERVAL) -> None:
+        """
+        Constructor method.
+        """
+
+        self.engine: AsyncEngine = engine
+        self.interval: float = interval
+        self.dirty: dict[int, Persistable] = {}
+        self.flushes: int = 0
+        self.rows_written: int = 0
+        self.flush_time: float = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def mark_dirty(self, protagonist: Persistable) -> None:
+        """
+        Schedules <protagonist> to be saved with next flush.
+
+        :param protagonist: Changed protagonist.
+        """
+
+        self.dirty[protagonist.id] = protagonist
+
+    async def load(self) -> list[dict[str, Any]]:
+        """
+        Reads all saved protagonists.
+
+        :return: List of rows.
+        """
+
+        async with self.engine.connect() as conn:
+            return [dict(row._mapping) for row in await conn.execute(select(Player.__table__))]
+
+    async def flush(self) -> int:
+        """
+        Writes all dirty protagonists in one transaction.
+        Handlers are not waiting for it.
+
+        :return: Number of written rows.
+        """
+
+        if not self.dirty:
+            return 0
+        dirty, self.dirty = self.dirty, {}
+        rows = [p.to_row() for p in dirty.values()]
+        start = time.perf_counter()
+        try:
+            await self._write(rows)
+        except Exception:
+            for protagonist_id, protagonist in dirty.items():
+                self.dirty.setdefault(protagonist_id, protagonist)
+            raise
+        self.flush_time += time.perf_counter() - start
+        self.flushes += 1
+        self.rows_written += len(rows)
+        return len(rows)
+
+    async def _write(self, rows: list[dict[str, Any]]) -> None:
+        """
+        Upserts <rows> to the player table.
+
+        :param rows: Rows to write.
+        """
+
+        stmt = insert(Player)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Player.id],
+            set_={c.name: stmt.excluded[c.name] for c in Player.__table__.columns if c.name != 'id'}
+        )
+        async with self.engine.begin() as conn:
+            await conn.execute(stmt, rows)
+
+    async def run(self) -> None:
+        """
+        Flushes dirty protagonists every <interval> seconds.
+        """
+
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception('Failed to save protagonists')
+
+    def start(self) -> None:
+        """
+        Starts flushing in background task.
+        """
+
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        """
+        Stops background task and writes what is left.
+        """
+
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
@@ -0,0 +1,106 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+
+
+POOL_SIZE = 5
+
+
+class SessionPool:
+    """
+    Gives short sessions for one unit of work. Not more than
+    <size> sessions are open at once, others wait for a free one,
+    so the number of connections does not grow with players.
+
+    :param engine: Engine of the database.
+    :param size: Maximum number of open sessions.
+    :param in_use: Number of open sessions.
+    :param max_in_use: Maximum number of sessions open at once.
+    :param sessions: Number of given sessions.
+    :param waits: Number of sessions that had to wait for a free slot.
+    :param wait_time: Seconds spent waiting for a free slot.
+    :param connects: Number of new connections to the database.
+    :param checkouts: Number of connections taken from the engine pool.
+    """
+
+    def __init__(self, engine: AsyncEngine, size: int = POOL_SIZE) -> None:
+        """
+        Constructor method.
+        """
+
+        self.engine: AsyncEngine = engine
+        self.size: int = size
+        self.in_use: int = 0
+        self.max_in_use: int = 0
+        self.sessions: int = 0
+        self.waits: int = 0
+        self.wait_time: float = 0.0
+        self.connects: int = 0
+        self.checkouts: int = 0
+        self._semaphore = asyncio.Semaphore(size)
+        self._sessionmaker = async_sessionmaker(bind=engine, expire_on_commit=False)
+        event.listen(engine.sync_engine, 'connect', self._on_connect)
+        event.listen(engine.sync_engine, 'checkout', self._on_checkout)
+
+    def _on_connect(self, *args: Any) -> None:
+        """
+        Counts connections opened by the engine.
+        """
+
+        self.connects += 1
+
+    def _on_checkout(self, *args: Any) -> None:
+        """
+        Counts connections taken from the engine pool.
+        """
+
+        self.checkouts += 1
+
+    @asynccontextmanager
+    async def session_scope(self) -> AsyncIterator[AsyncSession]:
+        """
+        Opens a session and closes it after the block,
+        committing if the block made no error.
+
+        :return: Session of the database.
+        """
+
+        if self._semaphore.locked():
+            self.waits += 1
+            start = time.perf_counter()
+            await self._semaphore.acquire()
+            self.wait_time += time.perf_counter() - start
+        else:
+            await self._semaphore.acquire()
+        self.in_use += 1
+        self.max_in_use = max(self.max_in_use, self.in_use)
+        self.sessions += 1
+        try:
+            async with self._sessionmaker.begin() as session:
+                yield session
+        finally:
+            self.in_use -= 1
+            self._semaphore.release()
+
+    def metrics(self) -> dict[str, Any]:
+        """
+        Returns current numbers of the pool.
+
+        :return: Dictionary of metrics.
+        """
+
+        return {
+            'size': self.size,
+            'in_use': self.in_use,
+            'max_in_use': self.max_in_use,
+            'sessions': self.sessions,
+            'waits': self.waits,
+            'wait_time': self.wait_time,
+            'connects': self.connects,
+            'checkouts': self.checkouts,
+            'reuse': 1 - self.connects / self.checkouts if self.checkouts else 0.0,
+        }
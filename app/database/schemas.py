@@ -1,8 +1,10 @@
 from enum import Enum
 from typing import List, Optional, Tuple
 
-from sqlalchemy import ForeignKey, String, Integer, UniqueConstraint, Boolean
+from sqlalchemy import (ForeignKey, String, Integer, UniqueConstraint, Boolean, Float, JSON, Connection,
+                        ColumnElement, Index, func, literal_column)
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
+from sqlalchemy.schema import CreateIndex
 
 
 class QuestType(Enum):
@@ -302,3 +304,82 @@ class Quest(Base):
         if self.goal_enemy_id:
             return QuestType.Kill
         raise RuntimeError('Quest has no goal')
+
+
+class Player(Base):
+    """
+    Class represents saved progress of a protagonist.
+
+    :param id: Telegram id of user.
+    :param name: name of protagonist.
+    :param hp: current health.
+    :param level: current level.
+    :param damage: current damage.
+    :param heal_timestamp: last time of healing.
+    :param current_location_id: id of location where protagonist is.
+    :param inventory: amount of items by item name.
+    :param current_quests: ids of taken quests.
+    :param completed_quests: ids of completed quests.
+    :param killed_enemies: ids of killed enemies.
+    """
+    __tablename__ = 'player'
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)
+    name: Mapped[str] = mapped_column(String(256))
+    hp: Mapped[int] = mapped_column(Integer)
+    level: Mapped[int] = mapped_column(Integer)
+    damage: Mapped[int] = mapped_column(Integer)
+    heal_timestamp: Mapped[float] = mapped_column(Float)
+    current_location_id: Mapped[int] = mapped_column(Integer)
+    inventory: Mapped[dict] = mapped_column(JSON)
+    current_quests: Mapped[list] = mapped_column(JSON)
+    completed_quests: Mapped[list] = mapped_column(JSON)
+    killed_enemies: Mapped[list] = mapped_column(JSON)
+
+
+class FSMRecord(Base):
+    """
+    Class represents FSM state and data of one chat.
+
+    :param key: storage key of the chat.
+    :param state: name of current state.
+    :param data: state data with ids only.
+    """
+    __tablename__ = 'fsm'
+    key: Mapped[str] = mapped_column(String(128), primary_key=True)
+    state: Mapped[Optional[str]] = mapped_column(String(128), nullable=True)
+    data: Mapped[dict] = mapped_column(JSON)
+
+
+def fsm_data_field(name: str) -> ColumnElement:
+    """
+    Returns SQL expression of <name> field of FSM data.
+    The path is literal, so queries match the expression
+    indexes of the fsm table.
+
+    :param name: Name of the field.
+    """
+
+    return func.json_extract(FSMRecord.__table__.c.data, literal_column(f"'$.{name}'"))
+
+
+# Fields of FSM data holding ids of world entities.
+Index('ix_fsm_npc', fsm_data_field('npc'))
+Index('ix_fsm_quest', fsm_data_field('quest'))
+Index('ix_fsm_enemy', fsm_data_field('enemy'))
+
+
+def create_schema(conn: Connection) -> None:
+    """
+    Creates missing tables and indexes. create_all() skips
+    indexes of tables that exist, so they are created one
+    by one for databases made before the index was added.
+    SQLite checks if they exist, as SQLAlchemy can't reflect
+    expression indexes.
+
+    :param conn: Connection of the database.
+    """
+
+    Base.metadata.create_all(conn)
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            conn.execute(CreateIndex(index, if_not_exists=True))
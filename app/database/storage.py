@@ -0,0 +1,217 @@
+from collections import OrderedDict
+from typing import Any, Collection, Dict, Optional
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from .schemas import FSMRecord, fsm_data_field
+
+
+"""
+Records kept in memory. Least recently used ones
+are dropped after they are written.
+"""
+CACHE_SIZE = 10000
+
+"""
+Ids in one query of records referring to removed entities.
+"""
+STALE_CHUNK_SIZE = 500
+
+
+class SQLiteStorage(BaseStorage):
+    """
+    FSM storage kept in SQLite. Records are cached in memory,
+    changes are written by flush() in one transaction, so
+    several changes made by one update cost one write.
+    Data must contain only JSON values. At most <max_cached>
+    records stay cached, changed records are never dropped
+    before they are written.
+
+    :param engine: Engine of the database.
+    :param max_cached: Maximum number of cached records.
+    :param states: Cached states by key.
+    :param data: Cached data by key, from least to most recently used.
+    :param dirty: Keys changed since last flush.
+    """
+
+    def __init__(self, engine: AsyncEngine, max_cached: int = CACHE_SIZE) -> None:
+        """
+        Constructor method.
+        """
+
+        self.engine: AsyncEngine = engine
+        self.max_cached: int = max_cached
+        self.states: Dict[str, Optional[str]] = {}
+        self.data: OrderedDict[str, Dict[str, Any]] = OrderedDict()
+        self.dirty: set[str] = set()
+
+    @staticmethod
+    def make_key(key: StorageKey) -> str:
+        """
+        Converts aiogram key to the string.
+
+        :param key: Storage key.
+        :return: Key of the record.
+        """
+
+        return f'{key.bot_id}:{key.chat_id}:{key.user_id}:{key.thread_id or ""}:{key.destiny}'
+
+    async def _load(self, key: StorageKey) -> str:
+        """
+        Reads record of the <key> key to the cache if it is not there.
+
+        :param key: Storage key.
+        :return: Key of the record.
+        """
+
+        record_key = self.make_key(key)
+        if record_key in self.data:
+            self.data.move_to_end(record_key)
+            return record_key
+        state, data = await self._read(record_key)
+        if record_key not in self.data:
+            self.states[record_key] = state
+            self.data[record_key] = data
+        return record_key
+
+    async def _read(self, record_key: str) -> tuple[Optional[str], Dict[str, Any]]:
+        """
+        Reads one record from the database.
+
+        :param record_key: Key of the record.
+        :return: State and data.
+        """
+
+        async with self.engine.connect() as conn:
+            row = (await conn.execute(select(FSMRecord.state, FSMRecord.data)
+                                      .where(FSMRecord.key == record_key))).first()
+        if row is None:
+            return None, {}
+        return row.state, row.data
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        """
+        Sets state for the key.
+        """
+
+        record_key = await self._load(key)
+        self.states[record_key] = state.state if isinstance(state, State) else state
+        self.dirty.add(record_key)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        """
+        Gets state for the key.
+        """
+
+        return self.states[await self._load(key)]
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        """
+        Sets data for the key.
+        """
+
+        record_key = await self._load(key)
+        self.data[record_key] = data.copy()
+        self.dirty.add(record_key)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        """
+        Gets data for the key.
+        """
+
+        return self.data[await self._load(key)].copy()
+
+    async def flush(self) -> None:
+        """
+        Writes all changed records in one transaction
+        and drops records over the cache size.
+        """
+
+        if self.dirty:
+            dirty, self.dirty = self.dirty, set()
+            rows = [{'key': k, 'state': self.states[k], 'data': self.data[k]} for k in dirty]
+            try:
+                await self._write(rows)
+            except Exception:
+                self.dirty |= dirty
+                raise
+        self._evict()
+
+    def _evict(self) -> None:
+        """
+        Drops least recently used records over <max_cached>.
+        Records changed since the last write are kept.
+        """
+
+        kept = []
+        while len(self.data) - len(kept) > self.max_cached:
+            key, data = self.data.popitem(last=False)
+            if key in self.dirty:
+                kept.append((key, data))
+            else:
+                del self.states[key]
+        for key, data in reversed(kept):
+            self.data[key] = data
+            self.data.move_to_end(key, last=False)
+
+    async def _write(self, rows: list[Dict[str, Any]]) -> None:
+        """
+        Upserts <rows> to the fsm table.
+
+        :param rows: Rows to write.
+        """
+
+        stmt = insert(FSMRecord)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[FSMRecord.key],
+            set_={'state': stmt.excluded.state, 'data': stmt.excluded.data}
+        )
+        async with self.engine.begin() as conn:
+            await conn.execute(stmt, rows)
+
+    async def reset_stale(self, removed: Dict[str, Collection[int]], state: str) -> int:
+        """
+        Sets <state> with empty data for every record, cached or
+        saved, whose data refers to <removed> entities after the
+        world is reloaded. Saved records are found with expression
+        indexes of the fsm table. Records are changed after the
+        last await, so a caller that doesn't await between this and
+        swapping the world leaves no stale record for handlers to see.
+
+        :param removed: ids of removed entities by indexed field
+            of data: 'npc', 'quest' or 'enemy'.
+        :param state: State to set.
+        :return: Number of reset records.
+        """
+
+        removed = {field: set(ids) for field, ids in removed.items() if ids}
+        if not removed:
+            return 0
+        keys = set()
+        async with self.engine.connect() as conn:
+            for field, ids in removed.items():
+                ids = sorted(ids)
+                for start in range(0, len(ids), STALE_CHUNK_SIZE):
+                    chunk = ids[start:start + STALE_CHUNK_SIZE]
+                    keys.update((await conn.execute(select(FSMRecord.key)
+                                                    .where(fsm_data_field(field).in_(chunk)))).scalars())
+        # Cached records may differ from saved ones.
+        keys = {key for key in keys if key not in self.data}
+        keys |= {key for key, data in self.data.items()
+                 if any(data.get(field) in ids for field, ids in removed.items())}
+        for key in keys:
+            self.states[key] = state
+            self.data[key] = {}
+            self.dirty.add(key)
+        return len(keys)
+
+    async def close(self) -> None:
+        """
+        Writes what is left.
+        """
+
+        await self.flush()
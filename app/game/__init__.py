@@ -1,8 +1,9 @@
 from .direction import Direction
-from .enemy import Enemy
+from .enemy import Enemy, EnemyState
 from .game import *
 from .location import Location
 from .npc import NPC
-from .protagonist import Protagonist, ProtagonistDead
+from .protagonist import FightResult, Protagonist, ProtagonistDead
 from .quest import Quest
+from .world import World, get_world, set_world
 from database import QuestType
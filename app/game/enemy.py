@@ -5,36 +5,36 @@ import database as db
 
 class Enemy:
     """
-    This class represents enemy.
+    This class represents enemy. Instances are shared
+    between all players and never change, the health
+    during a fight is kept in EnemyState.
 
     :param id: Unique identifier according database.
     :param name: Name of the enemy.
     :param description: Description of the enemy.
     :param phrase: Personal phrase of the enemy.
     :param level: Level of the enemy.
-    :param hp: The amount of healph of the enemy.
+    :param max_hp: The amount of healph of the enemy.
     :param damage: the amount of damage from the enemy.
-    :param items: List of items that enemy has.
+    :param items: Items that enemy has.
     :param image: Filepath to appropriate image of the enemy.
     """
 
-    def __init__(self, enemy_db: db.Enemy):
+    def __init__(self, enemy_db: db.EnemyRecord):
         """
-        Constructor method. Stores values from db.Enemy instance
+        Constructor method. Stores values from db.EnemyRecord instance
         to game class.
-        
-        :param enemy_db: db.Enemy instance.
+
+        :param enemy_db: db.EnemyRecord instance.
         """
         self.id: int = enemy_db.id
         self.name: str = enemy_db.name
         self.description: str = enemy_db.description
         self.phrase: str = enemy_db.phrase
         self.level: int = enemy_db.level
-        self.hp: int = enemy_db.health
         self.max_hp: int = enemy_db.health
-        self.is_dead: bool = False
         self.damage: int = enemy_db.damage
-        self.items: list[str] = [i.name for i in enemy_db.items]
+        self.items: tuple[str, ...] = enemy_db.items
         self.image: str = enemy_db.image
 
     def roll(self) -> int:
@@ -47,6 +47,44 @@ class Enemy:
 
         return random.randint(1, 6) + self.level
 
+
+class EnemyState:
+    """
+    This class represents enemy fought by a particular player.
+    Unknown attributes are taken from the shared Enemy.
+
+    :param enemy: Shared Enemy instance.
+    :param hp: Current healph of the enemy.
+    :param is_dead: Has enemy died.
+    """
+
+    __slots__ = ('enemy', 'hp', 'is_dead')
+
+    def __init__(self, enemy: Enemy):
+        """
+        Constructor method.
+        """
+
+        self.enemy: Enemy = enemy
+        self.hp: int = enemy.max_hp
+        self.is_dead: bool = False
+
+    def __getattr__(self, name: str):
+        """
+        Delegates reading of static fields to the shared Enemy.
+        """
+
+        return getattr(self.enemy, name)
+
+    def roll(self) -> int:
+        """
+        Method represents throwing a cube of the enemy.
+
+        :return: appropriate value.
+        """
+
+        return self.enemy.roll()
+
     def take_hit(self, value: int = 1) -> bool:
         """
         Method to decrease enemy's healph after protagonist's
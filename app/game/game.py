@@ -1,10 +1,12 @@
-from typing import Dict, Optional
-from aiogram.types import Message
+from typing import Dict, Optional, Union
+from aiogram.types import CallbackQuery, Message
 
+import database as db
 from .direction import Direction
 from .enemy import Enemy
-from .location import Location
+from .npc import NPC
 from .protagonist import Protagonist
+from .world import get_world
 
 
 """
@@ -24,17 +26,32 @@ def protagonist_add(tg_id: int, protagonist: Protagonist) -> None:
     protagonists[tg_id] = protagonist
 
 
-def get_proto_from_msg(message: Message) -> Protagonist:
+async def protagonists_restore() -> None:
     """
-    Gets protagonist from message, that
-    aiogram handler receives from user.
+    Fills the <protagonists> dictionary with
+    protagonists saved in the database.
+    """
+
+    for row in await db.writer.load():
+        protagonists[row['id']] = Protagonist.from_row(row)
+
+
+def get_proto_from_msg(message: Union[Message, CallbackQuery]) -> Protagonist:
+    """
+    Gets protagonist from message or callback query,
+    that aiogram handler receives from user. Protagonist
+    is moved to the current world if it was reloaded.
 
-    :param message: Aiogram message instance.
+    :param message: Aiogram message or callback query instance.
     :return: Instance of Protagonist for current user.
     """
 
     tg_id = message.from_user.id
-    return protagonists[tg_id]
+    prota = protagonists[tg_id]
+    world = get_world()
+    if prota.world is not world:
+        prota.reconcile(world)
+    return prota
 
 
 def get_direction_from_msg(prota: Protagonist, raw_msg: str) -> Optional[Direction]:
@@ -44,7 +61,10 @@ def get_direction_from_msg(prota: Protagonist, raw_msg: str) -> Optional[Directi
     :param prota: instance of Protagonist for current user.
     :return: Appropriate direction.
     """
-    
+
+    direction = prota.button(raw_msg, Direction)
+    if direction is not None and direction in prota.whereami().directions:
+        return direction
     for direction in prota.whereami().directions:
         if raw_msg == direction.name:
             return direction
@@ -52,17 +72,35 @@ def get_direction_from_msg(prota: Protagonist, raw_msg: str) -> Optional[Directi
     return None
 
 
-def get_enemy_from_msg(location: Location, raw_msg: str) -> Optional[Enemy]:
+def get_enemy_from_msg(prota: Protagonist, raw_msg: str) -> Optional[Enemy]:
     """
     Gets enemy from messaage.
 
-    :param location: Current location.
+    :param prota: instance of Protagonist for current user.
     :param raw_msg: text received from user.
     :return: Appropriate enemy.
     """
 
-    for enemy in location.enemies:
+    enemy = prota.button(raw_msg, Enemy)
+    if enemy is not None and enemy in prota.whereami().enemies and enemy.id not in prota.killed_enemies:
+        return enemy
+    for enemy in prota.location_enemies():
         if enemy.name == raw_msg:
             return enemy
     
     return None
+
+
+def get_npc_from_msg(prota: Protagonist, raw_msg: str) -> Optional[NPC]:
+    """
+    Gets npc from message.
+
+    :param prota: instance of Protagonist for current user.
+    :param raw_msg: text received from user.
+    :return: Appropriate npc.
+    """
+
+    npc = prota.button(raw_msg, NPC)
+    if npc is not None and npc in prota.whereami().npc:
+        return npc
+    return prota.whereami().find_npc(raw_msg)
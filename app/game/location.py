@@ -8,18 +8,20 @@ from .npc import NPC
 
 class Location:
     """
-    Class represents game's location.
+    Class represents game's location. Instances are shared
+    between all players.
 
     :param id: Unique identifier according database.
     :param name: Name of the location.
     :param level: Level that protagonist should reach to unlock
         this location.
     :param description: Description of the location.
-    :param npc: List of npcs on the location.
-    :param enemies: List of enemies on the location.
+    :param npc: Npcs on the location.
+    :param enemies: All enemies on the location.
     :param image: Filepath to appropriate image of the location.
     """
-    def __init__(self, location_db: db.Location | None, killed_enemies: list[int], completed_quests: list[int]):
+    def __init__(self, location_db: db.LocationRecord | None,
+                 npc: tuple[NPC, ...], enemies: tuple[Enemy, ...]):
         """
         Constructor method.
         """
@@ -30,10 +32,9 @@ class Location:
         self.name: str = location_db.name
         self.level: int = location_db.level
         self.description: str = location_db.description
-        self.directions: list[Direction] = [Direction(*d) for d in location_db.directions()]
-        self.npc: list[NPC] = [NPC(n, completed_quests) for n in location_db.npc]
-        self.enemies: list[Enemy] = [Enemy(e)
-                                     for e in filter(lambda e: e.id not in killed_enemies, location_db.enemies)]
+        self.directions: tuple[Direction, ...] = tuple(Direction(*d) for d in location_db.directions)
+        self.npc: tuple[NPC, ...] = npc
+        self.enemies: tuple[Enemy, ...] = enemies
         self.image: str = location_db.image
 
     def find_npc(self, raw_str: str) -> Optional[NPC]:
@@ -6,17 +6,18 @@ from .quest import Quest
 
 class NPC:
     """
-    This class represents npc.
+    This class represents npc. Instances are shared
+    between all players.
 
     :param id: Unique identifier according database.
     :param name: Name of the npc.
     :param description: Description of the npc.
     :param phrase: Personal phrase of the npc.
-    :param quests: List of quests of the npc.
+    :param quests: All quests of the npc.
     :param image: Filepath to appropriate image of the npc.
     """
 
-    def __init__(self, npc_db: db.NPC, completed_quests: list[int]) -> None:
+    def __init__(self, npc_db: db.NPCRecord, quests: tuple[Quest, ...]) -> None:
         """
         Constructor method.
         """        
@@ -25,8 +26,7 @@ class NPC:
         self.name: str = npc_db.name
         self.description: str = npc_db.description
         self.phrase: str = npc_db.phrase
-        self.quests: list[Quest] = [Quest(quest)
-                                    for quest in filter(lambda q: q.id not in completed_quests, npc_db.quests)]
+        self.quests: tuple[Quest, ...] = quests
         self.image: str = npc_db.image
 
     def find_quest(self, raw_str: str) -> Optional[Quest]:
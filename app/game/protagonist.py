@@ -1,24 +1,42 @@
 import time
 import random
-from typing import Optional, Tuple
-from sqlalchemy.orm import Session
+from typing import Any, Mapping, NamedTuple, Optional, Tuple, Type, TypeVar
 
-import database as db
 from database import QuestType
 from .direction import Direction
 from .location import Location
-from .enemy import Enemy
+from .enemy import Enemy, EnemyState
 from .npc import NPC
 from .quest import Quest
+from .quest_status import QuestStatus
+from .world import World, get_world
 
 
 PROTAGONIST_HEAL_INTERVAL = 30
 
+T = TypeVar('T')
+
 
 class ProtagonistDead(Exception):
     pass
 
 
+class FightResult(NamedTuple):
+    """
+    Summary of a fight resolved at once.
+
+    :param rounds: Number of rounds.
+    :param hits: Rounds won by protagonist.
+    :param misses: Rounds won by enemy.
+    :param hp_lost: Health lost by protagonist.
+    """
+
+    rounds: int
+    hits: int
+    misses: int
+    hp_lost: int
+
+
 class Protagonist:
     """
     This class represents enemy.
@@ -29,32 +47,122 @@ class Protagonist:
     :param level: Current level of the player.
     :param damage: The amount of damage player does.
     :param inventory: Inventory that saves received items.
-    :param session: Session of the database.
     :param current_location: Current location where player is located.
-    :param current_quests: List of quests whick player has been taken.
-    :param completed_quests: List of completed quests by player.
-    :param killed_enemies: List of killed enemies by player.
+    :param current_quests: Quests whick player has been taken by id.
+    :param completed_quests: ids of completed quests by player.
+    :param killed_enemies: ids of killed enemies by player.
+    :param opponents: Enemies fought on the current location by id.
+    :param buttons: Entities of the last shown keyboard by button text.
+    :param quest_status: Quests that can be completed and counters by npc.
     :param heal_timestamp: Last time of healing the protagonist.
+    :param world: World the references of protagonist belong to.
     """
 
-    def __init__(self, name: str, id: int, session: Session):
+    def __init__(self, name: str, id: int):
         """
         Conctructor method.
         """
         self.id: int = id
         self.name: str = name
+        self.world: World = get_world()
         self.hp: int = 10
         self.level: int = 1
         self.damage: int = 1
         self.inventory = {}
-        self.session: Session = session
-        self.current_location: Location = Location(session.query(db.Location)
-                                                   .filter(db.Location.id == 1).first(), [], [])
-        self.current_quests: list[Quest] = []
-        self.completed_quests: list[int] = []
-        self.killed_enemies: list[int] = []
+        self.current_location: Location = self.world.start_location
+        self.current_quests: dict[int, Quest] = {}
+        self.completed_quests: set[int] = set()
+        self.killed_enemies: set[int] = set()
+        self.opponents: dict[int, EnemyState] = {}
+        self.buttons: Mapping[str, Any] = {}
+        self.quest_status: QuestStatus = QuestStatus(self)
         self.heal_timestamp = time.time()
 
+    def to_row(self) -> dict[str, Any]:
+        """
+        Returns progress of protagonist to be saved
+        in the player table.
+
+        :return: Row of db.Player.
+        """
+
+        return {
+            'id': self.id,
+            'name': self.name,
+            'hp': self.hp,
+            'level': self.level,
+            'damage': self.damage,
+            'heal_timestamp': self.heal_timestamp,
+            'current_location_id': self.current_location.id,
+            'inventory': dict(self.inventory),
+            'current_quests': list(self.current_quests),
+            'completed_quests': sorted(self.completed_quests),
+            'killed_enemies': sorted(self.killed_enemies),
+        }
+
+    @classmethod
+    def from_row(cls, row: dict[str, Any]) -> 'Protagonist':
+        """
+        Restores protagonist saved in the player table.
+
+        :param row: Row of db.Player.
+        :return: Protagonist instance.
+        """
+
+        prota = cls(row['name'], row['id'])
+        world = prota.world
+        prota.hp = row['hp']
+        prota.level = row['level']
+        prota.damage = row['damage']
+        prota.heal_timestamp = row['heal_timestamp']
+        prota.current_location = world.locations.get(row['current_location_id'], prota.current_location)
+        prota.inventory = dict(row['inventory'])
+        prota.current_quests = {i: world.quests[i] for i in row['current_quests'] if i in world.quests}
+        prota.completed_quests = set(row['completed_quests'])
+        prota.killed_enemies = set(row['killed_enemies'])
+        prota.quest_status.rebuild()
+        return prota
+
+    def reconcile(self, world: World) -> None:
+        """
+        Moves references of protagonist to objects of the reloaded
+        <world> world. Removed quests are dropped, wounds of removed
+        enemies are forgotten and protagonist in a removed location
+        returns to the start location. Progress kept by ids stays as is.
+
+        :param world: New world.
+        """
+
+        self.world = world
+        self.current_location = world.locations.get(self.current_location.id, world.start_location)
+        self.current_quests = {i: world.quests[i] for i in self.current_quests if i in world.quests}
+
+        opponents = {}
+        for enemy_id, state in self.opponents.items():
+            enemy = world.enemies.get(enemy_id)
+            if enemy is not None and enemy in self.current_location.enemies:
+                state.enemy = enemy
+                state.hp = min(state.hp, enemy.max_hp)
+                opponents[enemy_id] = state
+        self.opponents = opponents
+
+        buttons = {}
+        for text, entity in self.buttons.items():
+            if isinstance(entity, Direction):
+                entity = next((d for d in self.current_location.directions
+                               if d.location_id == entity.location_id), None)
+            elif isinstance(entity, NPC):
+                entity = world.npc.get(entity.id)
+            elif isinstance(entity, Enemy):
+                entity = world.enemies.get(entity.id)
+            elif isinstance(entity, Quest):
+                entity = world.quests.get(entity.id)
+            if entity is not None:
+                buttons[text] = entity
+        self.buttons = buttons
+
+        self.quest_status.rebuild()
+
     def roll(self) -> int:
         """
         Method represents throwing a cube with values 1-6
@@ -65,7 +173,7 @@ class Protagonist:
 
         return random.randint(1, 6) + self.level
 
-    def attack(self, enemy: Enemy) -> Tuple[int, int]:
+    def attack(self, enemy: EnemyState) -> Tuple[int, int]:
         """
         Function that represents attack action vs <enemy> enemy.
 
@@ -80,12 +188,34 @@ class Protagonist:
             if enemy.take_hit(self.damage):
                 for item in enemy.items:
                     self.take(item)
-                self.killed_enemies.append(enemy.id)
+                self.killed_enemies.add(enemy.id)
+                self.quest_status.enemy_killed(enemy.id)
         elif enemy_roll > protagonist_roll:
             self.take_hit(enemy.damage)
 
         return protagonist_roll, enemy_roll
 
+    def fight(self, enemy: EnemyState) -> FightResult:
+        """
+        Attacks <enemy> enemy until one of them dies.
+        Loot is taken as after usual attacks and ProtagonistDead
+        is raised if protagonist dies.
+
+        :param enemy: Enemy to fight.
+        :return: Summary of the fight.
+        """
+
+        rounds = hits = misses = 0
+        hp = self.health()
+        while not enemy.is_dead:
+            prota_roll, enemy_roll = self.attack(enemy)
+            rounds += 1
+            if prota_roll > enemy_roll:
+                hits += 1
+            elif enemy_roll > prota_roll:
+                misses += 1
+        return FightResult(rounds, hits, misses, hp - self.hp)
+
     def take_hit(self, value: int = 1) -> None:
         """
         Function to take a hit from some enemy with <value> damage.
@@ -137,10 +267,8 @@ class Protagonist:
         """
         if direction.location_level > self.level:
             return
-        self.current_location = Location(self.session.query(db.Location)
-                                         .filter(db.Location.id == direction.location_id).first(),
-                                         self.killed_enemies,
-                                         self.completed_quests)
+        self.current_location = self.world.locations[direction.location_id]
+        self.opponents.clear()
 
     def whereami(self) -> Location:
         """
@@ -151,17 +279,48 @@ class Protagonist:
 
         return self.current_location
 
+    def location_enemies(self) -> list[Enemy]:
+        """
+        Returns enemies on current location
+        not killed by protagonist.
+
+        :return: List of enemies.
+        """
+
+        return [e for e in self.current_location.enemies if e.id not in self.killed_enemies]
+
+    def opponent(self, enemy: Enemy) -> EnemyState:
+        """
+        Returns state of the <enemy> enemy for this protagonist.
+        Wounds are kept until protagonist leaves the location.
+
+        :param enemy: Enemy to fight.
+        :return: State of the enemy.
+        """
+
+        state = self.opponents.get(enemy.id)
+        if state is None:
+            state = self.opponents[enemy.id] = EnemyState(enemy)
+        return state
+
+    def npc_quests(self, npc: NPC) -> list[Quest]:
+        """
+        Returns quests of the npc not completed by protagonist.
+
+        :param npc: NPC to get quests.
+        :return: List of quests.
+        """
+
+        return [q for q in npc.quests if q.id not in self.completed_quests]
+
     def new_locations(self) -> list[str]:
         """
-        Returns list of locations.
+        Returns names of locations opened on the current level.
 
-        :return: Current location.
+        :return: List of location names.
         """
 
-        result: list[str] = []
-        for loc in self.session.query(db.Location).filter(db.Location.level == self.level).all():
-            result.append(loc.name)
-        return result
+        return [loc.name for loc in self.world.locations_by_level.get(self.level, ())]
 
     def take(self, item: str) -> None:
         """
@@ -171,6 +330,7 @@ class Protagonist:
         """
 
         self.inventory[item] = self.inventory.get(item, 0) + 1
+        self.quest_status.item_changed(item)
 
     def give(self, item: str) -> None:
         """
@@ -182,6 +342,7 @@ class Protagonist:
         self.inventory[item] -= 1
         if self.inventory[item] == 0:
             del self.inventory[item]
+        self.quest_status.item_changed(item)
 
     def complete_quest(self, quest: Quest) -> None:
         """
@@ -192,8 +353,9 @@ class Protagonist:
 
         if quest.quest_type == QuestType.Bring:
             self.give(quest.goal)
-        self.completed_quests.append(quest.id)
-        self.current_quests.remove(quest)
+        self.completed_quests.add(quest.id)
+        del self.current_quests[quest.id]
+        self.quest_status.completed(quest)
         self.advance_level()
 
     def get_killed_enemies(self) -> list[str]:
@@ -202,12 +364,9 @@ class Protagonist:
 
         :return: list of enemy names.
         """
-        enemies = []
-        for enemy_id in self.killed_enemies:
-            enemy = self.session.query(db.Enemy).filter(db.Enemy.id == enemy_id).first()
-            if enemy:
-                enemies.append(enemy.name)
-        return enemies
+
+        enemies = self.world.enemies
+        return [enemies[i].name for i in sorted(self.killed_enemies) if i in enemies]
 
     def take_quest(self, quest: Quest) -> None:
         """
@@ -216,7 +375,8 @@ class Protagonist:
         :param quest: Quest to take.
         """
 
-        self.current_quests.append(quest)
+        self.current_quests[quest.id] = quest
+        self.quest_status.taken(quest)
 
     def has_quest(self, quest: Quest) -> bool:
         """
@@ -225,10 +385,7 @@ class Protagonist:
         :return: True if taken, False otherwise.
         """
 
-        for q in self.current_quests:
-            if q.id == quest.id:
-                return True
-        return False
+        return quest.id in self.current_quests
 
     def can_complete(self, quest: Quest) -> bool:
         """
@@ -238,12 +395,7 @@ class Protagonist:
         :return: True if yes, False otherwise.
         """
 
-        if self.has_quest(quest):
-            if quest.quest_type == QuestType.Bring and self.inventory.get(quest.goal):
-                return True
-            if quest.quest_type == QuestType.Kill and quest.goal in self.killed_enemies:
-                return True
-        return False
+        return quest.id in self.quest_status.completable
 
     def npc_has_not_taken_quests(self, npc: NPC):
         """
@@ -252,10 +404,8 @@ class Protagonist:
         :param npc: NPC to check quests.
         :return: True if there is not taken quest, False otherwise.
         """
-        for quest in npc.quests:
-            if not self.has_quest(quest):
-                return True
-        return False
+
+        return self.quest_status.npc_closed[npc.id] < len(npc.quests)
 
     def npc_has_quests_to_complete(self, npc: NPC):
         """
@@ -264,24 +414,49 @@ class Protagonist:
         :param npc: NPC to check quests.
         :return: True if there is not taken quest, False otherwise.
         """
-        for quest in npc.quests:
-            if self.can_complete(quest):
-                return True
-        return False
 
-    def messages_for(self, npc: NPC) -> list[str]:
+        return self.quest_status.npc_completable[npc.id] > 0
+
+    def messages_for(self, npc: NPC) -> list[Quest]:
         """
-        Find npcs for whom the message is sent.
+        Find quests with message sent to the npc.
 
         :param npc: Npc for the search.
-        :return: List of npcs names.
+        :return: List of quests.
+        """
+
+        return [q for q in self.world.quests_by_npc.get(npc.id, ()) if q.id in self.current_quests]
+
+    def button(self, raw_str: str, kind: Type[T]) -> Optional[T]:
         """
+        Find entity of the pressed button of the last shown keyboard.
+        The keyboard may be older than the state of the protagonist,
+        so callers check the entity before using it.
 
-        givers = []
-        for quest in self.current_quests:
-            if quest.quest_type == QuestType.Talk and quest.goal == npc.id:
-                givers.append(quest.npc_name)
-        return givers
+        :param raw_str: Text received from user.
+        :param kind: Expected class of the entity.
+        :return: instance of found entity or None otherwise.
+        """
+
+        entity = self.buttons.get(raw_str.strip())
+        return entity if isinstance(entity, kind) else None
+
+    def find_npc_quest(self, npc: NPC, raw_str: str) -> Optional[Quest]:
+        """
+        Find not completed quest of the npc from start of the string.
+
+        :param npc: NPC to find quest.
+        :param raw_str: String to find in.
+        :return: instance of found quest or None otherwise.
+        """
+
+        quest = self.button(raw_str, Quest)
+        if quest is not None and quest in npc.quests and quest.id not in self.completed_quests:
+            return quest
+        for quest in self.npc_quests(npc):
+            if raw_str.startswith(quest.name):
+                return quest
+        return None
 
     def find_quest(self, raw_str: str) -> Optional[Quest]:
         """
@@ -291,7 +466,10 @@ class Protagonist:
         :return: instance of found quest or None otherwise.
         """
 
-        for quest in self.current_quests:
+        quest = self.button(raw_str, Quest)
+        if quest is not None and self.current_quests.get(quest.id) is quest:
+            return quest
+        for quest in self.current_quests.values():
             if raw_str.startswith(quest.name):
                 return quest
         return None
@@ -304,7 +482,10 @@ class Protagonist:
         :return: instance of found quest or None otherwise.
         """
 
-        for quest in self.current_quests:
+        quest = self.button(raw_str, Quest)
+        if quest is not None and self.current_quests.get(quest.id) is quest:
+            return quest
+        for quest in self.current_quests.values():
             if raw_str.endswith(quest.npc_name):
                 return quest
         return None
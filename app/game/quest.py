@@ -10,13 +10,14 @@ class Quest:
     :param name: Name of the quest.
     :param description: Description of the quest.
     :param congratulation: Message after passing the quest.
+    :param npc_id: id of npc who owns it.
     :param npc_name: Name of npc who owns it.
     :param quest_type: Type of quest: Bring something,
         Kill someone or Talk to someone.
     :param goal: Goal to pass the quest.
     """
 
-    def __init__(self, quest_db: db.Quest):
+    def __init__(self, quest_db: db.QuestRecord):
         """
         Constructor method.
         """
@@ -26,15 +27,10 @@ class Quest:
         self.description: str = quest_db.description
         self.congratulation: str = quest_db.congratulation
         self.is_final: bool = quest_db.is_final
-        self.npc_name: str = quest_db.npc.name
-        self.quest_type: QuestType = quest_db.type()
-
-        if self.quest_type == QuestType.Kill:
-            self.goal: str | int = quest_db.goal_enemy_id
-        elif self.quest_type == QuestType.Bring:
-            self.goal: str | int = quest_db.goal_item.name
-        else:
-            self.goal: str | int = quest_db.goal_npc_id
+        self.npc_id: int = quest_db.npc_id
+        self.npc_name: str = quest_db.npc_name
+        self.quest_type: QuestType = quest_db.quest_type
+        self.goal: str | int = quest_db.goal
 
     def __eq__(self, value: object) -> bool:
         """
@@ -42,3 +38,10 @@ class Quest:
         """
         
         return self.id == value.id
+
+    def __hash__(self) -> int:
+        """
+        Overloading of hash() method, consistent with ==.
+        """
+
+        return hash(self.id)
@@ -0,0 +1,107 @@
+from collections import Counter
+from typing import TYPE_CHECKING
+
+from database import QuestType
+from .quest import Quest
+
+if TYPE_CHECKING:
+    from .protagonist import Protagonist
+
+
+class QuestStatus:
+    """
+    Quest state of one protagonist that is kept up to date
+    on every change instead of being computed on every view.
+    Changes are found with reverse indexes of World, so only
+    quests advanced by the changed enemy, item or quest are checked.
+
+    :param prota: Protagonist the status belongs to.
+    :param completable: ids of taken quests that can be completed now.
+    :param npc_completable: Number of completable quests by id of giver npc.
+    :param npc_closed: Number of taken or completed quests by id of giver npc.
+    """
+
+    def __init__(self, prota: 'Protagonist') -> None:
+        """
+        Constructor method.
+        """
+
+        self.prota: 'Protagonist' = prota
+        self.completable: set[int] = set()
+        self.npc_completable: Counter[int] = Counter()
+        self.npc_closed: Counter[int] = Counter()
+
+    def rebuild(self) -> None:
+        """
+        Computes the status from scratch. Should be called
+        after progress of protagonist is replaced.
+        """
+
+        world = self.prota.world
+        self.completable = set()
+        self.npc_completable = Counter()
+        self.npc_closed = Counter()
+        for quest_id in self.prota.completed_quests:
+            quest = world.quests.get(quest_id)
+            if quest is not None:
+                self.npc_closed[quest.npc_id] += 1
+        for quest in self.prota.current_quests.values():
+            self.taken(quest)
+
+    def check(self, quest: Quest) -> None:
+        """
+        Updates completability of the taken <quest> quest.
+
+        :param quest: Quest to check.
+        """
+
+        prota = self.prota
+        ready = quest.id in prota.current_quests and (
+            (quest.quest_type == QuestType.Bring and bool(prota.inventory.get(quest.goal)))
+            or (quest.quest_type == QuestType.Kill and quest.goal in prota.killed_enemies)
+        )
+        if ready and quest.id not in self.completable:
+            self.completable.add(quest.id)
+            self.npc_completable[quest.npc_id] += 1
+        elif not ready and quest.id in self.completable:
+            self.completable.remove(quest.id)
+            self.npc_completable[quest.npc_id] -= 1
+
+    def taken(self, quest: Quest) -> None:
+        """
+        Called after the <quest> quest is taken.
+
+        :param quest: Taken quest.
+        """
+
+        self.npc_closed[quest.npc_id] += 1
+        self.check(quest)
+
+    def completed(self, quest: Quest) -> None:
+        """
+        Called after the <quest> quest is completed.
+
+        :param quest: Completed quest.
+        """
+
+        self.check(quest)
+
+    def enemy_killed(self, enemy_id: int) -> None:
+        """
+        Called after an enemy is killed.
+
+        :param enemy_id: id of the killed enemy.
+        """
+
+        for quest in self.prota.world.quests_by_enemy.get(enemy_id, ()):
+            self.check(quest)
+
+    def item_changed(self, item: str) -> None:
+        """
+        Called after an item is taken or given.
+
+        :param item: Name of the item.
+        """
+
+        for quest in self.prota.world.quests_by_item.get(item, ()):
+            self.check(quest)
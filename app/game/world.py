@@ -0,0 +1,101 @@
+from collections import defaultdict
+from typing import Optional
+
+import database as db
+from database import QuestType
+from .enemy import Enemy
+from .location import Location
+from .npc import NPC
+from .quest import Quest
+
+
+class World:
+    """
+    Shared game objects built once from the catalog.
+    They are the same for every player, everything
+    player specific lives in Protagonist.
+
+    :param catalog: Catalog the objects are built from.
+    :param locations: Locations by id.
+    :param npc: NPCs by id.
+    :param enemies: Enemies by id.
+    :param quests: Quests by id.
+    :param start_location: Location new protagonists start in, the first
+        one or the one with the lowest id if the first is removed.
+    :param locations_by_level: Locations by minimal level to enter.
+    :param quests_by_enemy: Kill quests by id of the goal enemy.
+    :param quests_by_item: Bring quests by name of the goal item.
+    :param quests_by_npc: Talk quests by id of the goal npc.
+    """
+
+    def __init__(self, catalog: db.Catalog):
+        """
+        Constructor method.
+        """
+
+        self.catalog: db.Catalog = catalog
+        self.quests: dict[int, Quest] = {i: Quest(q) for i, q in catalog.quests.items()}
+        self.npc: dict[int, NPC] = {
+            i: NPC(n, tuple(self.quests[q] for q in n.quests)) for i, n in catalog.npc.items()
+        }
+        self.enemies: dict[int, Enemy] = {i: Enemy(e) for i, e in catalog.enemies.items()}
+        self.locations: dict[int, Location] = {
+            i: Location(loc,
+                        tuple(self.npc[n] for n in loc.npc),
+                        tuple(self.enemies[e] for e in loc.enemies))
+            for i, loc in catalog.locations.items()
+        }
+        if not self.locations:
+            raise ValueError('World has no locations')
+        self.start_location: Location = self.locations.get(1) or self.locations[min(self.locations)]
+
+        by_level = defaultdict(list)
+        for location in self.locations.values():
+            by_level[location.level].append(location)
+        self.locations_by_level: dict[int, tuple[Location, ...]] = {k: tuple(v) for k, v in by_level.items()}
+
+        by_goal: dict[QuestType, defaultdict] = {t: defaultdict(list) for t in QuestType}
+        for quest in self.quests.values():
+            by_goal[quest.quest_type][quest.goal].append(quest)
+        self.quests_by_enemy: dict[int, tuple[Quest, ...]] = {
+            k: tuple(v) for k, v in by_goal[QuestType.Kill].items()
+        }
+        self.quests_by_item: dict[str, tuple[Quest, ...]] = {
+            k: tuple(v) for k, v in by_goal[QuestType.Bring].items()
+        }
+        self.quests_by_npc: dict[int, tuple[Quest, ...]] = {
+            k: tuple(v) for k, v in by_goal[QuestType.Talk].items()
+        }
+
+
+_world: Optional[World] = None
+
+
+def get_world() -> World:
+    """
+    Returns shared game objects for the current catalog.
+
+    :return: World instance.
+    """
+
+    global _world
+    catalog = db.get_catalog()
+    if _world is None or _world.catalog is not catalog:
+        _world = World(catalog)
+    return _world
+
+
+def set_world(world: World) -> Optional[World]:
+    """
+    Makes <world> and its catalog the current ones,
+    when the world is reloaded.
+
+    :param world: New world.
+    :return: Previous world.
+    """
+
+    global _world
+    old = _world
+    db.set_catalog(world.catalog)
+    _world = world
+    return old
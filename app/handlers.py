@@ -1,19 +1,20 @@
-import asyncio
+from typing import Optional
 from aiogram import F, Router
 from aiogram.filters import CommandStart
-from aiogram.types import Message, FSInputFile, ReplyKeyboardMarkup, ReplyKeyboardRemove
+from aiogram.methods import TelegramMethod
+from aiogram.types import CallbackQuery, Message, FSInputFile, ReplyKeyboardMarkup, ReplyKeyboardRemove
 
-from database import Session
 from fsm import *
 from game import *
 import keyboards as kb
+from media import file_ids
 import templates as tp
 
 router = Router()
 
 
 @router.message(CommandStart())
-async def handler_start(message: Message, state: FSMContext) -> None:
+async def handler_start(message: Message, state: FSMContext) -> Optional[TelegramMethod]:
     """
     #/START
 
@@ -23,11 +24,11 @@ async def handler_start(message: Message, state: FSMContext) -> None:
     :param state: Current FSM Context.
     """
     await state.set_state(FSM_Start.player_name)
-    await message.answer('Введите имя игрока: ')
+    return message.answer('Введите имя игрока: ')
 
 
 @router.message(FSM_Start.player_name)
-async def handler_start_name(message: Message, state: FSMContext) -> None:
+async def handler_start_name(message: Message, state: FSMContext) -> Optional[TelegramMethod]:
     """
     #/START -> WELCOME
 
@@ -38,20 +39,19 @@ async def handler_start_name(message: Message, state: FSMContext) -> None:
     :param state: Current FSM Context.
     """
     
-    await state.update_data(player_name=message.text, semaphore=asyncio.Semaphore(1))
     tg_id = message.from_user.id
-    cur_proto = Protagonist(message.text, tg_id, Session())
+    cur_proto = Protagonist(message.text, tg_id)
     protagonist_add(tg_id, cur_proto)
 
-    await message.answer(
+    await state.set_state(FSM_Welcome.start_game)
+    return message.answer(
         tp.template_welcome(cur_proto), 
         reply_markup=kb.make_keyboard_welcome(), parse_mode='HTML'
     )
-    await state.set_state(FSM_Welcome.start_game)
 
 
 @router.message(FSM_Welcome.start_game, F.text == 'Начать игру')
-async def handler_welcome_start_game(message: Message, state: FSMContext) -> None:
+async def handler_welcome_start_game(message: Message, state: FSMContext) -> Optional[TelegramMethod]:
     """
     #WELCOME -> LOCATION
 
@@ -63,27 +63,35 @@ async def handler_welcome_start_game(message: Message, state: FSMContext) -> Non
     """
 
     await state.set_state(FSM_Location.start)
-    await handler_location_start(message, state)
+    return await handler_location_start(message, state)
 
 
-async def send_photo_or_text(message: Message, image: str, text: str, keyboard: ReplyKeyboardMarkup) -> None:
+async def send_photo_or_text(message: Message, image: str, text: str,
+                             keyboard: ReplyKeyboardMarkup) -> Optional[TelegramMethod]:
     """
     Sends photo if exists, message and keyboard.
+    Photo is uploaded only once, later its file_id is sent.
 
     :param message: Message from user.
     :param image: Path to the image.
     :param text: Answer for the user.
     :param keyboard: Keyboard instance attached to the answer.
+    :return: Answer to be sent by the dispatcher, None if
+        photo had to be uploaded right away.
     """
     
     if image:
-        await message.answer_photo(FSInputFile(image), text, reply_markup=keyboard, parse_mode='HTML')
-    else:
-        await message.answer(text, reply_markup=keyboard, parse_mode='HTML')
+        file_id = file_ids.get(image)
+        if file_id:
+            return message.answer_photo(file_id, text, reply_markup=keyboard, parse_mode='HTML')
+        msg = await message.answer_photo(FSInputFile(image), text, reply_markup=keyboard, parse_mode='HTML')
+        file_ids.put(image, msg.photo[-1].file_id)
+        return None
+    return message.answer(text, reply_markup=keyboard, parse_mode='HTML')
 
 
 @router.message(FSM_Location.start)
-async def handler_location_start(message: Message, state: FSMContext) -> None:
+async def handler_location_start(message: Message, state: FSMContext) -> Optional[TelegramMethod]:
     """
     #LOCATION
 
@@ -96,22 +104,32 @@ async def handler_location_start(message: Message, state: FSMContext) -> None:
     :param state: Current FSM Context.
     """
 
-    cur_proto = get_proto_from_msg(message)
+    return await location_start(message, state, get_proto_from_msg(message))
+
+
+async def location_start(message: Message, state: FSMContext, cur_proto: Protagonist) -> Optional[TelegramMethod]:
+    """
+    Prints info about current location of protagonist.
+
+    :param message: Message to answer to.
+    :param state: Current FSM Context.
+    :param cur_proto: Protagonist of the user.
+    """
+
     text = tp.location_info(
-        cur_proto.current_location.name,
-        cur_proto.current_location.description,
-        cur_proto.current_location.npc,
-        cur_proto.current_location.enemies,
+        cur_proto.current_location,
+        cur_proto.location_enemies(),
         cur_proto
     )
-    await send_photo_or_text(message, cur_proto.current_location.image, text, kb.make_keyboard_location_start())
     await state.set_state(FSM_Location.choose_act)
+    return await send_photo_or_text(message, cur_proto.current_location.image, text,
+                                    kb.make_keyboard_location_start())
 
 
 # Поговрить
 
 @router.message(FSM_Location.choose_act, F.text == 'Поговорить')
-async def handler_talk(message: Message, state: FSMContext) -> None:
+async def handler_talk(message: Message, state: FSMContext) -> Optional[TelegramMethod]:
     """
     #LOCATION
 
@@ -125,18 +143,17 @@ async def handler_talk(message: Message, state: FSMContext) -> None:
     cur_proto = get_proto_from_msg(message)
     cur_location = cur_proto.current_location
     if not cur_location.npc:
-        await message.answer(tp.no_npc())
-        return
-    await message.answer(
+        return message.answer(tp.no_npc())
+    await state.set_state(FSM_Conversation.choose_npc)
+    return message.answer(
         tp.talk_with(),
-        reply_markup=kb.make_keyboard_talk(cur_location.npc),
+        reply_markup=kb.make_keyboard_talk(cur_location.npc, cur_proto),
         parse_mode='HTML'
     )
-    await state.set_state(FSM_Conversation.choose_npc)
 
 
 @router.message(FSM_Conversation.choose_npc, F.text == 'Отмена')
-async def handler_talk_choose_npc_cancel(message: Message, state: FSMContext) -> None:
+async def handler_talk_choose_npc_cancel(message: Message, state: FSMContext) -> Optional[TelegramMethod]:
     """
     #LOCATION
 
@@ -147,11 +164,11 @@ async def handler_talk_choose_npc_cancel(message: Message, state: FSMContext) ->
     :param state: Current FSM Context.
     """
 
-    await handler_location_start(message, state)
+    return await handler_location_start(message, state)
 
 
 @router.message(FSM_Conversation.choose_npc)
-async def handler_talk_choose_npc(message: Message, state: FSMContext) -> None:
+async def handler_talk_choose_npc(message: Message, state: FSMContext) -> Optional[TelegramMethod]:
     """
     #LOCATION -> CONVERSATION
 
@@ -163,14 +180,13 @@ async def handler_talk_choose_npc(message: Message, state: FSMContext) -> None:
     """
     
     cur_proto = get_proto_from_msg(message)
-    cur_location = cur_proto.current_location
-    cur_npc = cur_location.find_npc(message.text)
+    cur_npc = get_npc_from_msg(cur_proto, message.text)
     if cur_npc:
-        await state.update_data({'cur_npc': cur_npc})
-        await handler_talk_choose_npc_main(message, state)
+        await state.update_data({'npc': cur_npc.id})
+        return await handler_talk_choose_npc_main(message, state)
 
 
-async def handler_talk_choose_npc_main(message: Message, state: FSMContext) -> None:
+async def handler_talk_choose_npc_main(message: Message, state: FSMContext) -> Optional[TelegramMethod]:
     """
     Calls after handler_talk_choose_npc() or handler_quest_descr_cancel()
     Displays conversation actions.
@@ -180,15 +196,15 @@ async def handler_talk_choose_npc_main(message: Message, state: FSMContext) -> N
     """
     cur_proto = get_proto_from_msg(message)
     data = await state.get_data()
-    cur_npc = data['cur_npc']
-    await send_photo_or_text(message, cur_npc.image,
-                             tp.talk_with_npc(cur_npc),
-                             kb.make_keyboard_talk_actions(cur_proto, cur_npc))
+    cur_npc = get_world().npc[data['npc']]
     await state.set_state(FSM_Conversation.list_of_quest)
+    return await send_photo_or_text(message, cur_npc.image,
+                                    tp.talk_with_npc(cur_npc),
+                                    kb.make_keyboard_talk_actions(cur_proto, cur_npc))
 
 
 @router.message(FSM_Conversation.list_of_quest, F.text == 'Назад')
-async def handler_talk_list_quests_cancel(message: Message, state: FSMContext) -> None:
+async def handler_talk_list_quests_cancel(message: Message, state: FSMContext) -> Optional[TelegramMethod]:
     """
     #CONVERSATION -> LOCATION
 
@@ -198,11 +214,11 @@ async def handler_talk_list_quests_cancel(message: Message, state: FSMContext) -
     :param state: Current FSM Context.
     """
     
-    await handler_location_start(message, state)
+    return await handler_location_start(message, state)
 
 
 @router.message(FSM_Conversation.list_of_quest, F.text.startswith('Передать сообщение от '))
-async def handler_talk_pass_message(message: Message, state: FSMContext) -> None:
+async def handler_talk_pass_message(message: Message, state: FSMContext) -> Optional[TelegramMethod]:
     """
     #CONVERSATION -> QUEST_TALK_CONGRATULATION
 
@@ -217,18 +233,21 @@ async def handler_talk_pass_message(message: Message, state: FSMContext) -> None
     data = await state.get_data()
     cur_proto = get_proto_from_msg(message)
     cur_quest = cur_proto.find_messager(message.text)
-    cur_npc = data['cur_npc']
+    if cur_quest is None:
+        return
+    cur_npc = get_world().npc[data['npc']]
     if cur_quest.goal == cur_npc.id:
         cur_proto.complete_quest(cur_quest)
-        await message.answer(
-            tp.npc_quest_done(cur_proto, cur_quest),
+        locations = cur_proto.new_locations()
+        return message.answer(
+            tp.npc_quest_done(cur_proto, cur_quest, locations),
             reply_markup=kb.make_keyboard_talk_actions(cur_proto, cur_npc),
             parse_mode='HTML'
         )
 
 
 @router.message(FSM_Conversation.list_of_quest)
-async def handler_talk_list_quests(message: Message, state: FSMContext) -> None:
+async def handler_talk_list_quests(message: Message, state: FSMContext) -> Optional[TelegramMethod]:
     """
     #LIST_OF_QUESTS_NPC -> QUEST_DESCRIPTION_NPC
 
@@ -242,17 +261,17 @@ async def handler_talk_list_quests(message: Message, state: FSMContext) -> None:
 
     cur_proto = get_proto_from_msg(message)
     data = await state.get_data()
-    cur_npc = data['cur_npc']
-    await message.answer(
+    cur_npc = get_world().npc[data['npc']]
+    await state.set_state(FSM_Quest.descr)
+    return message.answer(
         tp.talk_npc_actions(),
         reply_markup=kb.make_keyboard_quests_list(cur_proto, cur_npc),
         parse_mode='HTML'
     )
-    await state.set_state(FSM_Quest.descr)
 
 
 @router.message(FSM_Quest.descr, F.text == 'Отмена')
-async def handler_quest_descr_cancel(message: Message, state: FSMContext) -> None:
+async def handler_quest_descr_cancel(message: Message, state: FSMContext) -> Optional[TelegramMethod]:
     """
      #LIST_OF_QUESTS_NPC -> CONVERSATION
 
@@ -263,11 +282,11 @@ async def handler_quest_descr_cancel(message: Message, state: FSMContext) -> Non
     :param state: Current FSM Context.
     """
     
-    await handler_talk_choose_npc_main(message, state)
+    return await handler_talk_choose_npc_main(message, state)
 
 
 @router.message(FSM_Quest.descr)
-async def handler_quest_descr(message: Message, state: FSMContext) -> None:
+async def handler_quest_descr(message: Message, state: FSMContext) -> Optional[TelegramMethod]:
     """
     #QUEST_DESCRIPTION_NPC
 
@@ -279,21 +298,21 @@ async def handler_quest_descr(message: Message, state: FSMContext) -> None:
     """
     
     data = await state.get_data()
-    cur_npc = data['cur_npc']
+    cur_npc = get_world().npc[data['npc']]
     cur_proto = get_proto_from_msg(message)
-    cur_quest = cur_npc.find_quest(message.text)
+    cur_quest = cur_proto.find_npc_quest(cur_npc, message.text)
     if cur_quest:
-        await message.answer(
+        await state.set_state(FSM_Quest.process)
+        await state.update_data({'quest': cur_quest.id, 'npc': cur_npc.id})
+        return message.answer(
             tp.npc_quest(cur_quest),
             reply_markup=kb.make_keyboard_quest_acts(cur_proto, cur_quest),
             parse_mode='HTML'
         )
-        await state.set_state(FSM_Quest.process)
-        await state.update_data({'cur_quest': cur_quest, 'cur_npc': cur_npc})
 
 
 @router.message(FSM_Quest.process, F.text == 'Взять Задание')
-async def handler_quest_take(message: Message, state: FSMContext) -> None:
+async def handler_quest_take(message: Message, state: FSMContext) -> Optional[TelegramMethod]:
     """
     #QUEST_DESCRIPTION_NPC -> LIST_OF_QUESTS_NPC
 
@@ -306,17 +325,17 @@ async def handler_quest_take(message: Message, state: FSMContext) -> None:
     """
     
     data = await state.get_data()
-    cur_quest = data['cur_quest']
+    cur_quest = get_world().quests[data['quest']]
     cur_proto = get_proto_from_msg(message)
     if cur_proto.has_quest(cur_quest):
         return
     cur_proto.take_quest(cur_quest)
     await message.answer(tp.npc_quest_taken(cur_quest), parse_mode='HTML')
-    await handler_talk_list_quests(message, state)
+    return await handler_talk_list_quests(message, state)
 
 
 @router.message(FSM_Quest.process, F.text == 'Назад')
-async def handler_quest_goback(message: Message, state: FSMContext) -> None:
+async def handler_quest_goback(message: Message, state: FSMContext) -> Optional[TelegramMethod]:
     """
     #QUEST_DESCRIPTION_NPC -> LIST_OF_QUESTS_NPC
 
@@ -327,11 +346,11 @@ async def handler_quest_goback(message: Message, state: FSMContext) -> None:
     :param state: Current FSM Context.
     """
 
-    await handler_talk_list_quests(message, state)
+    return await handler_talk_list_quests(message, state)
 
 
 @router.message(FSM_Quest.process, F.text == 'Отдать предмет')
-async def handler_quest_done_1(message: Message, state: FSMContext) -> None:
+async def handler_quest_done_1(message: Message, state: FSMContext) -> Optional[TelegramMethod]:
     """
     #TAKEN_QUEST_DESCRIPTION_NPC -> QUEST_DONE
 
@@ -343,14 +362,14 @@ async def handler_quest_done_1(message: Message, state: FSMContext) -> None:
     """
 
     data = await state.get_data()
-    cur_quest = data['cur_quest']
+    cur_quest = get_world().quests[data['quest']]
     cur_proto = get_proto_from_msg(message)
     if cur_quest.quest_type == QuestType.Bring and cur_proto.can_complete(cur_quest):
-        await handler_quest_done(message, state)
+        return await handler_quest_done(message, state)
 
 
 @router.message(FSM_Quest.process, F.text == 'Отчитаться об убийстве')
-async def handler_quest_done_2(message: Message, state: FSMContext) -> None:
+async def handler_quest_done_2(message: Message, state: FSMContext) -> Optional[TelegramMethod]:
     """
     #TAKEN_QUEST_DESCRIPTION_NPC -> QUEST_DONE
 
@@ -362,13 +381,13 @@ async def handler_quest_done_2(message: Message, state: FSMContext) -> None:
     """
 
     data = await state.get_data()
-    cur_quest = data['cur_quest']
+    cur_quest = get_world().quests[data['quest']]
     cur_proto = get_proto_from_msg(message)
     if cur_quest.quest_type == QuestType.Kill and cur_proto.can_complete(cur_quest):
-        await handler_quest_done(message, state)
+        return await handler_quest_done(message, state)
 
 
-async def handler_quest_done(message: Message, state: FSMContext) -> None:
+async def handler_quest_done(message: Message, state: FSMContext) -> Optional[TelegramMethod]:
     """
     #TAKEN_QUEST_DESCRIPTION_NPC -> QUEST_DONE
 
@@ -380,20 +399,19 @@ async def handler_quest_done(message: Message, state: FSMContext) -> None:
     """
     
     data = await state.get_data()
-    cur_quest = data['cur_quest']
-    cur_npc = data['cur_npc']
+    cur_quest = get_world().quests[data['quest']]
     cur_proto = get_proto_from_msg(message)
-    cur_npc.quests.remove(cur_quest)
     cur_proto.complete_quest(cur_quest)
-    await message.answer(
-        tp.npc_quest_done(cur_proto, cur_quest),
+    locations = cur_proto.new_locations()
+    return message.answer(
+        tp.npc_quest_done(cur_proto, cur_quest, locations),
         reply_markup=kb.make_keyboard_congratulation(),
         parse_mode='HTML'
     )
 
 
 @router.message(FSM_Quest.process, F.text == 'Отлично')
-async def handler_quest_done_great(message: Message, state: FSMContext) -> None:
+async def handler_quest_done_great(message: Message, state: FSMContext) -> Optional[TelegramMethod]:
     """
     #QUEST_DONE -> CONVERSATION
 
@@ -404,18 +422,18 @@ async def handler_quest_done_great(message: Message, state: FSMContext) -> None:
     :param state: Current FSM Context.     
     """
     data = await state.get_data()
-    cur_quest = data['cur_quest']
+    cur_quest = get_world().quests[data['quest']]
     if cur_quest.is_final:
-        await message.answer(tp.game_completed(), reply_markup=ReplyKeyboardRemove(), parse_mode='HTML')
         await state.set_state(FSM_End.completed)
+        return message.answer(tp.game_completed(), reply_markup=ReplyKeyboardRemove(), parse_mode='HTML')
     else:
-        await handler_talk_choose_npc_main(message, state)
+        return await handler_talk_choose_npc_main(message, state)
 
 
 # Атаковать
 
 @router.message(FSM_Location.choose_act, F.text == 'Осмотреть врага')
-async def handler_inspect(message: Message, state: FSMContext) -> None:
+async def handler_inspect(message: Message, state: FSMContext) -> Optional[TelegramMethod]:
     """
     #LOCATION
 
@@ -427,20 +445,19 @@ async def handler_inspect(message: Message, state: FSMContext) -> None:
     """
     
     cur_proto = get_proto_from_msg(message)
-    cur_location = cur_proto.current_location
-    if not cur_location.enemies:
-        await message.answer(tp.no_enemies())
-        return
-    await message.answer(
+    enemies = cur_proto.location_enemies()
+    if not enemies:
+        return message.answer(tp.no_enemies())
+    await state.set_state(FSM_Attack.choose_enemy)
+    return message.answer(
         tp.who_to_attack(),
-        reply_markup=kb.make_keyboard_attack_list(cur_location.enemies),
+        reply_markup=kb.make_keyboard_attack_list(enemies, cur_proto),
         parse_mode='HTML'
     )
-    await state.set_state(FSM_Attack.choose_enemy)
 
 
 @router.message(FSM_Attack.choose_enemy, F.text == 'Отмена')
-async def handler_inspect_cancel(message: Message, state: FSMContext) -> None:
+async def handler_inspect_cancel(message: Message, state: FSMContext) -> Optional[TelegramMethod]:
     """
     #LOCATION
 
@@ -451,11 +468,11 @@ async def handler_inspect_cancel(message: Message, state: FSMContext) -> None:
     :param state: Current FSM Context.
     """
     
-    await handler_location_start(message, state)
+    return await handler_location_start(message, state)
 
 
 @router.message(FSM_Attack.choose_enemy)
-async def handler_inspect_action(message: Message, state: FSMContext) -> None:
+async def handler_inspect_action(message: Message, state: FSMContext) -> Optional[TelegramMethod]:
     """
     #LOCATION -> ENEMY_DESCIPTION
 
@@ -467,14 +484,14 @@ async def handler_inspect_action(message: Message, state: FSMContext) -> None:
     """
     
     cur_proto = get_proto_from_msg(message)
-    cur_location = cur_proto.current_location
-    cur_enemy = get_enemy_from_msg(cur_location, message.text)
-    await state.set_state(FSM_Attack.descr)
-    await state.update_data({'cur_enemy': cur_enemy})
-    await handler_enemy_description(message, state)
+    cur_enemy = get_enemy_from_msg(cur_proto, message.text)
+    if cur_enemy:
+        await state.set_state(FSM_Attack.descr)
+        await state.update_data({'enemy': cur_enemy.id})
+        return await handler_enemy_description(message, state)
 
 
-async def handler_enemy_description(message: Message, state: FSMContext) -> None:
+async def handler_enemy_description(message: Message, state: FSMContext) -> Optional[TelegramMethod]:
     """
     #ENEMY_DESCIPTION
 
@@ -485,33 +502,36 @@ async def handler_enemy_description(message: Message, state: FSMContext) -> None
     :param state: Current FSM Context.
     """
     data = await state.get_data()
-    cur_enemy = data['cur_enemy']
-    await send_photo_or_text(message, cur_enemy.image,
-                             tp.inspect_enemy(cur_enemy), kb.make_keyboard_enemy_description())
+    cur_enemy = get_world().enemies[data['enemy']]
+    return await send_photo_or_text(message, cur_enemy.image,
+                                    tp.inspect_enemy(cur_enemy), kb.make_keyboard_enemy_description())
 
 
 @router.message(FSM_Attack.descr, F.text == 'Напасть')
-async def handler_battle_start(message: Message, state: FSMContext) -> None:
+async def handler_battle_start(message: Message, state: FSMContext) -> Optional[TelegramMethod]:
     """
     #ENEMY_DESCIPTION -> BATTLE
 
-    Calls after user is attacking enemy.
+    Calls after user is attacking enemy. Sends the battle
+    message, which is edited in place every round.
 
     :param message: All data about sent message from user.
     :param state: Current FSM Context.
     """
 
-    await state.update_data({
-        'prev_msg_info': None,
-        'msg_attack': None,
-        'prev_msg_attack': None
-    })
+    data = await state.get_data()
+    cur_proto = get_proto_from_msg(message)
+    cur_enemy = cur_proto.opponent(get_world().enemies[data['enemy']])
     await state.set_state(FSM_Battle.battle)
-    await handler_battle_action(message, state)
+    return message.answer(
+        tp.battle(cur_proto, cur_enemy),
+        reply_markup=kb.make_keyboard_battle(),
+        parse_mode='HTML'
+    )
 
 
 @router.message(FSM_Attack.descr, F.text == 'Назад')
-async def handler_description_cancel(message: Message, state: FSMContext) -> None:
+async def handler_description_cancel(message: Message, state: FSMContext) -> Optional[TelegramMethod]:
     """
     #ENEMY_DESCIPTION -> LOCATION
 
@@ -522,100 +542,146 @@ async def handler_description_cancel(message: Message, state: FSMContext) -> Non
     :param state: Current FSM Context.
     """
 
-    await handler_location_start(message, state)
+    return await handler_location_start(message, state)
 
 
-async def handler_battle_action(message: Message, state: FSMContext) -> None:
+async def handler_battle_dead(callback: CallbackQuery, state: FSMContext) -> Optional[TelegramMethod]:
     """
-    #ENEMY_DESCIPTION
+    #BATTLE -> DEAD
 
-    Calls after user has inspected enemy. Func display info
-    about enemy and gives choice: attack or go away.
+    Calls after protagonist has been killed in battle.
+    The battle message is edited to the death message.
 
-    :param message: All data about sent message from user.
+    :param callback: Callback query of the pressed button.
+    :param state: Current FSM Context.
+    """
+
+    await state.set_state(FSM_End.dead)
+    return callback.message.edit_text(tp.proto_dead(), parse_mode='HTML')
+
+
+@router.callback_query(FSM_Battle.battle, F.data == 'battle:attack')
+async def handler_battle_attack(callback: CallbackQuery, state: FSMContext) -> Optional[TelegramMethod]:
+    """
+    #BATTLE -> LOCATION
+
+    Calls after user is attacking enemy. The battle message
+    is edited to show result of the round and condition
+    of both sides. After victory user goes to the current location.
+
+    :param callback: Callback query of the pressed button.
     :param state: Current FSM Context.
     """
+    
     data = await state.get_data()
-    cur_proto = get_proto_from_msg(message)
-    cur_enemy = data['cur_enemy']
-    msg = await message.answer(
-        tp.battle(cur_proto, cur_enemy),
+    await callback.answer()
+    cur_proto = get_proto_from_msg(callback)
+    cur_enemy = cur_proto.opponent(get_world().enemies[data['enemy']])
+    if cur_enemy.is_dead:
+        return
+
+    try:
+        prota_roll, enemy_roll = cur_proto.attack(cur_enemy)
+    except ProtagonistDead:
+        return await handler_battle_dead(callback, state)
+    text = tp.attack_action(cur_proto, cur_enemy, prota_roll, enemy_roll)
+    if cur_enemy.is_dead:
+        await callback.message.edit_text(f'{text}\n\n{tp.enemy_defeated(cur_enemy)}', parse_mode='HTML')
+        return await location_start(callback.message, state, cur_proto)
+    return callback.message.edit_text(
+        f'{text}\n\n{tp.battle(cur_proto, cur_enemy)}',
         reply_markup=kb.make_keyboard_battle(),
         parse_mode='HTML'
     )
-    if message.text == 'Атаковать':
-        if data.get('msg_attack'):
-            if data.get('prev_msg_attack'):
-                await data['prev_msg_attack'].delete()
-            await state.update_data({'prev_msg_attack': data['msg_attack']})
-        await data['prev_msg_info'].delete()
-        await message.delete()
-    await state.update_data({'prev_msg_info': msg})
 
 
-@router.message(FSM_Battle.battle, F.text == 'Атаковать')
-async def handler_battle_attack(message: Message, state: FSMContext) -> None:
+@router.callback_query(FSM_Battle.battle, F.data == 'battle:auto')
+async def handler_battle_auto(callback: CallbackQuery, state: FSMContext) -> Optional[TelegramMethod]:
     """
-    #ENEMY_DESCIPTION -> BATTLE -> ENEMY_DESCRIPTION
+    #BATTLE -> LOCATION
 
-    Calls after user is attacking enemy.
+    Calls after user wants to fight until the end.
+    All rounds are played at once and the battle message
+    is edited to their summary.
 
-    :param message: All data about sent message from user.
+    :param callback: Callback query of the pressed button.
     :param state: Current FSM Context.
     """
-    
+
     data = await state.get_data()
-    async with data['semaphore']:
-        cur_proto = get_proto_from_msg(message)
-        cur_enemy = data['cur_enemy']
-        if cur_enemy.is_dead:
-            return
-
-        try:
-            prota_roll, enemy_roll = cur_proto.attack(cur_enemy)
-            msg = await message.answer(
-                tp.attack_action(cur_proto, cur_enemy, prota_roll, enemy_roll),
-                parse_mode='HTML'
-            )
-            await state.update_data({'msg_attack': msg})
-            if cur_enemy.is_dead:
-                await message.answer(
-                    tp.enemy_defeated(cur_enemy),
-                    reply_markup=kb.make_keyboard_congratulation(),
-                    parse_mode='HTML'
-                )
-                if cur_enemy in cur_proto.current_location.enemies:
-                    cur_proto.current_location.enemies.remove(cur_enemy)
-                await state.set_state(FSM_Battle.congratulation)
-                return
-            await handler_battle_action(message, state)
-        except ProtagonistDead:
-            await handler_dead(message, state)
-
-
-@router.message(FSM_Battle.battle, F.text == 'Сбежать')
-async def handler_battle_attack(message: Message, state: FSMContext) -> None:
+    await callback.answer()
+    cur_proto = get_proto_from_msg(callback)
+    cur_enemy = cur_proto.opponent(get_world().enemies[data['enemy']])
+    if cur_enemy.is_dead:
+        return
+
+    try:
+        result = cur_proto.fight(cur_enemy)
+    except ProtagonistDead:
+        return await handler_battle_dead(callback, state)
+    await callback.message.edit_text(tp.fight_result(cur_proto, cur_enemy, result), parse_mode='HTML')
+    return await location_start(callback.message, state, cur_proto)
+
+
+@router.callback_query(FSM_Battle.battle, F.data == 'battle:run')
+async def handler_battle_run(callback: CallbackQuery, state: FSMContext) -> Optional[TelegramMethod]:
     """
-    #ENEMY_DESCIPTION -> LOCATION
+    #BATTLE -> LOCATION
 
     Calls after user is going away from enemy.
     User goes to the current location
 
-    :param message: All data about sent message from user.
+    :param callback: Callback query of the pressed button.
     :param state: Current FSM Context.
     """
     
     data = await state.get_data()
-    cur_enemy = data['cur_enemy']
-    await message.answer(
+    await callback.answer()
+    cur_enemy = get_world().enemies[data['enemy']]
+    await callback.message.edit_text(
         tp.battle_run_off(cur_enemy),
         parse_mode='HTML'
     )
-    await handler_location_start(message, state)
+    return await location_start(callback.message, state, get_proto_from_msg(callback))
+
+
+@router.message(FSM_Battle.battle)
+async def handler_battle_message(message: Message, state: FSMContext) -> Optional[TelegramMethod]:
+    """
+    #BATTLE -> BATTLE
+
+    Calls after user has sent a message during the battle,
+    which is driven by the inline buttons. The battle message
+    is sent again, so the buttons are at hand.
+
+    :param message: All data about sent message from user.
+    :param state: Current FSM Context.
+    """
+
+    data = await state.get_data()
+    cur_proto = get_proto_from_msg(message)
+    cur_enemy = cur_proto.opponent(get_world().enemies[data['enemy']])
+    return message.answer(
+        tp.battle(cur_proto, cur_enemy),
+        reply_markup=kb.make_keyboard_battle(),
+        parse_mode='HTML'
+    )
+
+
+@router.callback_query(F.data.startswith('battle:'))
+async def handler_battle_expired(callback: CallbackQuery) -> Optional[TelegramMethod]:
+    """
+    Calls after user has pressed a button of a battle
+    that is already over.
+
+    :param callback: Callback query of the pressed button.
+    """
+
+    return callback.answer()
 
 
 @router.message(FSM_Battle.congratulation, F.text == 'Отлично')
-async def handler_battle_ended(message: Message, state: FSMContext) -> None:
+async def handler_battle_ended(message: Message, state: FSMContext) -> Optional[TelegramMethod]:
     """
     #BATTLE -> LOCATION
 
@@ -626,12 +692,12 @@ async def handler_battle_ended(message: Message, state: FSMContext) -> None:
     :param state: Current FSM Context.
     """
 
-    await handler_location_start(message, state)
+    return await handler_location_start(message, state)
 
 # Отправиться
 
 @router.message(FSM_Location.choose_act, F.text == 'Отправиться')
-async def handler_go(message: Message, state: FSMContext) -> None:
+async def handler_go(message: Message, state: FSMContext) -> Optional[TelegramMethod]:
     """
     #LOCATION
 
@@ -645,17 +711,16 @@ async def handler_go(message: Message, state: FSMContext) -> None:
     cur_proto = get_proto_from_msg(message)
     cur_location = cur_proto.current_location
     
-    await message.answer(
+    await state.set_state(FSM_Location.where_to_go)
+    return message.answer(
         tp.where_to_go(),
         reply_markup=kb.make_keyboard_directions_list(cur_location.directions, cur_proto),
         parse_mode='HTML'
     )
-    
-    await state.set_state(FSM_Location.where_to_go)
 
 
 @router.message(FSM_Location.where_to_go, F.text == 'Отмена')
-async def handler_go_where(message: Message, state: FSMContext) -> None:
+async def handler_go_where_cancel(message: Message, state: FSMContext) -> Optional[TelegramMethod]:
     """
     #LOCATION
 
@@ -665,11 +730,11 @@ async def handler_go_where(message: Message, state: FSMContext) -> None:
     :param state: Current FSM Context.
     """
     
-    await handler_location_start(message, state)
+    return await handler_location_start(message, state)
 
 
 @router.message(FSM_Location.where_to_go)
-async def handler_go_where(message: Message, state: FSMContext) -> None:
+async def handler_go_where(message: Message, state: FSMContext) -> Optional[TelegramMethod]:
     """
     #LOCATION -> (ANOTHER) LOCATION
 
@@ -688,11 +753,11 @@ async def handler_go_where(message: Message, state: FSMContext) -> None:
             parse_mode='HTML'
         )
         cur_proto.go(cur_direction)
-        await handler_location_start(message, state)
+        return await handler_location_start(message, state)
 
 
 @router.message(FSM_Location.choose_act, F.text == 'Меню героя')
-async def handler_protagonist_menu(message: Message, state: FSMContext) -> None:
+async def handler_protagonist_menu(message: Message, state: FSMContext) -> Optional[TelegramMethod]:
     """
     #LOCATION -> PROTAGONIST_MENU
 
@@ -703,16 +768,16 @@ async def handler_protagonist_menu(message: Message, state: FSMContext) -> None:
     :param state: Current FSM Context.
     """
 
-    await message.answer(
+    await state.set_state(FSM_Protagonist_Menu.process)
+    return message.answer(
         tp.proto_menu(),
         reply_markup=kb.make_keyboard_protagonist_menu(),
         parse_mode='HTML'
     )
-    await state.set_state(FSM_Protagonist_Menu.process)
 
 
 @router.message(FSM_Protagonist_Menu.process, F.text == 'Профиль героя')
-async def handler_task_list(message: Message, state: FSMContext) -> None:
+async def handler_protagonist_profile(message: Message, state: FSMContext) -> Optional[TelegramMethod]:
     """
     #PROTAGONIST_MENU
 
@@ -723,15 +788,16 @@ async def handler_task_list(message: Message, state: FSMContext) -> None:
     """
 
     cur_proto = get_proto_from_msg(message)
-    await message.answer(
-        tp.proto_info(cur_proto),
+    killed_enemies = cur_proto.get_killed_enemies()
+    return message.answer(
+        tp.proto_info(cur_proto, killed_enemies),
         reply_markup=kb.make_keyboard_protagonist_menu(),
         parse_mode='HTML'
     )
 
 
 @router.message(FSM_Protagonist_Menu.process, F.text == 'Список заданий')
-async def handler_task_list(message: Message, state: FSMContext) -> None:
+async def handler_task_list(message: Message, state: FSMContext) -> Optional[TelegramMethod]:
     """
     #PROTAGONIST_MENU -> LIST_OF_QUESTS_PROTAGONIST
 
@@ -744,21 +810,20 @@ async def handler_task_list(message: Message, state: FSMContext) -> None:
 
     cur_proto = get_proto_from_msg(message)
     if not cur_proto.current_quests:
-        await message.answer(tp.no_quests())
-        return
-    await message.answer(
+        return message.answer(tp.no_quests())
+    await state.set_state(FSM_Protagonist_Menu.quest_description)
+    return message.answer(
         tp.proto_quests_list(cur_proto),
         reply_markup=kb.make_keyboard_proto_quest_list(
             cur_proto,
-            cur_proto.current_quests
+            list(cur_proto.current_quests.values())
         ),
         parse_mode='HTML'
     )
-    await state.set_state(FSM_Protagonist_Menu.quest_description)
 
 
 @router.message(FSM_Protagonist_Menu.process, F.text == 'Назад')
-async def handler_task_list_descr_cancel(message: Message, state: FSMContext) -> None:
+async def handler_protagonist_menu_back(message: Message, state: FSMContext) -> Optional[TelegramMethod]:
     """
     #PROTAGONIST_MENU -> LOCATION
 
@@ -768,11 +833,11 @@ async def handler_task_list_descr_cancel(message: Message, state: FSMContext) ->
     :param message: All data about sent message from user.
     :param state: Current FSM Context.
     """
-    await handler_location_start(message, state)
+    return await handler_location_start(message, state)
 
 
 @router.message(FSM_Protagonist_Menu.quest_description, F.text == 'Отмена')
-async def handler_task_list_descr_cancel(message: Message, state: FSMContext) -> None:
+async def handler_task_list_descr_cancel(message: Message, state: FSMContext) -> Optional[TelegramMethod]:
     """
     #LIST_OF_QUESTS_PROTAGONIST -> PROTAGONIST_MENU
 
@@ -782,11 +847,11 @@ async def handler_task_list_descr_cancel(message: Message, state: FSMContext) ->
     :param message: All data about sent message from user.
     :param state: Current FSM Context.
     """
-    await handler_protagonist_menu(message, state)
+    return await handler_protagonist_menu(message, state)
 
 
 @router.message(FSM_Protagonist_Menu.quest_description)
-async def handler_quest_descr(message: Message, state: FSMContext) -> None:
+async def handler_task_descr(message: Message, state: FSMContext) -> Optional[TelegramMethod]:
     """
     #QUEST_DESCRIPTION_PROTAGONIST
 
@@ -799,17 +864,17 @@ async def handler_quest_descr(message: Message, state: FSMContext) -> None:
 
     cur_proto = get_proto_from_msg(message)
     cur_quest = cur_proto.find_quest(message.text)
-    await message.answer(
+    await state.set_state(FSM_Protagonist_Menu.quest_process)
+    await state.update_data({'quest': cur_quest.id})
+    return message.answer(
         tp.npc_quest(cur_quest),
         reply_markup=kb.make_keyboard_quest_description_back(),
         parse_mode='HTML'
     )
-    await state.set_state(FSM_Protagonist_Menu.quest_process)
-    await state.update_data({'cur_quest': cur_quest})
 
 
 @router.message(FSM_Protagonist_Menu.quest_process, F.text == 'Назад')
-async def handler_quest_goback(message: Message, state: FSMContext) -> None:
+async def handler_task_descr_back(message: Message, state: FSMContext) -> Optional[TelegramMethod]:
     """
     #QUEST_DESCRIPTION_PROTAGONIST -> LIST_OF_QUESTS_PROTAGONIST
 
@@ -819,10 +884,10 @@ async def handler_quest_goback(message: Message, state: FSMContext) -> None:
     :param state: Current FSM Context.
     """
 
-    await handler_task_list(message, state)
+    return await handler_task_list(message, state)
 
 
-async def handler_dead(message: Message, state: FSMContext) -> None:
+async def handler_dead(message: Message, state: FSMContext) -> Optional[TelegramMethod]:
     """
     #DEAD
 
@@ -833,5 +898,5 @@ async def handler_dead(message: Message, state: FSMContext) -> None:
     :param state: Current FSM Context.
     """
 
-    await message.answer(tp.proto_dead(), parse_mode='HTML')
     await state.set_state(FSM_End.dead)
+    return message.answer(tp.proto_dead(), parse_mode='HTML')
@@ -1,20 +1,86 @@
-from typing import List
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any, List, Mapping, Tuple
 
-from aiogram.types import ReplyKeyboardMarkup, KeyboardButton
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup, ReplyKeyboardMarkup, KeyboardButton
 
 from game import Direction, Enemy, NPC, Protagonist, QuestType, Quest
 
 
-def make_keyboard_welcome() -> ReplyKeyboardMarkup:
+KEYBOARD_CACHE_SIZE = 1024
+
+
+@lru_cache(maxsize=KEYBOARD_CACHE_SIZE)
+def make_keyboard(rows: Tuple[Tuple[str, ...], ...]) -> ReplyKeyboardMarkup:
     """
-    Funciton generates starting keyboard.
+    Funciton generates keyboard with given texts of buttons.
+    Keyboards are immutable, so one instance is shared by
+    everyone who gets the same buttons.
 
+    :param rows: Rows of button texts.
     :return: Appropriate keyboard
     """
 
     return ReplyKeyboardMarkup(keyboard=[
-        [KeyboardButton(text='Начать игру')]
+        [KeyboardButton(text=text) for text in row] for row in rows
     ], resize_keyboard=True)
+
+
+@lru_cache(maxsize=KEYBOARD_CACHE_SIZE)
+def make_buttons_index(texts: Tuple[str, ...], entities: Tuple[Any, ...]) -> Mapping[str, Any]:
+    """
+    Funciton generates index of entities by button text.
+    Text is stripped, as Telegram sends it without
+    leading and trailing whitespaces.
+
+    :param texts: Texts of buttons.
+    :param entities: Entity of every button.
+    :return: Read-only dictionary.
+    """
+
+    return MappingProxyType({text.strip(): entity for text, entity in zip(texts, entities)})
+
+
+def make_keyboard_entities(prota: Protagonist, texts: List[str], entities: List[Any],
+                           last: str) -> ReplyKeyboardMarkup:
+    """
+    Funciton generates keyboard with one button per entity
+    and remembers the entities of the buttons for protagonist,
+    so the pressed button is found by its text.
+
+    :param prota: Instance of Protagonist.
+    :param texts: Texts of buttons.
+    :param entities: Entity of every button.
+    :param last: Text of the last button.
+    :return: Appropriate keyboard
+    """
+
+    texts = tuple(texts)
+    prota.buttons = make_buttons_index(texts, tuple(entities))
+    return make_keyboard(tuple((text,) for text in texts) + ((last,),))
+
+
+KEYBOARD_WELCOME = make_keyboard((('Начать игру',),))
+KEYBOARD_LOCATION_START = make_keyboard((('Поговорить', 'Осмотреть врага'), ('Отправиться', 'Меню героя')))
+KEYBOARD_CONGRATULATION = make_keyboard((('Отлично',),))
+KEYBOARD_ENEMY_DESCRIPTION = make_keyboard((('Напасть', 'Назад'),))
+KEYBOARD_BACK = make_keyboard((('Назад',),))
+KEYBOARD_PROTAGONIST_MENU = make_keyboard((('Профиль героя', 'Список заданий'), ('Назад',)))
+KEYBOARD_BATTLE = InlineKeyboardMarkup(inline_keyboard=[
+    [InlineKeyboardButton(text='Атаковать', callback_data='battle:attack'),
+     InlineKeyboardButton(text='Сбежать', callback_data='battle:run')],
+    [InlineKeyboardButton(text='Биться до конца', callback_data='battle:auto')],
+])
+
+
+def make_keyboard_welcome() -> ReplyKeyboardMarkup:
+    """
+    Funciton generates starting keyboard.
+
+    :return: Appropriate keyboard
+    """
+
+    return KEYBOARD_WELCOME
     
 
 def make_keyboard_location_start() -> ReplyKeyboardMarkup:
@@ -25,10 +91,7 @@ def make_keyboard_location_start() -> ReplyKeyboardMarkup:
     :return: Appropriate keyboard
     """
 
-    return ReplyKeyboardMarkup(keyboard=[
-        [KeyboardButton(text='Поговорить'), KeyboardButton(text='Осмотреть врага')],
-        [KeyboardButton(text='Отправиться'), KeyboardButton(text='Меню героя')],
-    ], resize_keyboard=True)
+    return KEYBOARD_LOCATION_START
 
 
 def make_keyboard_congratulation() -> ReplyKeyboardMarkup:
@@ -39,9 +102,7 @@ def make_keyboard_congratulation() -> ReplyKeyboardMarkup:
     :return: Appropriate keyboard
     """
 
-    return ReplyKeyboardMarkup(keyboard=[
-        [KeyboardButton(text='Отлично')]
-    ], resize_keyboard=True)
+    return KEYBOARD_CONGRATULATION
 
 
 def make_keyboard_enemy_description() -> ReplyKeyboardMarkup:
@@ -52,46 +113,33 @@ def make_keyboard_enemy_description() -> ReplyKeyboardMarkup:
     :return: Appropriate keyboard
     """
 
-    return ReplyKeyboardMarkup(keyboard=[
-        [KeyboardButton(text='Напасть'), KeyboardButton(text='Назад')],
-    ], resize_keyboard=True)
+    return KEYBOARD_ENEMY_DESCRIPTION
 
 
-def make_keyboard_battle() -> ReplyKeyboardMarkup:
+def make_keyboard_battle() -> InlineKeyboardMarkup:
     """
-    Funciton generates keyboard with
-    possible actions with enemies.
+    Funciton generates inline keyboard with
+    possible actions with enemies. It is attached
+    to the battle message, which is edited every round.
 
     :return: Appropriate keyboard
     """
 
-    return ReplyKeyboardMarkup(keyboard=[
-        [KeyboardButton(text='Атаковать'), KeyboardButton(text='Сбежать')],
-    ], resize_keyboard=True)
+    return KEYBOARD_BATTLE
 
 
-def make_keyboard_talk(npcs: List[NPC]) -> ReplyKeyboardMarkup:
+def make_keyboard_talk(npcs: List[NPC], prota: Protagonist) -> ReplyKeyboardMarkup:
     """
     Funciton generates keyboard with npcs
     user can have conversation.
 
     :param npcs: List of npcs
+    :param prota: Instance of Protagonist.
     :return: Appropriate keyboard
     """
-    
-    buttons: List[List[KeyboardButton]] = []
 
-    for npc in npcs:
-        buttons.append([KeyboardButton(
-            text='Поговорить с {name}'.format(
-                name=npc.name
-        )
-    )])
-    buttons.append([KeyboardButton(
-        text='Отмена'
-    )])
-        
-    return ReplyKeyboardMarkup(keyboard=buttons, resize_keyboard=True)
+    texts = ['Поговорить с {name}'.format(name=npc.name) for npc in npcs]
+    return make_keyboard_entities(prota, texts, npcs, 'Отмена')
 
 
 def make_keyboard_talk_actions(prota: Protagonist, npc: NPC) -> ReplyKeyboardMarkup:
@@ -104,12 +152,9 @@ def make_keyboard_talk_actions(prota: Protagonist, npc: NPC) -> ReplyKeyboardMar
     :return: Appropriate keyboard.
     """
 
-    buttons: List[List[KeyboardButton]] = [[KeyboardButton(text='Список заданий')]]
-    for npc_name in prota.messages_for(npc):
-        buttons.append([KeyboardButton(text=f'Передать сообщение от {npc_name}')])
-    buttons.append([KeyboardButton(text='Назад')])
-
-    return ReplyKeyboardMarkup(keyboard=buttons, resize_keyboard=True)
+    quests = prota.messages_for(npc)
+    texts = ['Список заданий'] + [f'Передать сообщение от {quest.npc_name}' for quest in quests]
+    return make_keyboard_entities(prota, texts, [None] + quests, 'Назад')
 
 
 def make_keyboard_proto_quest_list(prota: Protagonist, quests: List[Quest],
@@ -124,8 +169,8 @@ def make_keyboard_proto_quest_list(prota: Protagonist, quests: List[Quest],
     :param npc: NPC if talk_state is True
     :return: Appropriate keyboard.
     """
-    
-    buttons: List[List[KeyboardButton]] = []
+
+    texts: List[str] = []
 
     for quest in quests:
         text = f'    {quest.name}'
@@ -142,10 +187,9 @@ def make_keyboard_proto_quest_list(prota: Protagonist, quests: List[Quest],
                 text += ' (можно сдать)'
             else:
                 text += ' (взято)'
-        buttons.append([KeyboardButton(text=text)])
+        texts.append(text)
 
-    buttons.append([KeyboardButton(text='Отмена')])
-    return ReplyKeyboardMarkup(keyboard=buttons, resize_keyboard=True)  
+    return make_keyboard_entities(prota, texts, quests, 'Отмена')
 
 
 def make_keyboard_quests_list(proto: Protagonist, npc: NPC) -> ReplyKeyboardMarkup:
@@ -158,7 +202,7 @@ def make_keyboard_quests_list(proto: Protagonist, npc: NPC) -> ReplyKeyboardMark
     :return: Appropriate keyboard.
     """
 
-    return make_keyboard_proto_quest_list(proto, npc.quests, talk_state=True)
+    return make_keyboard_proto_quest_list(proto, proto.npc_quests(npc), talk_state=True)
 
 
 def make_keyboard_quest_acts(proto: Protagonist, quest: Quest):
@@ -178,36 +222,24 @@ def make_keyboard_quest_acts(proto: Protagonist, quest: Quest):
         elif quest.quest_type == QuestType.Bring and quest.goal in proto.inventory:
             complete_button_text = 'Отдать предмет'
         if complete_button_text:
-            return ReplyKeyboardMarkup(keyboard=[
-                [KeyboardButton(text=complete_button_text)],
-                [KeyboardButton(text='Назад')]
-            ], resize_keyboard=True)
-        return ReplyKeyboardMarkup(keyboard=[
-            [KeyboardButton(text='Назад')]
-        ], resize_keyboard=True)
-    return ReplyKeyboardMarkup(keyboard=[
-        [KeyboardButton(text='Взять Задание'), KeyboardButton(text='Назад')]
-    ], resize_keyboard=True)
+            return make_keyboard(((complete_button_text,), ('Назад',)))
+        return KEYBOARD_BACK
+    return make_keyboard((('Взять Задание', 'Назад'),))
 
 
-def make_keyboard_attack_list(enemies: List[Enemy]) -> ReplyKeyboardMarkup:
+def make_keyboard_attack_list(enemies: List[Enemy], prota: Protagonist) -> ReplyKeyboardMarkup:
     """
     Funciton generates keyboard with
     enemies on the current location user
     can attack.
 
     :param enemies: List of enemies.
+    :param prota: Instance of Protagonist.
     :return: Appropriate keyboard.
     """
 
-    buttons: List[List[KeyboardButton]] = []
-
-    for enemy in enemies:
-        text = f'{enemy.name}\n'
-        buttons.append([KeyboardButton(text=text)])
-    buttons.append([KeyboardButton(text='Отмена')])
-
-    return ReplyKeyboardMarkup(keyboard=buttons, resize_keyboard=True)
+    texts = [f'{enemy.name}\n' for enemy in enemies]
+    return make_keyboard_entities(prota, texts, enemies, 'Отмена')
 
 
 def make_keyboard_directions_list(directions: List[Direction], prota: Protagonist) -> ReplyKeyboardMarkup:
@@ -220,16 +252,15 @@ def make_keyboard_directions_list(directions: List[Direction], prota: Protagonis
     :return: Appropriate keyboard.
     """
 
-    buttons: List[List[KeyboardButton]] = []
+    texts: List[str] = []
 
     for direction in directions:
         text = f'{direction.name}'
         if direction.location_level > prota.level:
             text += f' (закрыто, {direction.location_level} ур.)'
-        buttons.append([KeyboardButton(text=text + '\n')])
-    buttons.append([KeyboardButton(text='Отмена')])
+        texts.append(text + '\n')
 
-    return ReplyKeyboardMarkup(keyboard=buttons, resize_keyboard=True)
+    return make_keyboard_entities(prota, texts, directions, 'Отмена')
 
 
 def make_keyboard_quest_description_back() -> ReplyKeyboardMarkup:
@@ -239,7 +270,7 @@ def make_keyboard_quest_description_back() -> ReplyKeyboardMarkup:
     :return: Appropriate keyboard.
     """
 
-    return ReplyKeyboardMarkup(keyboard=[[KeyboardButton(text='Назад')]], resize_keyboard=True)
+    return KEYBOARD_BACK
 
 
 def make_keyboard_protagonist_menu() -> ReplyKeyboardMarkup:
@@ -249,5 +280,4 @@ def make_keyboard_protagonist_menu() -> ReplyKeyboardMarkup:
     :return: Appropriate keyboard.
     """
 
-    return ReplyKeyboardMarkup(keyboard=[[KeyboardButton(text='Профиль героя'), KeyboardButton(text='Список заданий')],
-                                         [KeyboardButton(text='Назад')]], resize_keyboard=True)
+    return KEYBOARD_PROTAGONIST_MENU
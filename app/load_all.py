@@ -1,143 +1,449 @@
+import argparse
+import asyncio
 import json
+import re
 import sys
+import time
+from typing import Any, Callable, Iterator, Optional, TextIO
+
+from sqlalchemy import Insert, Table, delete, select
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
 from database import *
 
 
 DATA_FILE = 'default_db.json'
 
+"""
+Rows inserted with one executemany.
+"""
+CHUNK_SIZE = 5000
+
+"""
+Ids in one DELETE of rows missing from the file.
+"""
+PRUNE_CHUNK_SIZE = 500
+
+"""
+Characters read from the file at once.
+"""
+READ_SIZE = 1 << 16
+
+WHITESPACE = re.compile(r'[ \t\n\r]*')
 
-def load_location(session: Session, location: dict) -> None:
+
+def location_row(location: dict) -> dict[str, Any]:
     """
-    Loading all locations from json to the database.
+    Makes row of the location table.
 
-    :param session: Session of the database.
     :param location: Dictionary that contains info
         about location.
     """
 
-    session.add(Location(location['name'],
-                         location['description'],
-                         location['level'],
-                         id=location['id'],
-                         image=location.get('image')))
+    return {'id': location['id'],
+            'name': location['name'],
+            'description': location['description'],
+            'level': location['level'],
+            'image': location.get('image')}
 
 
-def load_direction(session: Session, direction: dict) -> None:
+def direction_row(direction: dict) -> dict[str, Any]:
     """
-    Loading all directions from json to the database.
+    Makes row of the direction table.
 
-    :param session: Session of the database.
     :param direction: Dictionary that contains info
         about direction.
     """
 
-    session.add(Direction(direction['name'],
-                          id=direction['id'],
-                          from_location_id=direction['from_location_id'],
-                          to_location_id=direction['to_location_id']))
+    return {'id': direction['id'],
+            'name': direction['name'],
+            'from_location_id': direction['from_location_id'],
+            'to_location_id': direction['to_location_id']}
 
 
-def load_npc(session: Session, npc: dict) -> None:
+def npc_row(npc: dict) -> dict[str, Any]:
     """
-    Loading all npcs from json to the database.
+    Makes row of the npc table.
 
-    :param session: Session of the database.
     :param npc: Dictionary that contains info
         about npc.
     """
 
-    session.add(NPC(npc['name'],
-                    npc['description'],
-                    npc['phrase'],
-                    id=npc['id'],
-                    image=npc.get('image'),
-                    location_id=npc['location_id']))
+    return {'id': npc['id'],
+            'name': npc['name'],
+            'description': npc['description'],
+            'phrase': npc['phrase'],
+            'image': npc.get('image'),
+            'location_id': npc['location_id']}
 
 
-def load_enemy(session: Session, enemy: dict) -> None:
+def enemy_row(enemy: dict) -> dict[str, Any]:
     """
-    Loading all enemies from json to the database.
+    Makes row of the enemy table.
 
-    :param session: Session of the database.
     :param enemy: Dictionary that contains info
         about enemy.
     """
 
-    session.add(Enemy(enemy['name'],
-                      enemy['description'],
-                      enemy['phrase'],
-                      enemy['level'],
-                      enemy['health'],
-                      enemy['damage'],
-                      id=enemy['id'],
-                      image=enemy.get('image'),
-                      location_id=enemy['location_id']))
+    return {'id': enemy['id'],
+            'name': enemy['name'],
+            'description': enemy['description'],
+            'phrase': enemy['phrase'],
+            'level': enemy['level'],
+            'health': enemy['health'],
+            'damage': enemy['damage'],
+            'image': enemy.get('image'),
+            'location_id': enemy['location_id']}
 
 
-def load_item(session: Session, item: dict) -> None:
+def item_row(item: dict) -> dict[str, Any]:
     """
-    Loading all items from json to the database.
+    Makes row of the item table.
 
-    :param session: Session of the database.
     :param item: Dictionary that contains info
         about items.
     """
 
-    session.add(Item(item['name'],
-                     id=item['id'],
-                     enemy_id=item['enemy_id']))
+    return {'id': item['id'],
+            'name': item['name'],
+            'enemy_id': item['enemy_id']}
 
 
-def load_quest(session: Session, quest: dict) -> None:
+def quest_row(quest: dict) -> dict[str, Any]:
     """
-    Loading all quests from json to the database.
+    Makes row of the quest table. The goal is the first
+    of goal_item_id, goal_npc_id and goal_enemy_id set.
 
-    :param session: Session of the database.
     :param quest: Dictionary that contains info
         about quest.
     """
-    
-    quest_type: QuestType = QuestType.Kill
-    goal: int = quest.get('goal_enemy_id')
+
+    row = {'id': quest['id'],
+           'name': quest['name'],
+           'description': quest['description'],
+           'congratulation': quest['congratulation'],
+           'npc_id': quest['npc_id'],
+           'is_final': quest.get('is_final', False),
+           'goal_item_id': None,
+           'goal_npc_id': None,
+           'goal_enemy_id': None}
     if quest.get('goal_item_id'):
-        quest_type = QuestType.Bring
-        goal = quest.get('goal_item_id')
+        row['goal_item_id'] = quest['goal_item_id']
     elif quest.get('goal_npc_id'):
-        quest_type = QuestType.Talk
-        goal = quest.get('goal_npc_id')
-    session.add(Quest(quest['name'],
-                      quest['description'],
-                      quest['congratulation'],
-                      goal,
-                      quest_type,
-                      id=quest['id'],
-                      npc_id=quest['npc_id'],
-                      is_final=quest.get('is_final', False)))
+        row['goal_npc_id'] = quest['goal_npc_id']
+    else:
+        row['goal_enemy_id'] = quest.get('goal_enemy_id')
+    return row
+
+
+"""
+Table and row maker by section of the world file.
+"""
+SECTIONS: dict[str, tuple[Table, Callable[[dict], dict[str, Any]]]] = {
+    'locations': (Location.__table__, location_row),
+    'directions': (Direction.__table__, direction_row),
+    'npc': (NPC.__table__, npc_row),
+    'enemies': (Enemy.__table__, enemy_row),
+    'items': (Item.__table__, item_row),
+    'quests': (Quest.__table__, quest_row),
+}
+
+
+class JSONStream:
+    """
+    Reads the world file piece by piece, so only the entity
+    being parsed and one read block are kept in memory.
+
+    :param fp: File opened in text mode.
+    :param buffer: Text read but not parsed yet.
+    :param pos: Position of the next character in the buffer.
+    :param eof: True if the file is read to the end.
+    """
+
+    def __init__(self, fp: TextIO) -> None:
+        """
+        Constructor method.
+        """
+
+        self.fp: TextIO = fp
+        self.buffer: str = ''
+        self.pos: int = 0
+        self.eof: bool = False
+        self.decoder = json.JSONDecoder()
+
+    def read(self) -> bool:
+        """
+        Appends next block of the file to the buffer.
+
+        :return: False if the file has ended.
+        """
+
+        block = self.fp.read(READ_SIZE)
+        if not block:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + block
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """
+        Skips whitespace and returns the next character,
+        '' at the end of the file.
+        """
+
+        while True:
+            self.pos = WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer) or not self.read():
+                return self.buffer[self.pos:self.pos + 1]
+
+    def expect(self, chars: str) -> str:
+        """
+        Consumes the next character, which must be one of <chars>.
+
+        :return: The character.
+        """
+
+        char = self.peek()
+        if not char or char not in chars:
+            raise ValueError(f'Expected one of {chars!r} at {self.pos}, got {char!r}')
+        self.pos += 1
+        return char
+
+    def value(self) -> Any:
+        """
+        Parses the next JSON value. Objects and strings are
+        complete once they decode, numbers at the end of the
+        buffer are read again with more text.
+        """
+
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if not self.read():
+                    raise
+                continue
+            if end < len(self.buffer) or self.eof or not self.read():
+                self.pos = end
+                return value
+
+    def sections(self) -> Iterator[tuple[str, Iterator[Any]]]:
+        """
+        Yields name and entities of every section of
+        {"section": [entity, ...], ...}. Entities of a section
+        must be consumed before the next section is taken.
+        """
+
+        self.expect('{')
+        if self.peek() == '}':
+            return
+        while True:
+            name = self.value()
+            self.expect(':')
+            yield name, self.entities()
+            if self.expect(',}') == '}':
+                return
+
+    def entities(self) -> Iterator[Any]:
+        """
+        Yields entities of a JSON array one by one.
+        """
+
+        self.expect('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            if self.expect(',]') == ']':
+                return
+
+
+def upsert(table: Table) -> Insert:
+    """
+    Returns INSERT of <table> that updates the row
+    with the same primary key, so the world can be
+    loaded again over the old one.
+    """
+
+    stmt = insert(table)
+    keys = [column.name for column in table.primary_key]
+    return stmt.on_conflict_do_update(
+        index_elements=keys,
+        set_={column.name: stmt.excluded[column.name] for column in table.columns if column.name not in keys},
+    )
+
+
+async def load_section(conn: AsyncConnection, table: Table, make_row: Callable[[dict], dict[str, Any]],
+                       entities: Iterator[dict], chunk_size: int, ids: Optional[set[int]] = None) -> int:
+    """
+    Upserts entities of one section by chunks, one executemany
+    per chunk. The statement is compiled once and rows go to
+    the driver as they are, which saves SQLAlchemy processing
+    parameters of every row.
+
+    :param conn: Connection with the transaction of the load.
+    :param ids: Set the ids of loaded rows are added to, if given.
+    :return: Number of rows.
+    """
+
+    sql = str(upsert(table).compile(dialect=sqlite.dialect(paramstyle='named')))
+    rows = 0
+    chunk: list[dict[str, Any]] = []
+    for entity in entities:
+        chunk.append(make_row(entity))
+        if ids is not None:
+            ids.add(entity['id'])
+        if len(chunk) == chunk_size:
+            await conn.exec_driver_sql(sql, chunk)
+            rows += len(chunk)
+            chunk = []
+    if chunk:
+        await conn.exec_driver_sql(sql, chunk)
+        rows += len(chunk)
+    return rows
+
+
+async def prune(conn: AsyncConnection, table: Table, ids: set[int]) -> int:
+    """
+    Deletes rows of <table> with ids not in <ids>.
+
+    :param conn: Connection with the transaction of the load.
+    :return: Number of deleted rows.
+    """
+
+    removed = [i for i in (await conn.execute(select(table.c.id))).scalars() if i not in ids]
+    for start in range(0, len(removed), PRUNE_CHUNK_SIZE):
+        await conn.execute(delete(table).where(table.c.id.in_(removed[start:start + PRUNE_CHUNK_SIZE])))
+    return len(removed)
+
+
+async def load_file(conn: AsyncConnection, path: str = DATA_FILE, chunk_size: int = CHUNK_SIZE,
+                    remove_missing: bool = False) -> list[tuple[str, int, float]]:
+    """
+    Loads the world file in the transaction of <conn>, so
+    the caller decides whether the load is committed.
+
+    :param conn: Connection with an open transaction.
+    :param path: Filepath of the world.
+    :param chunk_size: Rows per executemany.
+    :param remove_missing: Delete rows that are not in the file,
+        so the database holds exactly the world of the file.
+    :return: Name, number of rows and seconds of every section.
+    """
+
+    await conn.run_sync(create_schema)
+    stats = []
+    loaded: dict[str, set[int]] = {name: set() for name in SECTIONS}
+    with open(path, 'r', encoding='utf-8') as fp:
+        for name, entities in JSONStream(fp).sections():
+            if name not in SECTIONS:
+                raise ValueError(f'Unknown section {name!r} in {path}')
+            start = time.perf_counter()
+            rows = await load_section(conn, *SECTIONS[name], entities, chunk_size,
+                                      loaded[name] if remove_missing else None)
+            stats.append((name, rows, time.perf_counter() - start))
+    if remove_missing:
+        for name, (table, _) in SECTIONS.items():
+            await prune(conn, table, loaded[name])
+    return stats
+
+
+def read_file(path: str = DATA_FILE) -> dict[str, list[dict[str, Any]]]:
+    """
+    Parses the world file into rows of every section without
+    touching the database, so a broken file is found before
+    a transaction is opened.
+
+    :param path: Filepath of the world.
+    :return: Rows by name of section.
+    """
+
+    rows: dict[str, list[dict[str, Any]]] = {}
+    with open(path, 'r', encoding='utf-8') as fp:
+        for name, entities in JSONStream(fp).sections():
+            if name not in SECTIONS:
+                raise ValueError(f'Unknown section {name!r} in {path}')
+            make_row = SECTIONS[name][1]
+            rows.setdefault(name, []).extend(make_row(entity) for entity in entities)
+    return rows
+
+
+async def load_rows(conn: AsyncConnection, rows: dict[str, list[dict[str, Any]]], chunk_size: int = CHUNK_SIZE,
+                    remove_missing: bool = False) -> list[tuple[str, int, float]]:
+    """
+    Upserts rows made by read_file() in the transaction of <conn>.
+
+    :param conn: Connection with an open transaction.
+    :param rows: Rows by name of section.
+    :param chunk_size: Rows per executemany.
+    :param remove_missing: Delete rows that are not in <rows>.
+    :return: Name, number of rows and seconds of every section.
+    """
+
+    stats = []
+    for name, section in rows.items():
+        start = time.perf_counter()
+        # Rows are made already, so they are passed through as they are.
+        count = await load_section(conn, SECTIONS[name][0], dict, iter(section), chunk_size)
+        stats.append((name, count, time.perf_counter() - start))
+    if remove_missing:
+        for name, (table, _) in SECTIONS.items():
+            await prune(conn, table, {row['id'] for row in rows.get(name, ())})
+    return stats
+
+
+async def load_world(path: str = DATA_FILE, chunk_size: int = CHUNK_SIZE, remove_missing: bool = False,
+                     bind: AsyncEngine = engine) -> list[tuple[str, int, float]]:
+    """
+    Loads the world file into the database in one transaction,
+    so a broken file leaves the database as it was.
+
+    :param path: Filepath of the world.
+    :param chunk_size: Rows per executemany.
+    :param remove_missing: Delete rows that are not in the file.
+    :param bind: Engine of the database, the bot's one by default.
+    :return: Name, number of rows and seconds of every section.
+    """
+
+    async with bind.begin() as conn:
+        return await load_file(conn, path, chunk_size, remove_missing)
+
+
+def print_stats(stats: list[tuple[str, int, float]], elapsed: float) -> None:
+    """
+    Prints rows and rows per second of every section and in total.
+
+    :param stats: Result of load_world().
+    :param elapsed: Seconds of the whole load.
+    """
+
+    for name, rows, seconds in stats:
+        print(f'{name:<12}{rows:>10} rows{rows / seconds if seconds else 0:>12.0f} rows/s')
+    total = sum(rows for _, rows, _ in stats)
+    print(f'{"total":<12}{total:>10} rows{total / elapsed if elapsed else 0:>12.0f} rows/s')
 
 
-def main() -> int:
+async def main(path: str = DATA_FILE, chunk_size: int = CHUNK_SIZE, remove_missing: bool = False) -> int:
     """
     Entry point for load_all.py
     """
 
-    with open(DATA_FILE, 'r', encoding='utf-8') as fp, Session() as session:
-        data: dict = json.load(fp)
-        for location in data['locations']:
-            load_location(session, location)
-        for direction in data['directions']:
-            load_direction(session, direction)
-        for npc in data['npc']:
-            load_npc(session, npc)
-        for enemy in data['enemies']:
-            load_enemy(session, enemy)
-        for item in data['items']:
-            load_item(session, item)
-        session.commit()
-        for quest in data['quests']:
-            load_quest(session, quest)
-        session.commit()
+    start = time.perf_counter()
+    stats = await load_world(path, chunk_size, remove_missing)
+    print_stats(stats, time.perf_counter() - start)
+    await engine.dispose()
     return 0
 
 
 if __name__ == '__main__':
-    sys.exit(main())
+    parser = argparse.ArgumentParser(description='Loads the world into the database')
+    parser.add_argument('file', nargs='?', default=DATA_FILE, help='world file')
+    parser.add_argument('--chunk', type=int, default=CHUNK_SIZE, help='rows per executemany')
+    parser.add_argument('--remove-missing', action='store_true', help='delete rows that are not in the file')
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.file, args.chunk, args.remove_missing)))
@@ -0,0 +1,119 @@
+import hashlib
+import json
+import os
+from typing import Optional
+
+from aiogram import Bot
+from aiogram.types import FSInputFile
+
+
+FILE_IDS_PATH = 'file_ids.json'
+IMAGES_DIR = 'img'
+
+
+class FileIdCache:
+    """
+    Telegram file_id of already uploaded images.
+    Ids are keyed by sha256 of the file, so a changed
+    file is uploaded again. Cache is saved to disk
+    after every new id.
+
+    :param path: Filepath where cache is stored.
+    :param file_ids: file_id by sha256 of image.
+    :param digests: (mtime, size, sha256) by image filepath.
+    """
+
+    def __init__(self, path: str = FILE_IDS_PATH) -> None:
+        """
+        Constructor method.
+        """
+
+        self.path: str = path
+        self.file_ids: dict[str, str] = {}
+        self.digests: dict[str, tuple[float, int, str]] = {}
+        self.load()
+
+    def load(self) -> None:
+        """
+        Reads cache from disk if it exists.
+        """
+
+        try:
+            with open(self.path, 'r', encoding='utf-8') as fp:
+                self.file_ids = json.load(fp)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.file_ids = {}
+
+    def save(self) -> None:
+        """
+        Writes cache to disk, replacing old file atomically.
+        """
+
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as fp:
+            json.dump(self.file_ids, fp)
+        os.replace(tmp_path, self.path)
+
+    def digest(self, image: str) -> str:
+        """
+        Returns sha256 of the image. File is hashed again
+        only if its size or modification time has changed.
+
+        :param image: Path to the image.
+        :return: Hex digest.
+        """
+
+        stat = os.stat(image)
+        cached = self.digests.get(image)
+        if cached and cached[0] == stat.st_mtime and cached[1] == stat.st_size:
+            return cached[2]
+        with open(image, 'rb') as fp:
+            sha = hashlib.sha256(fp.read()).hexdigest()
+        self.digests[image] = (stat.st_mtime, stat.st_size, sha)
+        return sha
+
+    def get(self, image: str) -> Optional[str]:
+        """
+        Returns file_id of the image if it was uploaded before.
+
+        :param image: Path to the image.
+        :return: file_id or None.
+        """
+
+        return self.file_ids.get(self.digest(image))
+
+    def put(self, image: str, file_id: str) -> None:
+        """
+        Remembers file_id of the uploaded image.
+
+        :param image: Path to the image.
+        :param file_id: file_id returned by Telegram.
+        """
+
+        self.file_ids[self.digest(image)] = file_id
+        self.save()
+
+    async def prewarm(self, bot: Bot, chat_id: int, directory: str = IMAGES_DIR) -> int:
+        """
+        Uploads every not cached image from <directory> to the <chat_id> chat
+        and deletes sent messages right away.
+
+        :param bot: Bot instance.
+        :param chat_id: Chat used for uploading.
+        :param directory: Directory with images.
+        :return: Number of uploaded images.
+        """
+
+        uploaded = 0
+        for name in sorted(os.listdir(directory)):
+            image = os.path.join(directory, name)
+            if not os.path.isfile(image) or self.get(image):
+                continue
+            msg = await bot.send_photo(chat_id, FSInputFile(image))
+            self.put(image, msg.photo[-1].file_id)
+            await msg.delete()
+            uploaded += 1
+        return uploaded
+
+
+file_ids = FileIdCache()
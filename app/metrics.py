@@ -0,0 +1,370 @@
+import bisect
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from aiogram import BaseMiddleware
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+from aiogram.types import TelegramObject
+from aiohttp import web
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+if TYPE_CHECKING:
+    from aiogram import Bot
+
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """
+    Prometheus histogram with fixed buckets.
+
+    :param buckets: Upper bounds of buckets.
+    :param counts: Number of observations by bucket, not cumulative.
+    :param sum: Sum of observed values.
+    :param count: Number of observations.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...]) -> None:
+        """
+        Constructor method.
+        """
+
+        self.buckets: Tuple[float, ...] = buckets
+        self.counts: List[int] = [0] * (len(buckets) + 1)
+        self.sum: float = 0.0
+        self.count: int = 0
+
+    def observe(self, value: float) -> None:
+        """
+        Adds one observation.
+
+        :param value: Observed value.
+        """
+
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class UpdateStats:
+    """
+    What one update has cost so far.
+
+    :param handler: Name of the handler function.
+    :param api_calls: Number of Bot API calls.
+    :param queries: Number of SQL statements.
+    :param statements: Number of executions by statement,
+        filled by sqltrace.QueryTracer.
+    """
+
+    def __init__(self) -> None:
+        """
+        Constructor method.
+        """
+
+        self.handler: str = ''
+        self.api_calls: int = 0
+        self.queries: int = 0
+        self.statements: Counter[str] = Counter()
+
+
+"""
+Stats of the update being handled in the current task.
+"""
+current_stats: ContextVar[Optional[UpdateStats]] = ContextVar('current_stats', default=None)
+
+
+def format_labels(labels: Labels, extra: str = '') -> str:
+    """
+    Formats labels as {name="value",...}.
+    """
+
+    parts = [f'{name}="{escape(value)}"' for name, value in labels]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+def escape(value: str) -> str:
+    """
+    Escapes label value for the text format.
+    """
+
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_number(value: float) -> str:
+    """
+    Formats number for the text format.
+    """
+
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Registry:
+    """
+    Metrics of the bot in Prometheus text format.
+
+    :param histograms: Histograms by name and labels.
+    :param counters: Counters by name and labels.
+    :param help: Description by metric name.
+    :param gauges: Functions returning gauges by metric name prefix.
+    """
+
+    def __init__(self) -> None:
+        """
+        Constructor method.
+        """
+
+        self.histograms: Dict[str, Dict[Labels, Histogram]] = {}
+        self.counters: Dict[str, Dict[Labels, float]] = {}
+        self.help: Dict[str, str] = {}
+        self.gauges: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+    def observe(self, name: str, value: float, buckets: Tuple[float, ...], **labels: str) -> None:
+        """
+        Adds observation to the histogram.
+
+        :param name: Name of the histogram.
+        :param value: Observed value.
+        :param buckets: Buckets used if the histogram is new.
+        :param labels: Labels of the histogram.
+        """
+
+        series = self.histograms.setdefault(name, {})
+        key = tuple(labels.items())
+        histogram = series.get(key)
+        if histogram is None:
+            histogram = series[key] = Histogram(buckets)
+        histogram.observe(value)
+
+    def inc(self, name: str, value: float = 1, **labels: str) -> None:
+        """
+        Increases the counter.
+
+        :param name: Name of the counter.
+        :param value: Increment.
+        :param labels: Labels of the counter.
+        """
+
+        series = self.counters.setdefault(name, {})
+        key = tuple(labels.items())
+        series[key] = series.get(key, 0) + value
+
+    def register_gauges(self, prefix: str, collect: Callable[[], Dict[str, Any]]) -> None:
+        """
+        Adds gauges read from <collect>() on every scrape,
+        like SessionPool.metrics().
+
+        :param prefix: Prefix of metric names.
+        :param collect: Function returning numbers by name.
+        """
+
+        self.gauges[prefix] = collect
+
+    def lines(self) -> Iterable[str]:
+        """
+        Yields lines of the text format.
+        """
+
+        for name, series in self.histograms.items():
+            if name in self.help:
+                yield f'# HELP {name} {self.help[name]}'
+            yield f'# TYPE {name} histogram'
+            for labels, histogram in series.items():
+                cumulative = 0
+                for bound, count in zip(histogram.buckets + (float('inf'),), histogram.counts):
+                    cumulative += count
+                    le = format_labels(labels, f'le="{format_number(bound)}"')
+                    yield f'{name}_bucket{le} {cumulative}'
+                yield f'{name}_sum{format_labels(labels)} {histogram.sum}'
+                yield f'{name}_count{format_labels(labels)} {histogram.count}'
+        for name, series in self.counters.items():
+            if name in self.help:
+                yield f'# HELP {name} {self.help[name]}'
+            yield f'# TYPE {name} counter'
+            for labels, value in series.items():
+                yield f'{name}{format_labels(labels)} {format_number(value)}'
+        for prefix, collect in self.gauges.items():
+            for key, value in collect().items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    yield f'# TYPE {prefix}_{key} gauge'
+                    yield f'{prefix}_{key} {format_number(value)}'
+
+    def render(self) -> str:
+        """
+        Returns all metrics in Prometheus text format.
+        """
+
+        return '\n'.join(self.lines()) + '\n'
+
+
+registry = Registry()
+registry.help.update({
+    'bot_update_seconds': 'Time of handling an update by FSM state it came in.',
+    'bot_handler_seconds': 'Time spent in the handler.',
+    'bot_api_calls_per_update': 'Bot API calls made for one update.',
+    'bot_db_queries_per_update': 'SQL statements executed for one update.',
+    'bot_api_calls_total': 'Requests made by the bot session by Bot API method.',
+})
+
+
+class UpdateMetricsMiddleware(BaseMiddleware):
+    """
+    Outer update middleware that measures every update
+    and records it by the FSM state the update came in.
+    Method returned by the handler is counted as a Bot API call,
+    as it is sent by the dispatcher or in the webhook response.
+    """
+
+    def __init__(self, metrics: Registry = registry) -> None:
+        """
+        Constructor method.
+        """
+
+        self.metrics: Registry = metrics
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        """
+        Calls handler and records its costs.
+        """
+
+        stats = UpdateStats()
+        token = current_stats.set(stats)
+        start = time.perf_counter()
+        try:
+            result = await handler(event, data)
+            if isinstance(result, TelegramMethod):
+                stats.api_calls += 1
+            return result
+        finally:
+            current_stats.reset(token)
+            state = data.get('raw_state') or 'none'
+            self.metrics.observe('bot_update_seconds', time.perf_counter() - start, LATENCY_BUCKETS, state=state)
+            self.metrics.observe('bot_api_calls_per_update', stats.api_calls, COUNT_BUCKETS)
+            self.metrics.observe('bot_db_queries_per_update', stats.queries, COUNT_BUCKETS)
+
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    """
+    Inner middleware that measures time spent in the handler.
+    """
+
+    def __init__(self, metrics: Registry = registry) -> None:
+        """
+        Constructor method.
+        """
+
+        self.metrics: Registry = metrics
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        """
+        Calls handler and records its latency.
+        """
+
+        name = data['handler'].callback.__name__
+        stats = current_stats.get()
+        if stats is not None:
+            stats.handler = name
+        start = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            self.metrics.observe('bot_handler_seconds', time.perf_counter() - start, LATENCY_BUCKETS, handler=name)
+
+
+class ApiMetricsMiddleware(BaseRequestMiddleware):
+    """
+    Bot session middleware that counts Bot API calls.
+    """
+
+    def __init__(self, metrics: Registry = registry) -> None:
+        """
+        Constructor method.
+        """
+
+        self.metrics: Registry = metrics
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: 'Bot',
+        method: TelegramMethod[TelegramType]
+    ) -> Response[TelegramType]:
+        """
+        Counts the call and makes request.
+        """
+
+        stats = current_stats.get()
+        if stats is not None:
+            stats.api_calls += 1
+        self.metrics.inc('bot_api_calls_total', method=method.__api_method__)
+        return await make_request(bot, method)
+
+
+def count_queries(engine: AsyncEngine) -> None:
+    """
+    Counts SQL statements of <engine> for the update being handled.
+
+    :param engine: Engine of the database.
+    """
+
+    @event.listens_for(engine.sync_engine, 'before_cursor_execute')
+    def before_cursor_execute(*args: Any) -> None:
+        stats = current_stats.get()
+        if stats is not None:
+            stats.queries += 1
+
+
+def create_app(metrics: Registry = registry) -> web.Application:
+    """
+    Creates aiohttp application serving metrics on /metrics.
+
+    :param metrics: Registry of metrics.
+    :return: Application.
+    """
+
+    async def handle(request: web.Request) -> web.Response:
+        return web.Response(body=metrics.render().encode('utf-8'), headers={'Content-Type': CONTENT_TYPE})
+
+    app = web.Application()
+    app.router.add_get('/metrics', handle)
+    return app
+
+
+async def start_server(host: str, port: int, metrics: Registry = registry) -> web.AppRunner:
+    """
+    Starts metrics server in background.
+
+    :param host: Host to listen on.
+    :param port: Port to listen on.
+    :param metrics: Registry of metrics.
+    :return: Runner, to be cleaned up on shutdown.
+    """
+
+    runner = web.AppRunner(create_app(metrics))
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
@@ -0,0 +1,224 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, AsyncGenerator, Awaitable, Callable, Dict, Optional, Tuple
+
+from aiogram import BaseMiddleware, Bot, Dispatcher
+from aiogram.filters import ExceptionTypeFilter
+from aiogram.fsm.storage.base import BaseEventIsolation, BaseStorage, StorageKey
+from aiogram.methods import TelegramMethod
+from aiogram.types import ErrorEvent, TelegramObject
+
+from database import SQLiteStorage, storage, writer
+from game import protagonists
+
+
+MAX_PENDING_UPDATES = 10
+
+
+class SaveProtagonistMiddleware(BaseMiddleware):
+    """
+    Marks protagonist of the user as changed after every
+    update, so it is saved with the next flush.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        """
+        Calls handler and marks protagonist as dirty.
+        """
+
+        try:
+            return await handler(event, data)
+        finally:
+            user = data.get('event_from_user')
+            if user and user.id in protagonists:
+                writer.mark_dirty(protagonists[user.id])
+
+
+class FlushStorageMiddleware(BaseMiddleware):
+    """
+    Writes FSM changes made by the update with one
+    transaction after the update is handled.
+
+    :param storage: FSM storage of the dispatcher.
+    """
+
+    def __init__(self, storage: SQLiteStorage = storage) -> None:
+        """
+        Constructor method.
+        """
+
+        self.storage: SQLiteStorage = storage
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        """
+        Calls handler and flushes FSM storage.
+        """
+
+        try:
+            return await handler(event, data)
+        finally:
+            await self.storage.flush()
+
+
+async def skip_request(bot: Bot, method: TelegramMethod[Any], timeout: Optional[int] = None) -> None:
+    """
+    Stands for the request of a method that is sent
+    as webhook response, after the session middlewares.
+    """
+
+    return None
+
+
+class SendAnswerMiddleware(BaseMiddleware):
+    """
+    Calls the method returned by a handler before the lock of
+    the chat is released, so answers of one chat are sent in
+    order and go through the bot session middlewares.
+    Methods not bound to a chat, like answerCallbackQuery,
+    are returned as webhook response if the update came with
+    <webhook_reply> in the data. They still pass the session
+    middlewares, so they are counted like other calls.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        """
+        Calls handler and sends the method it returned.
+        """
+
+        result = await handler(event, data)
+        if not isinstance(result, TelegramMethod):
+            return result
+        bot = data['bot']
+        if data.get('webhook_reply') and getattr(result, 'chat_id', None) is None:
+            await bot.session.middleware.wrap_middlewares(skip_request)(bot, result)
+            return result
+        await Dispatcher.silent_call_request(bot=bot, result=result)
+        return None
+
+
+class ChatLock:
+    """
+    Lock of one chat.
+
+    :param lock: Lock held while an update of the chat is handled.
+    :param pending: Number of updates being handled or waiting.
+    """
+
+    def __init__(self) -> None:
+        """
+        Constructor method.
+        """
+
+        self.lock: asyncio.Lock = asyncio.Lock()
+        self.pending: int = 0
+
+
+class ChatOverloaded(Exception):
+    """
+    Raised when too many updates of one chat are waiting.
+    """
+
+
+class ChatOrderIsolation(BaseEventIsolation):
+    """
+    Handles updates of one chat one by one, in the order they
+    came, while updates of different chats are handled at once.
+    Given to Dispatcher as events_isolation, so FSM middleware
+    reads the state of the chat only after the lock is taken
+    and every update sees the state left by the previous one.
+    Updates over <max_pending> waiting for the chat are dropped.
+    Lock of the chat is removed as soon as nothing waits for it,
+    so the table holds only chats with updates in progress.
+
+    :param max_pending: Maximum number of updates of one chat
+        being handled or waiting.
+    :param locks: Locks by bot and chat id.
+    :param dropped: Number of dropped updates.
+    """
+
+    def __init__(self, max_pending: int = MAX_PENDING_UPDATES) -> None:
+        """
+        Constructor method.
+        """
+
+        self.max_pending: int = max_pending
+        self.locks: Dict[Tuple[int, int], ChatLock] = {}
+        self.dropped: int = 0
+
+    @asynccontextmanager
+    async def lock(self, key: StorageKey) -> AsyncGenerator[None, None]:
+        """
+        Waits for previous updates of the chat.
+
+        :param key: FSM key of the update.
+        :raises ChatOverloaded: If too many updates of the chat wait.
+        """
+
+        chat = (key.bot_id, key.chat_id)
+        chat_lock = self.locks.get(chat)
+        if chat_lock is None:
+            chat_lock = self.locks[chat] = ChatLock()
+        elif chat_lock.pending >= self.max_pending:
+            self.dropped += 1
+            raise ChatOverloaded(key.chat_id)
+
+        chat_lock.pending += 1
+        try:
+            async with chat_lock.lock:
+                yield
+        finally:
+            chat_lock.pending -= 1
+            if not chat_lock.pending:
+                del self.locks[chat]
+
+    async def close(self) -> None:
+        """
+        Forgets all locks.
+        """
+
+        self.locks.clear()
+
+
+async def drop_overloaded(event: ErrorEvent) -> bool:
+    """
+    Error handler that drops updates of overloaded chats.
+
+    :param event: Error event with ChatOverloaded.
+    :return: True, so the error isn't raised further.
+    """
+
+    logging.warning('Too many updates from chat %s, update dropped', event.exception)
+    return True
+
+
+def ordered_dispatcher(storage: BaseStorage) -> Dispatcher:
+    """
+    Creates dispatcher that handles updates of one chat in order
+    and sends their answers in order too. SendAnswerMiddleware
+    is registered after FSM middleware of the dispatcher,
+    so it runs under the lock of the chat.
+
+    :param storage: FSM storage.
+    :return: Dispatcher without routers.
+    """
+
+    dp = Dispatcher(storage=storage, events_isolation=ChatOrderIsolation())
+    dp.update.outer_middleware(SendAnswerMiddleware())
+    dp.errors.register(drop_overloaded, ExceptionTypeFilter(ChatOverloaded))
+    return dp
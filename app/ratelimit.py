@@ -0,0 +1,292 @@
+import asyncio
+import heapq
+import itertools
+import logging
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import (DeleteMessage, EditMessageCaption, EditMessageMedia, EditMessageReplyMarkup,
+                             EditMessageText, Response, SendChatAction, TelegramMethod)
+from aiogram.methods.base import TelegramType
+
+if TYPE_CHECKING:
+    from aiogram import Bot
+
+
+"""
+Telegram limits: about 30 messages per second for the bot,
+about one message per second in a chat and 20 messages
+per minute in a group. Rate plus burst of the global bucket
+is the most it lets through in one second.
+"""
+GLOBAL_RATE = 28
+GLOBAL_BURST = 2
+CHAT_RATE = 1
+CHAT_BURST = 3
+GROUP_RATE = 20 / 60
+GROUP_BURST = 3
+
+MAX_RETRIES = 3
+MAX_IDLE_CHATS = 10000
+
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+
+"""
+Priority of requests by method. Edits carry battle
+results, deletes and chat actions are cosmetic.
+"""
+PRIORITIES: Dict[type, int] = {
+    EditMessageText: PRIORITY_HIGH,
+    EditMessageCaption: PRIORITY_HIGH,
+    EditMessageMedia: PRIORITY_HIGH,
+    EditMessageReplyMarkup: PRIORITY_HIGH,
+    DeleteMessage: PRIORITY_LOW,
+    SendChatAction: PRIORITY_LOW,
+}
+
+
+class TokenBucket:
+    """
+    Token bucket with a queue of waiters served by priority,
+    waiters of the same priority are served in order.
+
+    :param rate: Tokens added per second.
+    :param capacity: Maximum number of tokens.
+    :param tokens: Tokens available now, negative while
+        the bucket is blocked by flood control.
+    :param updated: Loop time of the last refill.
+    :param waiters: Heap of (priority, number, future).
+    """
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        """
+        Constructor method.
+        """
+
+        self.rate: float = rate
+        self.capacity: float = capacity
+        self.tokens: float = capacity
+        self.updated: float = asyncio.get_running_loop().time()
+        self.waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self.counter = itertools.count()
+        self.task: Optional[asyncio.Task] = None
+
+    def refill(self) -> None:
+        """
+        Adds tokens for the time passed since the last refill.
+        """
+
+        now = asyncio.get_running_loop().time()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    @property
+    def idle(self) -> bool:
+        """
+        True if nobody waits and the bucket is full.
+        """
+
+        self.refill()
+        return not self.waiters and self.tokens >= self.capacity
+
+    def block(self, seconds: float) -> None:
+        """
+        Gives no tokens for <seconds> seconds.
+
+        :param seconds: Time to wait, as told by flood control.
+        """
+
+        self.refill()
+        self.tokens = min(self.tokens, -seconds * self.rate)
+
+    async def acquire(self, priority: int) -> None:
+        """
+        Waits for a token.
+
+        :param priority: Priority of the request, lower is served first.
+        """
+
+        self.refill()
+        if not self.waiters and self.tokens >= 1:
+            self.tokens -= 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self.waiters, (priority, next(self.counter), future))
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self.serve())
+        await future
+
+    async def serve(self) -> None:
+        """
+        Gives tokens to waiters as they come.
+        Cancelled waiters are skipped.
+        """
+
+        while self.waiters:
+            self.refill()
+            if self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                continue
+            _, _, future = heapq.heappop(self.waiters)
+            if not future.done():
+                self.tokens -= 1
+                future.set_result(None)
+
+
+class RateLimiter:
+    """
+    Outbound rate limiter. A request waits for a token of
+    its chat and then for a global token.
+
+    :param chats: Buckets by chat_id.
+    :param sweep_at: Number of buckets at which idle ones are dropped.
+    :param requests: Number of limited requests.
+    :param queued: Number of requests waiting now.
+    :param max_queued: Maximum number of requests waiting at once.
+    :param wait_time: Total time spent waiting, in seconds.
+    :param max_wait: Longest wait, in seconds.
+    :param retries: Number of requests repeated after flood control.
+    """
+
+    def __init__(self) -> None:
+        """
+        Constructor method.
+        """
+
+        self.global_bucket: Optional[TokenBucket] = None
+        self.chats: Dict[Any, TokenBucket] = {}
+        self.sweep_at: int = MAX_IDLE_CHATS
+        self.requests: int = 0
+        self.queued: int = 0
+        self.max_queued: int = 0
+        self.wait_time: float = 0.0
+        self.max_wait: float = 0.0
+        self.retries: int = 0
+
+    def chat_bucket(self, chat_id: Any) -> TokenBucket:
+        """
+        Returns bucket of the chat. Idle buckets are dropped
+        when there are too many of them. Busy buckets stay,
+        so the next sweep waits until the table doubles
+        and a sweep costs O(1) per new chat on average.
+
+        :param chat_id: Chat id or @username of the chat.
+        :return: Bucket.
+        """
+
+        bucket = self.chats.get(chat_id)
+        if bucket is None:
+            if len(self.chats) >= self.sweep_at:
+                self.chats = {key: value for key, value in self.chats.items() if not value.idle}
+                self.sweep_at = max(MAX_IDLE_CHATS, 2 * len(self.chats))
+            group = isinstance(chat_id, str) or chat_id < 0
+            bucket = self.chats[chat_id] = (TokenBucket(GROUP_RATE, GROUP_BURST) if group
+                                            else TokenBucket(CHAT_RATE, CHAT_BURST))
+        return bucket
+
+    async def acquire(self, chat_id: Any, priority: int = PRIORITY_NORMAL) -> None:
+        """
+        Waits until a request to the chat can be sent.
+
+        :param chat_id: Chat id of the request.
+        :param priority: Priority of the request.
+        """
+
+        if self.global_bucket is None:
+            self.global_bucket = TokenBucket(GLOBAL_RATE, GLOBAL_BURST)
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        self.requests += 1
+        self.queued += 1
+        self.max_queued = max(self.max_queued, self.queued)
+        try:
+            await self.chat_bucket(chat_id).acquire(priority)
+            await self.global_bucket.acquire(priority)
+        finally:
+            self.queued -= 1
+            wait = loop.time() - start
+            self.wait_time += wait
+            self.max_wait = max(self.max_wait, wait)
+
+    def retry_after(self, chat_id: Any, seconds: float) -> None:
+        """
+        Blocks the chat and the bot after flood control error.
+        The error doesn't tell which limit is hit, so nothing
+        is sent until it passes.
+
+        :param chat_id: Chat id of the failed request.
+        :param seconds: Time to wait.
+        """
+
+        self.retries += 1
+        self.chat_bucket(chat_id).block(seconds)
+        if self.global_bucket is not None:
+            self.global_bucket.block(seconds)
+
+    def metrics(self) -> dict[str, Any]:
+        """
+        Returns counters of the limiter.
+
+        :return: Dictionary with metrics.
+        """
+
+        return {
+            'requests': self.requests,
+            'queued': self.queued,
+            'max_queued': self.max_queued,
+            'wait_time': self.wait_time,
+            'avg_wait': self.wait_time / self.requests if self.requests else 0.0,
+            'max_wait': self.max_wait,
+            'retries': self.retries,
+            'chats': len(self.chats),
+        }
+
+
+class RateLimitMiddleware(BaseRequestMiddleware):
+    """
+    Bot session middleware that passes requests to chats
+    through the rate limiter and repeats them after
+    flood control errors. Other requests, like getUpdates,
+    are made right away. Answers returned as webhook
+    response are not bound to a chat, so they pass right away.
+
+    :param limiter: Rate limiter.
+    """
+
+    def __init__(self, limiter: RateLimiter) -> None:
+        """
+        Constructor method.
+        """
+
+        self.limiter: RateLimiter = limiter
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: 'Bot',
+        method: TelegramMethod[TelegramType]
+    ) -> Response[TelegramType]:
+        """
+        Waits for the limiter and makes request.
+        """
+
+        chat_id = getattr(method, 'chat_id', None)
+        if chat_id is None:
+            return await make_request(bot, method)
+
+        priority = PRIORITIES.get(type(method), PRIORITY_NORMAL)
+        for attempt in range(MAX_RETRIES + 1):
+            await self.limiter.acquire(chat_id, priority)
+            try:
+                return await make_request(bot, method)
+            except TelegramRetryAfter as e:
+                if attempt == MAX_RETRIES:
+                    raise
+                logging.warning('Flood control in chat %s, retry in %s s', chat_id, e.retry_after)
+                self.limiter.retry_after(chat_id, e.retry_after)
+
+
+limiter = RateLimiter()
@@ -1,22 +1,117 @@
 import asyncio
-from aiogram import Bot, Dispatcher
+import logging
+from typing import Optional
 
-from config import TG_TOKEN
+from aiogram import Bot
+from aiohttp import web
+
+from config import (TG_TOKEN, PREWARM_CHAT_ID, WEBHOOK_URL, WEBHOOK_PATH, WEBHOOK_SECRET,
+                    WEBHOOK_HOST, WEBHOOK_PORT, WEBHOOK_MAX_CONNECTIONS, MAX_CONCURRENT_UPDATES,
+                    METRICS_HOST, METRICS_PORT, SQL_TRACE, WORLD_FILE, WORLD_RELOAD_INTERVAL)
+from database import engine, init_db, load_catalog, pool, storage, writer
+from game import protagonists_restore
 from handlers import router
+from media import file_ids
+from metrics import (ApiMetricsMiddleware, HandlerMetricsMiddleware, UpdateMetricsMiddleware,
+                     count_queries, registry, start_server)
+from middlewares import FlushStorageMiddleware, SaveProtagonistMiddleware, ordered_dispatcher
+from ratelimit import RateLimitMiddleware, limiter
+from sqltrace import QueryTracer
+from templates import location_card_metrics
+from webhook import create_app
+from world_reload import WorldReloader
 
 
 bot = Bot(token=TG_TOKEN)
-dp = Dispatcher()
+dp = ordered_dispatcher(storage)
+metrics_runner: Optional[web.AppRunner] = None
+tracer: Optional[QueryTracer] = None
+reloader = WorldReloader(WORLD_FILE, WORLD_RELOAD_INTERVAL)
 
 
-async def main() -> None:
+async def on_startup(bot: Bot) -> None:
+    """
+    Loads the world and saved protagonists.
+    Registers the webhook or removes it for long polling.
+    """
+
+    await init_db()
+    await load_catalog()
+    if PREWARM_CHAT_ID:
+        await file_ids.prewarm(bot, int(PREWARM_CHAT_ID))
+    await protagonists_restore()
+    writer.start()
+    if WORLD_RELOAD_INTERVAL:
+        reloader.start()
+    if METRICS_PORT:
+        global metrics_runner
+        metrics_runner = await start_server(METRICS_HOST, METRICS_PORT)
+    if WEBHOOK_URL:
+        await bot.set_webhook(f'{WEBHOOK_URL}{WEBHOOK_PATH}', secret_token=WEBHOOK_SECRET,
+                              max_connections=WEBHOOK_MAX_CONNECTIONS)
+    else:
+        await bot.delete_webhook()
+
+
+async def on_shutdown() -> None:
+    """
+    Saves what is left.
+    """
+
+    await reloader.stop()
+    await writer.stop()
+    if metrics_runner is not None:
+        await metrics_runner.cleanup()
+    logging.info('Session pool: %s', pool.metrics())
+    logging.info('Rate limiter: %s', limiter.metrics())
+    if tracer is not None:
+        logging.info('SQL statements:\n%s', tracer.report())
+
+
+def setup() -> None:
     """
-    Program's entry point.
+    Registers middlewares, routers and lifecycle callbacks.
     """
 
+    bot.session.middleware(RateLimitMiddleware(limiter))
+    bot.session.middleware(ApiMetricsMiddleware())
+    dp.update.outer_middleware(UpdateMetricsMiddleware())
+    dp.update.outer_middleware(SaveProtagonistMiddleware())
+    dp.update.outer_middleware(FlushStorageMiddleware())
+    dp.message.middleware(HandlerMetricsMiddleware())
+    dp.callback_query.middleware(HandlerMetricsMiddleware())
     dp.include_router(router)
+    count_queries(engine)
+    if SQL_TRACE:
+        global tracer
+        tracer = QueryTracer(engine)
+    registry.register_gauges('bot_db_pool', pool.metrics)
+    registry.register_gauges('bot_rate_limiter', limiter.metrics)
+    registry.register_gauges('bot_location_card_cache', location_card_metrics)
+    dp.startup.register(on_startup)
+    dp.shutdown.register(on_shutdown)
+
+
+async def main() -> None:
+    """
+    Program's entry point for long polling.
+    """
+
     await dp.start_polling(bot)
 
 
+def main_webhook() -> None:
+    """
+    Program's entry point for webhook.
+    """
+
+    web.run_app(create_app(dp, bot, WEBHOOK_PATH, MAX_CONCURRENT_UPDATES, WEBHOOK_SECRET),
+                host=WEBHOOK_HOST, port=WEBHOOK_PORT)
+
+
 if __name__ == '__main__':
-    asyncio.run(main())
+    setup()
+    if WEBHOOK_URL:
+        main_webhook()
+    else:
+        asyncio.run(main())
@@ -0,0 +1,195 @@
+import argparse
+import json
+import sys
+from typing import List, NamedTuple, Optional
+
+import numpy as np
+
+
+DATA_FILE = 'default_db.json'
+
+MAX_ROUNDS = 10000
+
+MAX_BATCH_SIZE = 2_000_000
+
+# Difference of two d6 throws for each of 36 outcomes.
+THROW_DIFFERENCE = (np.arange(6)[:, None] - np.arange(6)[None, :]).ravel().astype(np.int16)
+
+
+class Result(NamedTuple):
+    """
+    Averages of simulated fights of one enemy
+    against protagonist of one level.
+
+    :param name: Name of the enemy.
+    :param enemy_level: Level of the enemy.
+    :param level: Level of protagonist.
+    :param win_rate: Share of fights won by protagonist.
+    :param rounds: Mean number of rounds.
+    :param hp_loss: Mean health lost by protagonist.
+    """
+
+    name: str
+    enemy_level: int
+    level: int
+    win_rate: float
+    rounds: float
+    hp_loss: float
+
+
+def protagonist_stats(level: int) -> tuple[int, int]:
+    """
+    Returns health and damage of protagonist of the <level> level,
+    as Protagonist.advance_level() sets them.
+
+    :param level: Level of protagonist.
+    :return: Health and damage.
+    """
+
+    return 10 * level, level
+
+
+def simulate(levels: np.ndarray, health: np.ndarray, damage: np.ndarray, player_level: int,
+             fights: int, rng: np.random.Generator) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Simulates <fights> fights of protagonist of <player_level> level against
+    every enemy. Every round both throw d6 plus level, the bigger throw
+    hits, equal throws miss, as in Protagonist.attack(). All fights of
+    a batch are computed together and finished ones are dropped
+    from the arrays after every round.
+
+    :param levels: Levels of enemies.
+    :param health: Health of enemies.
+    :param damage: Damage of enemies.
+    :param player_level: Level of protagonist.
+    :param fights: Number of fights per enemy.
+    :param rng: Random generator.
+    :return: Wins, rounds and health lost summed by enemy.
+    """
+
+    count = len(levels)
+    player_hp, player_damage = protagonist_stats(player_level)
+    wins = np.zeros(count, dtype=np.int64)
+    rounds = np.zeros(count, dtype=np.int64)
+    hp_loss = np.zeros(count, dtype=np.int64)
+    batch = max(1, min(fights, MAX_BATCH_SIZE // max(count, 1)))
+
+    done = 0
+    while done < fights:
+        size = min(batch, fights - done)
+        enemy = np.repeat(np.arange(count), size)
+        advantage = (player_level - levels[enemy]).astype(np.int16)
+        enemy_hp = health[enemy].astype(np.int32)
+        enemy_damage = damage[enemy].astype(np.int32)
+        hp = np.full(len(enemy), player_hp, dtype=np.int32)
+        fight_rounds = 0
+
+        while len(enemy) and fight_rounds < MAX_ROUNDS:
+            fight_rounds += 1
+            throw = THROW_DIFFERENCE[rng.integers(0, 36, len(enemy), dtype=np.int8)] + advantage
+            np.subtract(enemy_hp, player_damage, out=enemy_hp, where=throw > 0)
+            np.subtract(hp, enemy_damage, out=hp, where=throw < 0)
+
+            won = enemy_hp <= 0
+            lost = hp <= 0
+            finished = won | lost
+            if finished.any():
+                wins += np.bincount(enemy[won], minlength=count)
+                rounds += np.bincount(enemy[finished], minlength=count) * fight_rounds
+                hp_loss += np.bincount(enemy[finished], player_hp - np.maximum(hp[finished], 0),
+                                       minlength=count).astype(np.int64)
+                keep = ~finished
+                enemy, advantage = enemy[keep], advantage[keep]
+                enemy_hp, enemy_damage, hp = enemy_hp[keep], enemy_damage[keep], hp[keep]
+
+        rounds += np.bincount(enemy, minlength=count) * fight_rounds
+        hp_loss += np.bincount(enemy, player_hp - hp, minlength=count).astype(np.int64)
+        done += size
+
+    return wins, rounds, hp_loss
+
+
+def load_enemies(path: str) -> tuple[list[dict], dict[int, int]]:
+    """
+    Reads enemies and levels of locations from the world file.
+
+    :param path: Filepath of the world in load_all.py format.
+    :return: Enemies and location level by location id.
+    """
+
+    with open(path, 'r', encoding='utf-8') as fp:
+        data: dict = json.load(fp)
+    return data['enemies'], {loc['id']: loc['level'] for loc in data['locations']}
+
+
+def generate_enemies(count: int, rng: np.random.Generator) -> tuple[list[dict], dict[int, int]]:
+    """
+    Generates <count> random enemies in locations of levels 1-20.
+
+    :param count: Number of enemies.
+    :param rng: Random generator.
+    :return: Enemies and location level by location id.
+    """
+
+    enemies = []
+    for i in range(1, count + 1):
+        level = int(rng.integers(1, 21))
+        enemies.append({'id': i, 'name': f'Enemy {i}', 'level': level, 'location_id': level,
+                        'health': int(rng.integers(1, 16)) * 10, 'damage': int(rng.integers(1, level + 1))})
+    return enemies, {level: level for level in range(1, 21)}
+
+
+def run(enemies: list[dict], location_levels: dict[int, int], fights: int,
+        levels: Optional[List[int]], rng: np.random.Generator) -> list[Result]:
+    """
+    Simulates every enemy against protagonist of every level
+    of <levels>, or of the level its location opens at.
+
+    :return: Results by enemy and level.
+    """
+
+    enemy_levels = np.array([e['level'] for e in enemies], dtype=np.int16)
+    health = np.array([e['health'] for e in enemies], dtype=np.int32)
+    damage = np.array([e['damage'] for e in enemies], dtype=np.int32)
+    unlock = np.array([location_levels.get(e['location_id'], 1) for e in enemies])
+
+    results: list[Result] = []
+    for level in (levels or sorted(set(unlock.tolist()))):
+        chosen = np.arange(len(enemies)) if levels else np.flatnonzero(unlock == level)
+        wins, rounds, hp_loss = simulate(enemy_levels[chosen], health[chosen], damage[chosen],
+                                         level, fights, rng)
+        for i, enemy in enumerate(chosen):
+            results.append(Result(enemies[enemy]['name'], int(enemy_levels[enemy]), level,
+                                  wins[i] / fights, rounds[i] / fights, hp_loss[i] / fights))
+    return results
+
+
+def main() -> int:
+    """
+    Entry point for simulate.py
+    """
+
+    parser = argparse.ArgumentParser(description='Monte Carlo simulation of fights with every enemy')
+    parser.add_argument('--world', default=DATA_FILE, help='world file in load_all.py format')
+    parser.add_argument('--generate', type=int, metavar='N', help='simulate N random enemies instead')
+    parser.add_argument('--fights', type=int, default=1_000_000, help='fights per enemy and level')
+    parser.add_argument('--levels', type=int, nargs='+',
+                        help='levels of protagonist, by default the level the location of enemy opens at')
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    if args.generate:
+        enemies, location_levels = generate_enemies(args.generate, rng)
+    else:
+        enemies, location_levels = load_enemies(args.world)
+
+    print(f'{"enemy":<28}{"enemy lvl":>10}{"lvl":>5}{"win rate":>10}{"rounds":>9}{"hp loss":>9}')
+    for result in run(enemies, location_levels, args.fights, args.levels, rng):
+        print(f'{result.name[:27]:<28}{result.enemy_level:>10}{result.level:>5}'
+              f'{result.win_rate:>9.1%}{result.rounds:>9.1f}{result.hp_loss:>9.1f}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
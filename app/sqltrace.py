@@ -0,0 +1,179 @@
+import logging
+import os
+import sys
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from types import FrameType
+from typing import Any, Iterator, List, NamedTuple, Optional, Set
+
+import greenlet
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from metrics import Registry, current_stats, registry
+
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+GAME_DIR = os.path.join(APP_DIR, 'game')
+
+"""
+Same statement executed this many times for one update is reported as N+1.
+"""
+N_PLUS_ONE_THRESHOLD = 3
+
+logger = logging.getLogger(__name__)
+
+
+class QueryKey(NamedTuple):
+    """
+    Where a statement came from.
+
+    :param handler: Name of the handler of the update, '-' outside of updates.
+    :param caller: Game function that executed the statement, or the
+        closest function of the bot if there is none.
+    :param statement: SQL text of the statement.
+    """
+
+    handler: str
+    caller: str
+    statement: str
+
+
+def caller_frames() -> Iterator[FrameType]:
+    """
+    Yields frames of the current call stack, innermost first.
+    SQLAlchemy runs async queries in a greenlet, so the coroutines
+    that awaited the query are found in the parent greenlet.
+    """
+
+    frame: Optional[FrameType] = sys._getframe(1)
+    current = greenlet.getcurrent()
+    while True:
+        while frame is not None:
+            yield frame
+            frame = frame.f_back
+        current = current.parent
+        if current is None or current.gr_frame is None:
+            return
+        frame = current.gr_frame
+
+
+def find_caller() -> str:
+    """
+    Returns name of the innermost game function on the stack,
+    or of the innermost bot function if no game function is there.
+    Only the name is returned, so the label of the metric takes
+    as many values as there are functions, not lines.
+    """
+
+    first = None
+    for frame in caller_frames():
+        filename = frame.f_code.co_filename
+        if not filename.startswith(APP_DIR) or filename == __file__:
+            continue
+        if first is None:
+            first = frame
+        if filename.startswith(GAME_DIR):
+            first = frame
+            break
+    if first is None:
+        return '-'
+    return first.f_code.co_name
+
+
+class QueryTracer:
+    """
+    Attributes every SQL statement of the engine to the handler and the
+    game call that caused it. Statement repeated <threshold> times
+    for one update is logged once as N+1.
+
+    :param queries: Number of statements by origin.
+    :param n_plus_one: Origins found repeating, with the count for one update.
+    """
+
+    def __init__(self, engine: AsyncEngine, threshold: int = N_PLUS_ONE_THRESHOLD,
+                 metrics: Registry = registry) -> None:
+        """
+        Constructor method.
+        """
+
+        self.threshold: int = threshold
+        self.metrics: Registry = metrics
+        self.queries: Counter[QueryKey] = Counter()
+        self.n_plus_one: dict[QueryKey, int] = {}
+        event.listen(engine.sync_engine, 'before_cursor_execute', self.before_cursor_execute)
+
+    def before_cursor_execute(self, conn: Any, cursor: Any, statement: str, *args: Any) -> None:
+        """
+        Records one statement.
+        """
+
+        stats = current_stats.get()
+        key = QueryKey(stats.handler or '-' if stats else '-', find_caller(), statement)
+        self.queries[key] += 1
+        self.metrics.inc('bot_db_queries_total', handler=key.handler, caller=key.caller)
+        if stats is None:
+            return
+        stats.statements[statement] += 1
+        count = stats.statements[statement]
+        if count >= self.threshold:
+            if key not in self.n_plus_one:
+                logger.warning('N+1 in %s from %s: %s', key.handler, key.caller, statement)
+                self.metrics.inc('bot_db_n_plus_one_total', handler=key.handler, caller=key.caller)
+            self.n_plus_one[key] = max(self.n_plus_one.get(key, 0), count)
+
+    def report(self, limit: int = 20) -> str:
+        """
+        Returns the most frequent statements and found N+1 as text.
+
+        :param limit: Number of statements to show.
+        """
+
+        lines = [f'{"count":>7}  {"handler":<32}{"caller":<32}statement']
+        for key, count in self.queries.most_common(limit):
+            lines.append(f'{count:>7}  {key.handler:<32}{key.caller:<32}{" ".join(key.statement.split())[:80]}')
+        for key, count in self.n_plus_one.items():
+            lines.append(f'N+1 x{count}: {key.handler} {key.caller}: {" ".join(key.statement.split())[:80]}')
+        return '\n'.join(lines)
+
+
+"""
+Statements executed inside assert_query_budget() of the current task.
+"""
+_budget: ContextVar[Optional[List[str]]] = ContextVar('_budget', default=None)
+_budget_engines: Set[int] = set()
+
+
+def _count_for_budget(conn: Any, cursor: Any, statement: str, *args: Any) -> None:
+    statements = _budget.get()
+    if statements is not None:
+        statements.append(statement)
+
+
+@contextmanager
+def assert_query_budget(engine: AsyncEngine, budget: int) -> Iterator[List[str]]:
+    """
+    Fails if code inside the block executes more than <budget>
+    statements. Only statements of the current task are counted,
+    so background writes don't break the budget.
+
+        with assert_query_budget(db.engine, 2):
+            await dp.feed_update(bot, update)
+
+    :param engine: Engine of the database.
+    :param budget: Maximum number of statements.
+    :return: List the executed statements are added to.
+    """
+
+    if id(engine.sync_engine) not in _budget_engines:
+        event.listen(engine.sync_engine, 'before_cursor_execute', _count_for_budget)
+        _budget_engines.add(id(engine.sync_engine))
+    statements: List[str] = []
+    token = _budget.set(statements)
+    try:
+        yield statements
+    finally:
+        _budget.reset(token)
+    if len(statements) > budget:
+        raise AssertionError(f'{len(statements)} queries, budget is {budget}:\n' + '\n'.join(statements))
@@ -1,6 +1,10 @@
-from typing import List
+from functools import lru_cache
+from typing import List, Sequence, Tuple
 
-from game import Direction, Enemy, NPC, Protagonist, Quest, QuestType
+from game import Direction, Enemy, FightResult, Location, NPC, Protagonist, Quest, QuestType
+
+
+LOCATION_CARD_CACHE_SIZE = 1024
 
 
 TemplateWelcome = """
@@ -25,6 +29,7 @@ TemplateWelcome = """
 
 ⚔️ <b>Бой</b>
 - <b>Атаковать</b>: Атаковать врага.
+- <b>Биться до конца</b>: Провести все раунды боя сразу.
 - <b>Сбежать</b>: Покинуть поле битвы.
 
 🗺️ <b>Отправиться</b>
@@ -131,6 +136,13 @@ TemplateBattle = """
 {phealth_bar}"""
 
 
+TemplateFightResult = """
+Бой длился <b>{rounds}</b> р.
+Вы попали <b>{hits}</b> р., враг попал <b>{misses}</b> р.
+Вы потеряли <b>{hp_lost}</b>🩸, осталось <b>{health}</b>🩸
+{defeated}"""
+
+
 TemplateBattleRunoff = "Вы сбежали от <b>{name}</b>"
 
 
@@ -172,35 +184,44 @@ def template_welcome(prota: Protagonist) -> str:
     )
 
 
-def npc_info(npcs: List[NPC], cur_proto: Protagonist) -> str:
+def npc_marker(npc: NPC, cur_proto: Protagonist) -> str:
+    """
+    Returns emoji shown before the npc name.
+
+    :param npc: NPC.
+    :param cur_proto: Protagonist.
+    :return: Emoji or empty string.
+    """
+
+    if cur_proto.npc_has_quests_to_complete(npc):
+        return '❔'
+    if cur_proto.npc_has_not_taken_quests(npc):
+        return '📜'
+    return ''
+
+
+def npc_info(npcs: Sequence[NPC], markers: Sequence[str]) -> str:
     """
     Filling template that describe npcs 
     on the location.
 
     :param npcs: List of npcs.
-    :param cur_proto: Protagonist.
+    :param markers: Emoji for every npc.
     :return: Filled template.
     """
 
-    res = ''
-    if npcs:
-        res = '\n<b>Персонажи:</b>\n'
-
-    for npc in npcs:
-        emoji = ''
-        if cur_proto.npc_has_quests_to_complete(npc):
-            emoji = '❔'
-        elif cur_proto.npc_has_not_taken_quests(npc):
-            emoji = '📜'
-        res += TemplateLocationNPC.format(
+    if not npcs:
+        return ''
+    return '\n<b>Персонажи:</b>\n' + ''.join(
+        TemplateLocationNPC.format(
             name=npc.name,
             available=f'{emoji} ' if emoji else '       '
         )
-
-    return res
+        for npc, emoji in zip(npcs, markers)
+    )
 
 
-def enemies_info(enemies: List[Enemy]) -> str:
+def enemies_info(enemies: Sequence[Enemy]) -> str:
     """
     Filling template that describe enemies
     on the location.
@@ -209,38 +230,62 @@ def enemies_info(enemies: List[Enemy]) -> str:
     :return: Filled template.
     """
 
-    res = ''
-    if enemies:
-        res = '\n<b>Враги:</b>\n'
-
-    for enemy in enemies:
-        res += TemplateLocationEnemy.format(
+    if not enemies:
+        return ''
+    return '\n<b>Враги:</b>\n' + ''.join(
+        TemplateLocationEnemy.format(
             name=enemy.name,
             level=enemy.level
         )
+        for enemy in enemies
+    )
 
-    return res
 
+@lru_cache(maxsize=LOCATION_CARD_CACHE_SIZE)
+def location_card(location: Location, enemies: Tuple[Enemy, ...], markers: Tuple[str, ...]) -> str:
+    """
+    Filling template that describe location. Result depends only
+    on the arguments, so cards are cached and shared by players
+    who see the same enemies and quest markers. Hits and misses
+    are exported as metrics by location_card_metrics().
 
-def location_info(loc_name: str, loc_descr: str, 
-                  npcs: List[NPC], enemies: List[Enemy], cur_proto: Protagonist) -> str:
+    :param location: Current location.
+    :param enemies: Enemies not killed by protagonist.
+    :param markers: Emoji for every npc of the location.
+    :return: Filled template.
+    """
+
+    return TemplateLocation.format(
+        name=location.name,
+        description=location.description,
+        enemies=enemies_info(enemies),
+        npcs=npc_info(location.npc, markers)
+    )
+
+
+def location_card_metrics() -> dict[str, int]:
+    """
+    Returns hits, misses and size of the location card cache.
+
+    :return: Dictionary with metrics.
+    """
+
+    info = location_card.cache_info()
+    return {'hits': info.hits, 'misses': info.misses, 'size': info.currsize}
+
+
+def location_info(location: Location, enemies: List[Enemy], cur_proto: Protagonist) -> str:
     """
     Filling template that describe location.
 
-    :param loc_name: Current location's name.
-    :param loc_descr: Current location's description.
-    :param npcs: List of npcs.
+    :param location: Current location.
     :param enemies: List of enemies.
     :param cur_proto: Protagonist.
     :return: Filled template.
     """
 
-    return TemplateLocation.format(
-        name=loc_name,
-        description=loc_descr,
-        enemies=enemies_info(enemies),
-        npcs=npc_info(npcs, cur_proto)
-    )
+    markers = tuple(npc_marker(npc, cur_proto) for npc in location.npc)
+    return location_card(location, tuple(enemies), markers)
 
 
 def no_npc() -> str:
@@ -392,17 +437,17 @@ def npc_quest_taken(quest: Quest) -> str:
     )
 
 
-def npc_quest_done(prota: Protagonist, quest: Quest) -> str:
+def npc_quest_done(prota: Protagonist, quest: Quest, locations: List[str]) -> str:
     """
     Filling template message after
     completing quest.
 
     :param prota: Protagonist
     :param quest: Completed quest.
+    :param locations: Names of locations opened on current level.
     :return: Filled template.
     """
 
-    locations = prota.new_locations()
     new_locations = ''
     if locations:
         new_locations = '\nДоступны новые локации:'
@@ -473,6 +518,27 @@ def attack_action(prota: Protagonist, enemy: Enemy, prota_roll: int, enemy_roll:
     )
 
 
+def fight_result(prota: Protagonist, enemy: Enemy, result: FightResult) -> str:
+    """
+    Filling template message after
+    the fight was resolved at once.
+
+    :param prota: User's protagonist.
+    :param enemy: Defeated enemy.
+    :param result: Summary of the fight.
+    :return: Filled template.
+    """
+
+    return TemplateFightResult.format(
+        rounds=result.rounds,
+        hits=result.hits,
+        misses=result.misses,
+        hp_lost=result.hp_lost,
+        health=prota.hp,
+        defeated=enemy_defeated(enemy)
+    )
+
+
 def battle_run_off(enemy: Enemy) -> str:
     """
     Filling template message after
@@ -529,7 +595,7 @@ def proto_quests_list(prota: Protagonist) -> str:
 
     res = '<b>Список заданий:</b>\n'
     
-    for quest in prota.current_quests:
+    for quest in prota.current_quests.values():
         text = f'    {quest.name}'
         match quest.quest_type:
             case QuestType.Kill:
@@ -563,12 +629,13 @@ def game_completed() -> str:
     return TemplateCompleted
 
 
-def proto_info(prota: Protagonist) -> str:
+def proto_info(prota: Protagonist, killed_enemies_names: List[str]) -> str:
     """
     Filling template that describes
     info about protagonist.
 
     :param prota: User's protagonist.
+    :param killed_enemies_names: Names of enemies killed by protagonist.
     :return: Filled template.
     """
 
@@ -576,7 +643,7 @@ def proto_info(prota: Protagonist) -> str:
     inventory = ''
     for item in prota.inventory.items():
         inventory += f'\n<code>    </code><b>{item[0]}</b>' * item[1]
-    for enemy in prota.get_killed_enemies():
+    for enemy in killed_enemies_names:
         killed_enemies += f'\n<code>    </code><b>{enemy}</b>'
     return TemplateProtagonistInfo.format(
         name=prota.name,
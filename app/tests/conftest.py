@@ -0,0 +1,80 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+# Modules of the bot import each other from app/, as run.py does.
+APP_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, APP_DIR)
+
+from aiogram import Dispatcher
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+import database as db
+import load_all
+from handlers import router
+from media import file_ids
+from metrics import HandlerMetricsMiddleware, Registry, UpdateMetricsMiddleware
+from middlewares import FlushStorageMiddleware, SaveProtagonistMiddleware, ordered_dispatcher
+
+
+@pytest.fixture(scope='session')
+def world_db(tmp_path_factory: pytest.TempPathFactory) -> str:
+    """
+    Temporary database with the world of default_db.json,
+    which is also made the current catalog.
+
+    :return: Filepath of the database.
+    """
+
+    path = str(tmp_path_factory.mktemp('db') / 'world.db')
+
+    async def load() -> None:
+        engine = create_async_engine(f'sqlite+aiosqlite:///{path}')
+        await load_all.load_world(os.path.join(APP_DIR, load_all.DATA_FILE), bind=engine)
+        async with AsyncSession(engine) as session:
+            db.set_catalog(await session.run_sync(db.Catalog.load))
+        await engine.dispose()
+
+    asyncio.run(load())
+    return path
+
+
+@pytest.fixture(autouse=True)
+def temporary_file_ids(tmp_path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Keeps file ids of uploaded images out of app/file_ids.json.
+    """
+
+    monkeypatch.setattr(file_ids, 'path', str(tmp_path / 'file_ids.json'))
+    monkeypatch.setattr(file_ids, 'file_ids', {})
+
+
+@pytest.fixture(scope='session')
+def fsm_storage(world_db: str) -> db.SQLiteStorage:
+    """
+    FSM storage in the world database. aiosqlite connects on every
+    checkout, so the engine serves every asyncio.run() of the tests.
+    """
+
+    return db.SQLiteStorage(create_async_engine(f'sqlite+aiosqlite:///{world_db}'))
+
+
+@pytest.fixture(scope='session')
+def game_dispatcher(fsm_storage: db.SQLiteStorage) -> Dispatcher:
+    """
+    Dispatcher with the game router and the middlewares of run.py.
+    The router can be attached only once, so the dispatcher
+    is shared by all tests. Metrics go to a registry of their own.
+    """
+
+    metrics = Registry()
+    dp = ordered_dispatcher(fsm_storage)
+    dp.update.outer_middleware(UpdateMetricsMiddleware(metrics))
+    dp.update.outer_middleware(SaveProtagonistMiddleware())
+    dp.update.outer_middleware(FlushStorageMiddleware(fsm_storage))
+    dp.message.middleware(HandlerMetricsMiddleware(metrics))
+    dp.callback_query.middleware(HandlerMetricsMiddleware(metrics))
+    dp.include_router(router)
+    return dp
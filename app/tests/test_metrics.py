@@ -0,0 +1,32 @@
+from collections import Counter
+
+from game import get_world
+from handlers import router
+from metrics import Registry
+from templates import location_card, location_card_metrics
+
+
+def test_handler_names_are_unique() -> None:
+    """
+    Handler latency is labeled by the name of the handler,
+    so handlers with the same name would share one series.
+    """
+
+    names = Counter(handler.callback.__name__
+                    for observer in router.observers.values() for handler in observer.handlers)
+    assert [name for name, count in names.items() if count > 1] == []
+
+
+def test_location_card_cache_gauges(world_db: str) -> None:
+    metrics = Registry()
+    metrics.register_gauges('bot_location_card_cache', location_card_metrics)
+    location = get_world().start_location
+    location_card.cache_clear()
+    location_card(location, location.enemies, ())
+    location_card(location, location.enemies, ())
+
+    lines = metrics.render().splitlines()
+
+    assert 'bot_location_card_cache_hits 1' in lines
+    assert 'bot_location_card_cache_misses 1' in lines
+    assert 'bot_location_card_cache_size 1' in lines
@@ -0,0 +1,105 @@
+import asyncio
+import datetime
+from typing import Any, AsyncGenerator, List, Optional
+
+import pytest
+from aiogram import Bot, Dispatcher
+from aiogram.client.session.base import BaseSession
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.methods import TelegramMethod
+from aiogram.types import Chat, Message, Update, User
+
+import database as db
+from game import protagonists
+from metrics import Registry
+from sqltrace import QueryTracer, assert_query_budget
+
+
+BOT_TOKEN = '42:SQLTRACE'
+CHAT_ID = 8
+
+"""
+Statements allowed for one update, as in benchmarks.queries.
+"""
+QUERY_BUDGET = 2
+
+
+class NullSession(BaseSession):
+    """
+    Bot session that makes no requests and answers True.
+    """
+
+    async def close(self) -> None:
+        """
+        Nothing to close, no connections are opened.
+        """
+
+    async def stream_content(self, *args: Any, **kwargs: Any) -> AsyncGenerator[bytes, None]:
+        """
+        Files are never downloaded by the game.
+        """
+
+        yield b''
+
+    async def make_request(self, bot: Bot, method: TelegramMethod, timeout: Optional[int] = None) -> Any:
+        """
+        Answers every method with True.
+        """
+
+        return True
+
+
+def make_update(text: str, update_id: int) -> Update:
+    """
+    Update with message <text> from the chat.
+    """
+
+    chat = Chat(id=CHAT_ID, type='private')
+    user = User(id=CHAT_ID, is_bot=False, first_name='Player')
+    return Update(update_id=update_id, message=Message(
+        message_id=update_id, date=datetime.datetime.now(), chat=chat, from_user=user, text=text))
+
+
+async def round_trip(dp: Dispatcher, engine: Any, texts: List[str]) -> List[int]:
+    """
+    Sends <texts> one by one, each under the query budget.
+
+    :return: Number of statements of every update.
+    """
+
+    bot = Bot(BOT_TOKEN, session=NullSession())
+    counts = []
+    for update_id, text in enumerate(texts, 1):
+        with assert_query_budget(engine, QUERY_BUDGET) as statements:
+            await dp.feed_update(bot, make_update(text, update_id))
+        counts.append(len(statements))
+    return counts
+
+
+def test_handler_round_trip_is_in_budget(game_dispatcher: Dispatcher, fsm_storage: db.SQLiteStorage) -> None:
+    try:
+        counts = asyncio.run(round_trip(game_dispatcher, fsm_storage.engine, ['/start', 'Hero', '/start']))
+    finally:
+        protagonists.pop(CHAT_ID, None)
+
+    # The state is read once, every update writes its change with one statement.
+    assert counts == [2, 1, 1]
+
+
+def test_callers_are_labeled_by_function(fsm_storage: db.SQLiteStorage) -> None:
+    metrics = Registry()
+    QueryTracer(fsm_storage.engine, metrics=metrics)
+    asyncio.run(fsm_storage.get_state(StorageKey(42, CHAT_ID + 1, CHAT_ID + 1)))
+
+    callers = {dict(labels)['caller'] for labels in metrics.counters['bot_db_queries_total']}
+    assert callers == {'_read'}
+
+
+def test_over_budget_fails(fsm_storage: db.SQLiteStorage) -> None:
+    async def main() -> None:
+        with assert_query_budget(fsm_storage.engine, 0):
+            async with fsm_storage.engine.connect() as conn:
+                await conn.exec_driver_sql('SELECT 1')
+
+    with pytest.raises(AssertionError, match='SELECT 1'):
+        asyncio.run(main())
@@ -0,0 +1,227 @@
+import asyncio
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from aiogram import Bot, Dispatcher, F, Router
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.methods import TelegramMethod
+from aiogram.types import BufferedInputFile, CallbackQuery, Message
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+
+import templates as tp
+from game import protagonists
+from metrics import ApiMetricsMiddleware, Registry
+from middlewares import ordered_dispatcher
+from ratelimit import RateLimiter, RateLimitMiddleware
+from webhook import create_app
+
+
+BOT_TOKEN = '42:WEBHOOK'
+SECRET = 'secret'
+CHAT_ID = 7
+
+
+class FakeBotAPI:
+    """
+    Local Bot API that answers every method like Telegram
+    and remembers name and parameters of the calls.
+
+    :param calls: Method and parameters of every call.
+    """
+
+    def __init__(self) -> None:
+        """
+        Constructor method.
+        """
+
+        self.calls: List[Tuple[str, Dict[str, Any]]] = []
+        self.app = web.Application()
+        self.app.router.add_post('/bot{token}/{method}', self.handle)
+
+    async def handle(self, request: web.Request) -> web.Response:
+        """
+        Records the call and returns a sent message.
+        """
+
+        method = request.match_info['method']
+        form = await request.post()
+        self.calls.append((method, {key: value for key, value in form.items() if isinstance(value, str)}))
+        if method == 'answerCallbackQuery':
+            return web.json_response({'ok': True, 'result': True})
+        message = {'message_id': len(self.calls), 'date': 0, 'chat': {'id': CHAT_ID, 'type': 'private'}}
+        if method == 'sendPhoto':
+            message['photo'] = [{'file_id': 'photo', 'file_unique_id': 'photo', 'width': 1, 'height': 1}]
+        return web.json_response({'ok': True, 'result': message})
+
+
+def make_dispatcher() -> Dispatcher:
+    """
+    Dispatcher with handlers answering the way game handlers do.
+    """
+
+    router = Router()
+
+    @router.message(lambda message: message.text == 'two answers')
+    async def two_answers(message: Message) -> Optional[TelegramMethod]:
+        await message.answer('first')
+        return message.answer('second')
+
+    @router.message(lambda message: message.text == 'photo')
+    async def photo(message: Message) -> Optional[TelegramMethod]:
+        return message.answer_photo(BufferedInputFile(b'image', 'image.jpg'), 'caption')
+
+    @router.message(lambda message: message.text == 'nothing')
+    async def nothing(message: Message) -> Optional[TelegramMethod]:
+        return None
+
+    @router.callback_query(F.data == 'press')
+    async def press(callback: CallbackQuery) -> Optional[TelegramMethod]:
+        await callback.message.edit_text('pressed')
+        return callback.answer()
+
+    dp = ordered_dispatcher(MemoryStorage())
+    dp.include_router(router)
+    return dp
+
+
+def make_update(text: str, update_id: int = 1) -> Dict[str, Any]:
+    """
+    Update with message <text> from the chat.
+    """
+
+    chat = {'id': CHAT_ID, 'type': 'private'}
+    user = {'id': CHAT_ID, 'is_bot': False, 'first_name': 'Player'}
+    message = {'message_id': update_id, 'date': 0, 'chat': chat, 'from': user, 'text': text}
+    return {'update_id': update_id, 'message': message}
+
+
+def make_callback(data: str, update_id: int = 1) -> Dict[str, Any]:
+    """
+    Update with callback query <data> of a bot message in the chat.
+    """
+
+    chat = {'id': CHAT_ID, 'type': 'private'}
+    user = {'id': CHAT_ID, 'is_bot': False, 'first_name': 'Player'}
+    message = {'message_id': 1, 'date': 1, 'chat': chat, 'text': 'battle'}
+    callback = {'id': str(update_id), 'from': user, 'chat_instance': '1', 'message': message, 'data': data}
+    return {'update_id': update_id, 'callback_query': callback}
+
+
+class Run:
+    """
+    Result of updates posted to the webhook.
+
+    :param statuses: HTTP status of every response.
+    :param replies: Fields of every webhook response.
+    :param api: Fake Bot API the bot talked to.
+    :param metrics: Metrics of the bot session.
+    :param limiter: Rate limiter of the bot session.
+    """
+
+    def __init__(self) -> None:
+        """
+        Constructor method.
+        """
+
+        self.statuses: List[int] = []
+        self.replies: List[Dict[str, Any]] = []
+        self.api = FakeBotAPI()
+        self.metrics = Registry()
+        self.limiter = RateLimiter()
+
+    def api_calls(self, method: str) -> float:
+        """
+        Returns number of <method> calls counted by the session.
+        """
+
+        return self.metrics.counters.get('bot_api_calls_total', {}).get((('method', method),), 0)
+
+
+async def post_updates(dp: Dispatcher, updates: Sequence[Dict[str, Any]], secret: str = SECRET) -> Run:
+    """
+    Posts <updates> one by one to the webhook of a bot
+    talking to the fake Bot API through the session
+    middlewares of run.py.
+    """
+
+    run = Run()
+    async with TestServer(run.api.app) as api_server:
+        session = AiohttpSession(api=TelegramAPIServer.from_base(str(api_server.make_url(''))))
+        session.middleware(RateLimitMiddleware(run.limiter))
+        session.middleware(ApiMetricsMiddleware(run.metrics))
+        bot = Bot(BOT_TOKEN, session=session)
+        app = create_app(dp, bot, '/webhook', 10, secret_token=SECRET)
+        async with TestClient(TestServer(app)) as client:
+            for update in updates:
+                response = await client.post('/webhook', json=update,
+                                             headers={'X-Telegram-Bot-Api-Secret-Token': secret})
+                run.statuses.append(response.status)
+                run.replies.append(await response.json() if response.status == 200 else {})
+        await session.close()
+    return run
+
+
+def test_answers_to_chat_are_sent_in_order() -> None:
+    run = asyncio.run(post_updates(make_dispatcher(), [make_update('two answers')]))
+
+    assert run.statuses == [200]
+    assert run.replies == [{}]
+    assert [(method, data['text']) for method, data in run.api.calls] == [('sendMessage', 'first'),
+                                                                            ('sendMessage', 'second')]
+    assert run.api_calls('sendMessage') == 2
+    assert run.limiter.requests == 2
+
+
+def test_callback_answer_is_webhook_response() -> None:
+    run = asyncio.run(post_updates(make_dispatcher(), [make_callback('press')]))
+
+    assert run.statuses == [200]
+    assert run.replies[0]['method'] == 'answerCallbackQuery'
+    assert run.replies[0]['callback_query_id'] == '1'
+    assert [method for method, _ in run.api.calls] == ['editMessageText']
+    assert run.api_calls('answerCallbackQuery') == 1
+    assert run.limiter.requests == 1
+
+
+def test_upload_is_sent_to_bot_api() -> None:
+    run = asyncio.run(post_updates(make_dispatcher(), [make_update('photo')]))
+
+    assert run.replies == [{}]
+    assert [method for method, _ in run.api.calls] == ['sendPhoto']
+    assert run.api.calls[0][1]['caption'] == 'caption'
+
+
+def test_no_answer() -> None:
+    run = asyncio.run(post_updates(make_dispatcher(), [make_update('nothing')]))
+
+    assert run.statuses == [200]
+    assert run.replies == [{}]
+    assert run.api.calls == []
+
+
+def test_wrong_secret_is_rejected() -> None:
+    run = asyncio.run(post_updates(make_dispatcher(), [make_update('two answers')], secret='wrong'))
+
+    assert run.statuses == [401]
+    assert run.api.calls == []
+
+
+def test_game_router(game_dispatcher: Dispatcher) -> None:
+    updates = [make_update('/start', 1), make_update('Hero', 2), make_callback('battle:attack', 3)]
+    try:
+        run = asyncio.run(post_updates(game_dispatcher, updates))
+    finally:
+        hero = protagonists.pop(CHAT_ID, None)
+
+    assert run.statuses == [200, 200, 200]
+    assert [(method, data['text']) for method, data in run.api.calls] == [
+        ('sendMessage', 'Введите имя игрока: '),
+        ('sendMessage', tp.template_welcome(hero)),
+    ]
+    assert run.replies[:2] == [{}, {}]
+    assert run.replies[2]['method'] == 'answerCallbackQuery'
+    assert run.api_calls('sendMessage') == 2
+    assert run.api_calls('answerCallbackQuery') == 1
+    assert run.limiter.requests == 2
@@ -0,0 +1,88 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from aiogram import Bot, Dispatcher
+from aiogram.methods import TelegramMethod
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
+
+
+Handler = Callable[[web.Request], Awaitable[web.StreamResponse]]
+
+
+class ReplyRequestHandler(SimpleRequestHandler):
+    """
+    Webhook handler that handles update before responding and
+    sends the method returned by the dispatcher as JSON webhook
+    response. SendAnswerMiddleware leaves only methods not bound
+    to a chat for the response, others are sent under the lock
+    of the chat. Multipart responses of SimpleRequestHandler
+    aren't built by aiohttp this aiogram version runs with.
+    """
+
+    async def handle(self, request: web.Request) -> web.Response:
+        """
+        Checks the secret, handles update and builds the response.
+        """
+
+        bot = await self.resolve_bot(request)
+        if not self.verify_secret(request.headers.get('X-Telegram-Bot-Api-Secret-Token', ''), bot):
+            return web.Response(body='Unauthorized', status=401)
+        result: Optional[TelegramMethod[Any]] = await self.dispatcher.feed_webhook_update(
+            bot,
+            await request.json(loads=bot.session.json_loads),
+            **self.data,
+        )
+        if result is None:
+            return web.json_response({})
+        files: Dict[str, Any] = {}
+        payload = bot.session.prepare_value(result.model_dump(warnings=False), bot=bot,
+                                            files=files, _dumps_json=False)
+        if files:
+            await self.dispatcher.silent_call_request(bot=bot, result=result)
+            return web.json_response({})
+        payload['method'] = result.__api_method__
+        return web.json_response(payload, dumps=bot.session.json_dumps)
+
+
+def concurrency_limit(limit: int) -> Callable[[web.Request, Handler], Awaitable[web.StreamResponse]]:
+    """
+    Makes aiohttp middleware that handles at most <limit>
+    requests at once, other requests wait for their turn.
+
+    :param limit: Maximum number of requests handled at once.
+    :return: Middleware.
+    """
+
+    semaphore = asyncio.Semaphore(limit)
+
+    @web.middleware
+    async def middleware(request: web.Request, handler: Handler) -> web.StreamResponse:
+        async with semaphore:
+            return await handler(request)
+
+    return middleware
+
+
+def create_app(dispatcher: Dispatcher, bot: Bot, path: str,
+               max_concurrent_updates: int, secret_token: Optional[str] = None) -> web.Application:
+    """
+    Creates aiohttp application that receives updates on <path>.
+    Updates are handled before responding, so an answer not bound
+    to a chat, like answerCallbackQuery, is sent back as the webhook
+    response without another request to Bot API. Answers to a chat
+    are sent by SendAnswerMiddleware under the lock of the chat.
+
+    :param dispatcher: Dispatcher with all routers.
+    :param bot: Bot instance.
+    :param path: Path of the webhook.
+    :param max_concurrent_updates: Maximum number of updates handled at once.
+    :param secret_token: Secret token set for the webhook.
+    :return: Application.
+    """
+
+    app = web.Application(middlewares=[concurrency_limit(max_concurrent_updates)])
+    ReplyRequestHandler(dispatcher=dispatcher, bot=bot, handle_in_background=False,
+                        secret_token=secret_token, webhook_reply=True).register(app, path=path)
+    setup_application(app, dispatcher, bot=bot)
+    return app
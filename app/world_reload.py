@@ -0,0 +1,214 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, Optional
+
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+
+import database as db
+import keyboards as kb
+import load_all
+import templates as tp
+from database import Catalog, CatalogChanges, SQLiteStorage
+from fsm import FSM_Location
+from game import World, set_world
+from metrics import registry
+
+
+"""
+Seconds between checks of the world file.
+"""
+RELOAD_INTERVAL = 5.0
+
+"""
+In-memory database the new world is checked in.
+"""
+STAGING_URL = 'sqlite+aiosqlite://'
+
+"""
+Kind of catalog entities by field of FSM data holding their ids.
+"""
+FSM_FIELD_KINDS = {'npc': 'npc', 'quest': 'quests', 'enemy': 'enemies'}
+
+logger = logging.getLogger(__name__)
+
+
+def removed_ids(changes: dict[str, CatalogChanges]) -> Dict[str, frozenset[int]]:
+    """
+    Returns ids of removed entities by field of FSM data.
+
+    :param changes: Changes of the catalog.
+    """
+
+    empty = CatalogChanges(frozenset(), frozenset(), frozenset())
+    return {field: changes.get(kind, empty).removed for field, kind in FSM_FIELD_KINDS.items()}
+
+
+async def build_catalog(rows: dict[str, list[dict]]) -> Catalog:
+    """
+    Builds the catalog of <rows> in an in-memory database,
+    so the bot's database isn't touched until the world is checked.
+
+    :param rows: Rows by name of section, as read_file() returns.
+    """
+
+    staging = create_async_engine(STAGING_URL)
+    try:
+        async with staging.begin() as conn:
+            await conn.run_sync(db.create_schema)
+            await load_all.load_rows(conn, rows)
+            async with AsyncSession(bind=conn) as session:
+                return await session.run_sync(Catalog.load)
+    finally:
+        await staging.dispose()
+
+
+def swap_world(world: World) -> None:
+    """
+    Makes <world> the current one. Nothing here awaits, so
+    handlers see either the old world or the new one.
+    Protagonists are moved to it on their next update
+    by get_proto_from_msg(), so the swap doesn't depend
+    on the number of players.
+
+    :param world: New world.
+    """
+
+    set_world(world)
+    # Cached cards and button indexes hold objects of the old world.
+    tp.location_card.cache_clear()
+    kb.make_buttons_index.cache_clear()
+
+
+def format_changes(changes: dict[str, CatalogChanges]) -> str:
+    """
+    Formats changes as 'quests +1 -0 ~2, ...'.
+    """
+
+    return ', '.join(f'{kind} +{len(c.added)} -{len(c.removed)} ~{len(c.changed)}' for kind, c in changes.items())
+
+
+class WorldReloader:
+    """
+    Watches the world file and applies its changes to the running
+    bot: the catalog of the file is compared with the current one
+    and, if they differ, the file is written to the database and
+    the world is swapped. FSM states referring to removed entities
+    are reset. Nothing is written unless the new world can be built,
+    and a file that failed to load is tried again on the next check.
+
+    :param path: Filepath of the world.
+    :param interval: Seconds between checks of the file.
+    :param bind: Engine of the database.
+    :param storage: FSM storage of the bot.
+    :param mtime: Modification time of the file applied last.
+    :param reloads: Number of applied reloads.
+    :param write_time: Seconds the last reload held the write transaction.
+    :param swap_time: Seconds the last swap held the event loop.
+    """
+
+    def __init__(self, path: str = load_all.DATA_FILE, interval: float = RELOAD_INTERVAL,
+                 bind: AsyncEngine = db.engine, storage: SQLiteStorage = db.storage) -> None:
+        """
+        Constructor method.
+        """
+
+        self.path: str = path
+        self.interval: float = interval
+        self.bind: AsyncEngine = bind
+        self.storage: SQLiteStorage = storage
+        self.mtime: Optional[float] = None
+        self.reloads: int = 0
+        self.write_time: float = 0.0
+        self.swap_time: float = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def stat(self) -> Optional[float]:
+        """
+        Returns modification time of the file, None if it is missing.
+        """
+
+        try:
+            return os.stat(self.path).st_mtime
+        except OSError:
+            return None
+
+    async def reload(self) -> dict[str, CatalogChanges]:
+        """
+        Loads the file and applies its changes. The file is parsed
+        and the new world is built before the write transaction,
+        which only upserts and prunes rows, so the FSM storage
+        isn't locked out of the database for the whole load.
+        On success the modification time the file had before
+        the load is remembered, so changes made during it are not lost.
+
+        :return: Changes by kind of entities, empty if there are none.
+        """
+
+        start = time.perf_counter()
+        mtime = self.stat()
+        rows = await asyncio.to_thread(load_all.read_file, self.path)
+        catalog = await build_catalog(rows)
+        changes = db.get_catalog().diff(catalog)
+        if not changes:
+            self.mtime = mtime
+            return changes
+        # Raises before anything is written if the world is broken.
+        world = World(catalog)
+
+        write_start = time.perf_counter()
+        async with self.bind.begin() as conn:
+            await load_all.load_rows(conn, rows, remove_missing=True)
+        self.write_time = time.perf_counter() - write_start
+
+        reset = await self.storage.reset_stale(removed_ids(changes), FSM_Location.start.state)
+        swap_start = time.perf_counter()
+        swap_world(world)
+        self.swap_time = time.perf_counter() - swap_start
+        self.mtime = mtime
+
+        self.reloads += 1
+        registry.inc('bot_world_reloads_total')
+        logger.info('World reloaded in %.3f s (write %.1f ms, swap %.1f ms): %s; %d FSM states reset',
+                    time.perf_counter() - start, self.write_time * 1000, self.swap_time * 1000,
+                    format_changes(changes), reset)
+        return changes
+
+    async def run(self) -> None:
+        """
+        Checks the file every <interval> seconds and reloads
+        it until a change is applied.
+        """
+
+        self.mtime = self.stat()
+        while True:
+            await asyncio.sleep(self.interval)
+            mtime = self.stat()
+            if mtime is None or mtime == self.mtime:
+                continue
+            try:
+                await self.reload()
+            except Exception:
+                logger.exception('Failed to reload the world from %s', self.path)
+
+    def start(self) -> None:
+        """
+        Starts watching in background task.
+        """
+
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        """
+        Stops watching.
+        """
+
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None